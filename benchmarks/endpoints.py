@@ -0,0 +1,548 @@
+"""Benchmarks of the ``AuthorizationServer`` endpoints.
+
+Drives ``create_token_response`` for every grant type,
+``create_authorization_response`` for both response types and the token
+introspection endpoints against a database picked with ``--db``
+(``InMemoryDB`` by default, or ``SQLiteDB`` in a temporary directory),
+and reports for each of them:
+
+    ops/s     requests per second, ``--concurrency`` requests at a time
+    p50, p99  request latency in microseconds
+    alloc     average peak of memory allocated while serving a request,
+              measured with tracemalloc in a separate pass
+
+Requests and the records they consume (authorization codes, refresh
+tokens) are prepared before timing, so only the endpoint call is measured.
+
+Usage:
+
+    python benchmarks/endpoints.py [--number 5000] [--repeat 5] [--only password]
+    python benchmarks/endpoints.py --save benchmarks/baseline.json
+    python benchmarks/endpoints.py --compare benchmarks/baseline.json
+    python benchmarks/endpoints.py --db sqlite --number 1000
+    python benchmarks/endpoints.py --metrics --compare benchmarks/baseline.json
+
+``--metrics`` serves the requests with ``aioauth.metrics.Metrics`` enabled,
+compared with a baseline recorded without it, it shows the overhead of
+the instrumentation.
+
+Every benchmark is timed ``--repeat`` times, ops/s is the best and the
+latencies are the median of the repeats. The compare mode exits with
+status 1 when the throughput of a benchmark drops by more than
+``--threshold`` below the baseline, or its p99 latency grows by more than
+twice that. Baselines are machine specific, regenerate them on the
+machine the comparison runs on.
+"""
+import argparse
+import asyncio
+import atexit
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from aioauth.base.database import BaseDB
+from aioauth.config import Settings
+from aioauth.grant_type import (
+    AuthorizationCodeGrantType,
+    ClientCredentialsGrantType,
+    PasswordGrantType,
+    RefreshTokenGrantType,
+)
+from aioauth.metrics import Metrics
+from aioauth.models import Client, Token
+from aioauth.requests import Post, Query, Request
+from aioauth.response_type import ResponseTypeAuthorizationCode, ResponseTypeToken
+from aioauth.responses import Response
+from aioauth.server import AuthorizationServer
+from aioauth.storage.memory import InMemoryDB
+from aioauth.storage.sqlite import SQLiteDB
+from aioauth.types import (
+    CodeChallengeMethod,
+    EndpointType,
+    GrantType,
+    RequestMethod,
+    ResponseType,
+)
+from aioauth.utils import encode_auth_headers
+
+CLIENT_ID = "benchmark-client"
+CLIENT_SECRET = "benchmark-secret"
+REDIRECT_URI = "https://example.com/callback"
+SCOPE = "read write"
+USERNAME = "user"
+PASSWORD = "password"
+URL = "https://localhost"
+
+settings = Settings()
+headers = encode_auth_headers(CLIENT_ID, CLIENT_SECRET)
+
+
+def create_server(db: BaseDB, metrics: bool = False) -> AuthorizationServer:
+    server = AuthorizationServer(db=db, metrics=Metrics() if metrics else None)
+    server.register(
+        EndpointType.RESPONSE_TYPE, ResponseType.TYPE_TOKEN, ResponseTypeToken
+    )
+    server.register(
+        EndpointType.RESPONSE_TYPE,
+        ResponseType.TYPE_CODE,
+        ResponseTypeAuthorizationCode,
+    )
+    server.register(
+        EndpointType.GRANT_TYPE,
+        GrantType.TYPE_AUTHORIZATION_CODE,
+        AuthorizationCodeGrantType,
+    )
+    server.register(
+        EndpointType.GRANT_TYPE,
+        GrantType.TYPE_CLIENT_CREDENTIALS,
+        ClientCredentialsGrantType,
+    )
+    server.register(EndpointType.GRANT_TYPE, GrantType.TYPE_PASSWORD, PasswordGrantType)
+    server.register(
+        EndpointType.GRANT_TYPE, GrantType.TYPE_REFRESH_TOKEN, RefreshTokenGrantType
+    )
+    return server
+
+
+client = Client(
+    client_id=CLIENT_ID,
+    client_secret=CLIENT_SECRET,
+    grant_types=list(GrantType),
+    response_types=list(ResponseType),
+    redirect_uris=[REDIRECT_URI],
+    scope=SCOPE,
+)
+
+
+async def create_memory_db() -> BaseDB:
+    return InMemoryDB(clients=[client], users={USERNAME: PASSWORD})
+
+
+async def create_sqlite_db() -> BaseDB:
+    directory = tempfile.mkdtemp(prefix="aioauth-benchmark-")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+
+    db = SQLiteDB(os.path.join(directory, "oauth.db"))
+    await db.add_client(client)
+    await db.add_user(USERNAME, PASSWORD)
+    return db
+
+
+CreateDB = Callable[[], Awaitable[BaseDB]]
+
+
+def token_request(**post) -> Request:
+    return Request(
+        url=URL,
+        method=RequestMethod.POST,
+        headers=headers,
+        post=Post(**post),
+        settings=settings,
+    )
+
+
+def authorization_request(response_type: ResponseType) -> Request:
+    query = Query(
+        client_id=CLIENT_ID,
+        response_type=response_type,
+        redirect_uri=REDIRECT_URI,
+        scope=SCOPE,
+        state="state",
+    )
+    return Request(
+        url=URL, method=RequestMethod.GET, query=query, user=USERNAME, settings=settings
+    )
+
+
+async def create_tokens(db: BaseDB, number: int) -> List[Token]:
+    request = token_request()
+    return [await db.create_token(request, CLIENT_ID, SCOPE) for _ in range(number)]
+
+
+async def prepare_authorization_code(db: BaseDB, number: int) -> List[Request]:
+    request = authorization_request(ResponseType.TYPE_CODE)
+    requests = []
+
+    for _ in range(number):
+        code = await db.create_authorization_code(
+            request,
+            CLIENT_ID,
+            SCOPE,
+            ResponseType.TYPE_CODE,
+            REDIRECT_URI,
+            CodeChallengeMethod.PLAIN,
+            "",
+        )
+        requests.append(
+            token_request(
+                grant_type=GrantType.TYPE_AUTHORIZATION_CODE,
+                redirect_uri=REDIRECT_URI,
+                code=code.code,
+                scope=SCOPE,
+            )
+        )
+
+    return requests
+
+
+async def prepare_password(db: BaseDB, number: int) -> List[Request]:
+    request = token_request(
+        grant_type=GrantType.TYPE_PASSWORD,
+        username=USERNAME,
+        password=PASSWORD,
+        scope=SCOPE,
+    )
+    return [request] * number
+
+
+async def prepare_client_credentials(db: BaseDB, number: int) -> List[Request]:
+    request = token_request(grant_type=GrantType.TYPE_CLIENT_CREDENTIALS, scope=SCOPE)
+    return [request] * number
+
+
+async def prepare_refresh_token(db: BaseDB, number: int) -> List[Request]:
+    return [
+        token_request(
+            grant_type=GrantType.TYPE_REFRESH_TOKEN, refresh_token=token.refresh_token,
+        )
+        for token in await create_tokens(db, number)
+    ]
+
+
+async def prepare_response_type_code(db: BaseDB, number: int) -> List[Request]:
+    return [authorization_request(ResponseType.TYPE_CODE)] * number
+
+
+async def prepare_response_type_token(db: BaseDB, number: int) -> List[Request]:
+    return [authorization_request(ResponseType.TYPE_TOKEN)] * number
+
+
+async def prepare_introspection(db: BaseDB, number: int) -> List[Request]:
+    tokens = await create_tokens(db, min(number, 1000))
+    return [
+        token_request(token=tokens[index % len(tokens)].access_token)
+        for index in range(number)
+    ]
+
+
+async def prepare_batch_introspection(db: BaseDB, number: int) -> List[Request]:
+    tokens = [token.access_token for token in await create_tokens(db, 100)]
+    return [token_request(tokens=tokens)] * number
+
+
+Prepare = Callable[[BaseDB, int], Awaitable[List[Request]]]
+
+
+class Benchmark(NamedTuple):
+    name: str
+    endpoint: str
+    prepare: Prepare
+
+
+benchmarks = [
+    Benchmark(
+        "grant_type:authorization_code",
+        "create_token_response",
+        prepare_authorization_code,
+    ),
+    Benchmark("grant_type:password", "create_token_response", prepare_password),
+    Benchmark(
+        "grant_type:client_credentials",
+        "create_token_response",
+        prepare_client_credentials,
+    ),
+    Benchmark(
+        "grant_type:refresh_token", "create_token_response", prepare_refresh_token
+    ),
+    Benchmark(
+        "response_type:code",
+        "create_authorization_response",
+        prepare_response_type_code,
+    ),
+    Benchmark(
+        "response_type:token",
+        "create_authorization_response",
+        prepare_response_type_token,
+    ),
+    Benchmark(
+        "introspection", "create_token_introspection_response", prepare_introspection,
+    ),
+    Benchmark(
+        "introspection:batch[100]",
+        "create_token_batch_introspection_response",
+        prepare_batch_introspection,
+    ),
+]
+
+
+class Result(NamedTuple):
+    ops_per_sec: float
+    p50_us: float
+    p99_us: float
+    alloc_bytes: float
+
+
+def percentile(values: List[float], percent: float) -> float:
+    index = min(len(values) - 1, int(len(values) * percent / 100))
+    return values[index]
+
+
+def check_response(name: str, response: Response) -> None:
+    if response.status_code >= 400:
+        raise RuntimeError(f"{name} failed: {response.content}")
+
+
+async def measure_allocations(
+    name: str, endpoint: Callable[[Request], Awaitable[Response]], requests
+) -> float:
+    tracemalloc.start()
+    total = 0
+
+    try:
+        for request in requests:
+            # tracemalloc.reset_peak is available since Python 3.9
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            check_response(name, await endpoint(request))
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - current
+    finally:
+        tracemalloc.stop()
+
+    return total / len(requests)
+
+
+async def time_requests(
+    name: str,
+    endpoint: Callable[[Request], Awaitable[Response]],
+    requests: List[Request],
+    concurrency: int,
+) -> Tuple[List[float], float]:
+    """Serves ``requests`` from ``concurrency`` tasks.
+
+    Returns the latency of every request and the elapsed wall clock time.
+    """
+    latencies: List[float] = []
+    responses: List[Response] = []
+    perf_counter = time.perf_counter
+    pending = iter(requests)
+
+    async def worker():
+        for request in pending:
+            start = perf_counter()
+            response = await endpoint(request)
+            latencies.append(perf_counter() - start)
+            responses.append(response)
+
+    gc.collect()
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = perf_counter() - started
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    for response in responses:
+        check_response(name, response)
+
+    return latencies, elapsed
+
+
+async def run_benchmark(
+    benchmark: Benchmark,
+    number: int,
+    repeat: int,
+    concurrency: int,
+    create_db: CreateDB,
+    metrics: bool = False,
+) -> Result:
+    db = await create_db()
+    endpoint = getattr(create_server(db, metrics), benchmark.endpoint)
+
+    warmup = max(1, number // 10)
+    alloc_number = max(1, min(number // 10, 500))
+    requests = await benchmark.prepare(db, warmup + number * repeat + alloc_number)
+
+    for request in requests[:warmup]:
+        check_response(benchmark.name, await endpoint(request))
+    del requests[:warmup]
+
+    # Throughput is the best of the repeats, latencies are their median.
+    ops_per_sec, p50, p99 = [], [], []
+    for _ in range(repeat):
+        timed, requests = requests[:number], requests[number:]
+        latencies, elapsed = await time_requests(
+            benchmark.name, endpoint, timed, concurrency
+        )
+        latencies.sort()
+        ops_per_sec.append(number / elapsed)
+        p50.append(percentile(latencies, 50))
+        p99.append(percentile(latencies, 99))
+
+    alloc_bytes = await measure_allocations(benchmark.name, endpoint, requests)
+
+    close = getattr(db, "close", None)
+    if close is not None:
+        await close()
+
+    return Result(
+        ops_per_sec=max(ops_per_sec),
+        p50_us=sorted(p50)[repeat // 2] * 1e6,
+        p99_us=sorted(p99)[repeat // 2] * 1e6,
+        alloc_bytes=alloc_bytes,
+    )
+
+
+def compare(
+    results: Dict[str, Result], baseline: Dict[str, Dict[str, float]], threshold: float
+) -> List[str]:
+    """Returns the descriptions of regressions against the ``baseline``."""
+    regressions = []
+
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+
+        if result.ops_per_sec < expected["ops_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {result.ops_per_sec:.0f} ops/s, "
+                f"baseline {expected['ops_per_sec']:.0f} ops/s"
+            )
+        # Tail latency is noisier than throughput, allow twice the slowdown.
+        if result.p99_us > expected["p99_us"] * (1 + 2 * threshold):
+            regressions.append(
+                f"{name}: p99 {result.p99_us:.1f} us, "
+                f"baseline {expected['p99_us']:.1f} us"
+            )
+
+    return regressions
+
+
+def print_results(
+    results: Dict[str, Result], baseline: Optional[Dict[str, Dict[str, float]]]
+) -> None:
+    print(  # noqa: T201
+        f"{'benchmark':32} {'ops/s':>10} {'p50 us':>9} {'p99 us':>9} "
+        f"{'alloc KiB':>10} {'vs base':>8}"
+    )
+    for name, result in results.items():
+        change = ""
+        if baseline and name in baseline:
+            ratio = result.ops_per_sec / baseline[name]["ops_per_sec"]
+            change = f"{ratio:7.2f}x"
+        print(  # noqa: T201
+            f"{name:32} {result.ops_per_sec:10.0f} {result.p50_us:9.1f} "
+            f"{result.p99_us:9.1f} {result.alloc_bytes / 1024:10.1f} {change:>8}"
+        )
+
+
+async def run(
+    number: int,
+    repeat: int,
+    concurrency: int,
+    only: Optional[str],
+    create_db: CreateDB,
+    metrics: bool = False,
+) -> Dict[str, Result]:
+    return {
+        benchmark.name: await run_benchmark(
+            benchmark, number, repeat, concurrency, create_db, metrics
+        )
+        for benchmark in benchmarks
+        if only is None or only in benchmark.name
+    }
+
+
+def main(argv: Optional[List[str]] = None, databases=None) -> int:
+    databases = databases or {
+        "memory": create_memory_db,
+        "sqlite": create_sqlite_db,
+    }
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="requests served at once"
+    )
+    parser.add_argument("--only", help="run benchmarks whose name contains ONLY")
+    parser.add_argument("--db", choices=sorted(databases), default="memory")
+    parser.add_argument(
+        "--metrics", action="store_true", help="serve requests with metrics enabled"
+    )
+    parser.add_argument("--save", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="relative throughput loss reported as a regression (default: 0.15)",
+    )
+    args = parser.parse_args(argv)
+
+    loop = asyncio.new_event_loop()
+    try:
+        results = loop.run_until_complete(
+            run(
+                args.number,
+                args.repeat,
+                args.concurrency,
+                args.only,
+                databases[args.db],
+                args.metrics,
+            )
+        )
+    finally:
+        loop.close()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "db": args.db,
+                    "number": args.number,
+                    "repeat": args.repeat,
+                    "concurrency": args.concurrency,
+                    "metrics": args.metrics,
+                    "results": {
+                        name: result._asdict() for name, result in results.items()
+                    },
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+            f.write("\n")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)  # noqa: T201
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
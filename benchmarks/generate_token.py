@@ -0,0 +1,47 @@
+"""Microbenchmark of ``aioauth.utils.generate_token``.
+
+Compares the current implementation, with and without an entropy pool,
+against the previous per-character ``SystemRandom.choice`` implementation.
+
+Usage:
+
+    python benchmarks/generate_token.py [--number 20000]
+"""
+import argparse
+import random
+import timeit
+
+from aioauth.utils import UNICODE_ASCII_CHARACTER_SET, EntropyPool, generate_token
+
+
+def legacy_generate_token(
+    length: int = 30, chars: str = UNICODE_ASCII_CHARACTER_SET
+) -> str:
+    rand = random.SystemRandom()
+    return "".join(rand.choice(chars) for _ in range(length))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    pool = EntropyPool()
+    candidates = {
+        "legacy SystemRandom.choice": lambda: legacy_generate_token(42),
+        "generate_token": lambda: generate_token(42),
+        "generate_token + EntropyPool": lambda: generate_token(42, pool=pool),
+    }
+
+    baseline = None
+    for name, func in candidates.items():
+        best = min(timeit.repeat(func, number=args.number, repeat=5))
+        per_call = best / args.number * 1e6
+        baseline = baseline or per_call
+        print(  # noqa: T201
+            f"{name:32} {per_call:8.2f} us/token  {baseline / per_call:6.1f}x speedup"
+        )
+
+
+if __name__ == "__main__":
+    main()
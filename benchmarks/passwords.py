@@ -0,0 +1,130 @@
+"""Benchmark of password grants against the latency of other endpoints.
+
+Runs ``--clients`` tasks issuing password grants back to back for
+``--duration`` seconds, while a probe task sends token introspection
+requests one at a time, and reports for each mode:
+
+    grants/s        password grants served per second
+    probe p50, p99  introspection latency in milliseconds
+    probe max       worst introspection latency in milliseconds
+
+Modes:
+
+    inline    passwords are verified on the event loop, the way a naive
+              ``authenticate`` implementation would
+    offload   passwords are verified by ``PasswordHasher`` in its thread pool
+
+With the hashing on the event loop, every introspection waits behind the
+password hashes in progress. Offloaded, its latency should stay flat.
+
+Usage:
+
+    python benchmarks/passwords.py [--duration 3] [--clients 8] [--workers 4]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Any, Callable, List, Optional, TypeVar
+
+from aioauth.passwords import PasswordHasher
+from aioauth.storage.memory import InMemoryDB
+from endpoints import (
+    PASSWORD,
+    USERNAME,
+    client,
+    create_server,
+    create_tokens,
+    percentile,
+    token_request,
+)
+
+T = TypeVar("T")
+
+
+class InlinePasswordHasher(PasswordHasher):
+    """Verifies passwords on the event loop, blocking it meanwhile."""
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        return func(*args)
+
+
+async def run_mode(
+    hasher: PasswordHasher, duration: float, clients: int
+) -> List[float]:
+    db = InMemoryDB(
+        clients=[client],
+        users={USERNAME: hasher.encode(PASSWORD)},
+        password_hasher=hasher,
+    )
+    server = create_server(db)
+    (token,) = await create_tokens(db, 1)
+    probe_request = token_request(token=token.access_token)
+    password_request = token_request(
+        grant_type="password", username=USERNAME, password=PASSWORD, scope="read"
+    )
+    deadline = time.perf_counter() + duration
+    grants = 0
+    latencies: List[float] = []
+
+    async def password_client():
+        nonlocal grants
+        while time.perf_counter() < deadline:
+            response = await server.create_token_response(password_request)
+            assert response.status_code == 200, response.content
+            grants += 1
+            # Yields to the event loop, like a request arriving over the network.
+            await asyncio.sleep(0)
+
+    async def probe():
+        while time.perf_counter() < deadline:
+            # A probe arrives every millisecond, its latency counts from then
+            # on, including the time it waited for the event loop.
+            arrival = time.perf_counter() + 0.001
+            await asyncio.sleep(0.001)
+            await server.create_token_introspection_response(probe_request)
+            latencies.append(time.perf_counter() - arrival)
+
+    await asyncio.gather(probe(), *[password_client() for _ in range(clients)])
+    await db.close()
+    hasher.close()
+
+    latencies.sort()
+    return [
+        grants / duration,
+        percentile(latencies, 50) * 1e3,
+        percentile(latencies, 99) * 1e3,
+        latencies[-1] * 1e3,
+    ]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--scrypt-n", type=int, default=2 ** 14)
+    args = parser.parse_args(argv)
+
+    print(  # noqa: T201
+        f"{'mode':10} {'grants/s':>10} {'probe p50':>10} {'probe p99':>10} "
+        f"{'probe max':>10}"
+    )
+    for mode, cls in [("inline", InlinePasswordHasher), ("offload", PasswordHasher)]:
+        hasher = cls(workers=args.workers, scrypt_n=args.scrypt_n)
+        loop = asyncio.new_event_loop()
+        try:
+            grants, p50, p99, worst = loop.run_until_complete(
+                run_mode(hasher, args.duration, args.clients)
+            )
+        finally:
+            loop.close()
+        print(  # noqa: T201
+            f"{mode:10} {grants:10.0f} {p50:10.2f} {p99:10.2f} {worst:10.2f}"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
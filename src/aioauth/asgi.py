@@ -0,0 +1,265 @@
+from http import HTTPStatus
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    MutableMapping,
+    Optional,
+    Tuple,
+    Type,
+)
+from urllib.parse import parse_qsl
+
+from .config import Settings
+from .constances import default_headers
+from .errors import MethodNotAllowedError, RequestEntityTooLargeError
+from .requests import Post, Query, Request
+from .responses import Response
+from .server import AuthorizationServer
+from .structures import CaseInsensitiveDict, RawHeaders
+from .types import CodeChallengeMethod, GrantType, RequestMethod, ResponseType
+from .utils import error_response
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+FORM_CONTENT_TYPE = "application/x-www-form-urlencoded"
+DEFAULT_SETTINGS = Settings()
+
+# Request parameters converted to enums, unknown values are kept as is,
+# so that aioauth reports them with the proper OAuth 2.0 error.
+ENUM_FIELDS: Dict[str, Type[Any]] = {
+    "response_type": ResponseType,
+    "code_challenge_method": CodeChallengeMethod,
+    "grant_type": GrantType,
+}
+
+default_routes = {
+    "/authorize": "create_authorization_response",
+    "/token": "create_token_response",
+    "/introspect": "create_token_introspection_response",
+    "/introspect/batch": "create_token_batch_introspection_response",
+}
+
+
+class RequestBodyTooLarge(Exception):
+    pass
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def _parse_params(
+    data: str, fields: Tuple[str, ...]
+) -> Tuple[Dict[str, Any], List[str]]:
+    """Returns known parameters (first value wins) and all ``token`` values."""
+    params: Dict[str, Any] = {}
+    tokens: List[str] = []
+
+    for key, value in parse_qsl(data):
+        if key == "token":
+            tokens.append(value)
+
+        if key not in fields or key in params:
+            continue
+
+        enum = ENUM_FIELDS.get(key)
+        if enum is not None:
+            try:
+                value = enum(value)
+            except ValueError:
+                pass
+
+        params[key] = value
+
+    return params, tokens
+
+
+def parse_query(query_string: bytes) -> Query:
+    params, _ = _parse_params(query_string.decode("latin-1"), Query._fields)
+    return Query(**params)
+
+
+def parse_post(body: bytes) -> Post:
+    params, tokens = _parse_params(body.decode("latin-1"), Post._fields)
+    params.pop("tokens", None)
+    return Post(tokens=tokens or None, **params)
+
+
+def get_user(scope: Scope) -> Optional[Any]:
+    """Returns the user authenticated by an ASGI middleware, if any."""
+    user = scope.get("user")
+
+    if getattr(user, "is_authenticated", True) is False:
+        return None
+
+    return user
+
+
+async def read_body(receive: Receive, max_body_size: int) -> bytes:
+    """Reads the request body, raising ``RequestBodyTooLarge`` early and
+    ``ClientDisconnected`` if the client goes away before sending it all.
+    """
+    chunks = []
+    size = 0
+    more_body = True
+
+    while more_body:
+        message = await receive()
+
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnected()
+
+        chunk = message.get("body", b"")
+        size += len(chunk)
+
+        if size > max_body_size:
+            raise RequestBodyTooLarge()
+
+        chunks.append(chunk)
+        more_body = message.get("more_body", False)
+
+    return b"".join(chunks)
+
+
+def build_request(
+    scope: Scope,
+    body: bytes = b"",
+    settings: Settings = DEFAULT_SETTINGS,
+    user: Optional[Any] = None,
+) -> Request:
+    headers = RawHeaders(scope.get("headers", []))
+    host = headers.get("host")
+
+    if host is None:
+        server = scope.get("server")
+        host = f"{server[0]}:{server[1]}" if server else ""
+
+    path = scope.get("root_path", "") + scope["path"]
+    url = f"{scope.get('scheme', 'http')}://{host}{path}"
+    post = Post()
+
+    if body:
+        content_type = headers.get("content-type", "")
+        if content_type.partition(";")[0].strip().lower() == FORM_CONTENT_TYPE:
+            post = parse_post(body)
+
+    return Request(
+        method=RequestMethod(scope["method"]),
+        headers=headers,
+        query=parse_query(scope.get("query_string", b"")),
+        post=post,
+        url=url,
+        user=user,
+        settings=settings,
+        remote_addr=scope["client"][0] if scope.get("client") else None,
+    )
+
+
+async def send_response(send: Send, response: Response) -> None:
+    body = response.body
+    headers = [
+        header for header in response.raw_headers if header[0] != b"content-length"
+    ]
+    headers.append((b"content-length", str(len(body)).encode("latin-1")))
+
+    await send(
+        {
+            "type": "http.response.start",
+            "status": int(response.status_code),
+            "headers": headers,
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class ASGIApplication:
+    """ASGI 3 application dispatching requests to ``AuthorizationServer``.
+
+    Builds aioauth requests straight from the ASGI scope and body, without
+    any web framework in between:
+
+        app = ASGIApplication(AuthorizationServer(db=DB()), settings=Settings())
+
+    ``routes`` maps request paths to names of ``AuthorizationServer``
+    endpoint methods. ``get_user`` extracts the authenticated resource owner
+    from the ASGI scope, which is required by the authorization endpoint.
+    """
+
+    def __init__(
+        self,
+        server: AuthorizationServer,
+        settings: Settings = DEFAULT_SETTINGS,
+        routes: Optional[Dict[str, str]] = None,
+        max_body_size: int = 64 * 1024,
+        get_user: Callable[[Scope], Optional[Any]] = get_user,
+    ):
+        self.server = server
+        self.settings = settings
+        self.max_body_size = max_body_size
+        self.get_user = get_user
+        self.endpoints: Dict[str, Callable[[Request], Awaitable[Response]]] = {
+            path: getattr(server, name)
+            for path, name in (default_routes if routes is None else routes).items()
+        }
+        self.allowed_methods = [method.value for method in RequestMethod]
+
+        # Responses that do not depend on the request are built once.
+        self.not_found_response = Response(status_code=HTTPStatus.NOT_FOUND)
+        self.method_not_allowed_headers = CaseInsensitiveDict(
+            {**default_headers, "allow": ", ".join(self.allowed_methods)}
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        try:
+            response = await self.handle(scope, receive)
+        except ClientDisconnected:
+            # A truncated body is not processed, there is no one to answer.
+            return
+
+        await send_response(send, response)
+
+    async def handle(self, scope: Scope, receive: Receive) -> Response:
+        endpoint = self.endpoints.get(scope["path"])
+
+        if endpoint is None:
+            return self.not_found_response
+
+        if scope["method"] not in self.allowed_methods:
+            return error_response(
+                MethodNotAllowedError(
+                    request=Request(method=scope["method"], settings=self.settings),
+                    headers=self.method_not_allowed_headers.copy(),
+                )
+            )
+
+        try:
+            body = await read_body(receive, self.max_body_size)
+        except RequestBodyTooLarge:
+            request = Request(method=scope["method"], settings=self.settings)
+            return error_response(RequestEntityTooLargeError(request=request))
+
+        request = build_request(scope, body, self.settings, self.get_user(scope))
+        return await endpoint(request)
+
+    async def lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
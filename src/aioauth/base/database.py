@@ -1,13 +1,43 @@
+import asyncio
+import hmac
 import time
-from typing import Optional
+from typing import TYPE_CHECKING, Any, List, Optional
 
 from ..models import AuthorizationCode, Client, Token
+from ..passwords import PasswordHasher
 from ..requests import Request
+from ..scopes import scope_registry
+from ..signing import TokenSigner
 from ..types import CodeChallengeMethod, ResponseType
-from ..utils import generate_token
+from ..utils import EntropyPool, generate_token
+
+if TYPE_CHECKING:  # pragma: no cover
+    # client_secrets imports this module through the cache module.
+    from ..client_secrets import ClientSecretVerifier
+
+
+def _rotated_scope(scope: str, requested: Optional[str]) -> str:
+    # The new token has at most the scope of the old one
+    # (see https://www.oauth.com/oauth2-servers/making-authenticated-requests/refreshing-an-access-token/)
+    if not requested:
+        return scope
+    return scope_registry.intersection(scope, requested)
 
 
 class BaseDB:
+    # When set, access tokens are issued as self-contained signed tokens
+    # that can be introspected without a database lookup.
+    token_signer: Optional[TokenSigner] = None
+    # When set, generated tokens and codes draw their randomness from this
+    # pool instead of issuing an os.urandom call each.
+    entropy_pool: Optional[EntropyPool] = None
+    # When set, user passwords are stored hashed and verified by this
+    # hasher off the event loop.
+    password_hasher: Optional[PasswordHasher] = None
+    # When set, client secrets are stored hashed and verified by this
+    # verifier off the event loop.
+    client_secret_verifier: Optional["ClientSecretVerifier"] = None
+
     async def create_token(self, request: Request, client_id: str, scope: str) -> Token:
         """Generates Token model instance.
 
@@ -17,12 +47,28 @@ class BaseDB:
         Method is used by response types:
             - ResponseTypeToken
         """
+        return self._new_token(request, client_id, scope)
+
+    def _new_token(self, request: Request, client_id: str, scope: str) -> Token:
+        # Never yields, backends may call it from within a transaction.
+        issued_at = int(time.time())
+        expires_in = request.settings.TOKEN_EXPIRES_IN
+
+        token_signer = request.token_signer
+        if token_signer is None:
+            token_signer = self.token_signer
+
+        if token_signer is not None:
+            access_token = token_signer.sign(client_id, scope, issued_at, expires_in)
+        else:
+            access_token = generate_token(42, pool=self.entropy_pool)
+
         return Token(
             client_id=client_id,
-            expires_in=request.settings.TOKEN_EXPIRES_IN,
-            access_token=generate_token(42),
-            refresh_token=generate_token(48),
-            issued_at=int(time.time()),
+            expires_in=expires_in,
+            access_token=access_token,
+            refresh_token=generate_token(48, pool=self.entropy_pool),
+            issued_at=issued_at,
             scope=scope,
             revoked=False,
         )
@@ -43,6 +89,48 @@ class BaseDB:
         """
         raise NotImplementedError("Method get_token must be implemented")
 
+    async def get_tokens(
+        self, request: Request, client_id: str, access_tokens: List[str]
+    ) -> List[Optional[Token]]:
+        """Gets existing tokens from the database in one call.
+
+        Returns a list of the same length and order as ``access_tokens``,
+        holding None for every token that doesn't exist.
+        The default implementation issues concurrent ``get_token`` calls,
+        backends should override it with a single bulk query.
+
+        Method is used by:
+            - create_token_batch_introspection_response
+        """
+        return list(
+            await asyncio.gather(
+                *[
+                    self.get_token(
+                        request=request, client_id=client_id, access_token=token
+                    )
+                    for token in access_tokens
+                ]
+            )
+        )
+
+    async def is_token_revoked(
+        self, request: Request, client_id: str, access_token: str
+    ) -> bool:
+        """Checks whether a signed access token was revoked.
+
+        Signed tokens are verified in-process, so this is the only storage
+        access made when introspecting them. The default implementation
+        falls back to ``get_token``, backends may override it with a cheaper
+        revocation list lookup.
+
+        Method is used by:
+            - create_token_introspection_response
+        """
+        token = await self.get_token(
+            request=request, client_id=client_id, access_token=access_token
+        )
+        return token is None or token.revoked
+
     async def create_authorization_code(
         self,
         request: Request,
@@ -61,7 +149,7 @@ class BaseDB:
             - ResponseTypeAuthorizationCode
         """
         return AuthorizationCode(
-            code=generate_token(48),
+            code=generate_token(48, pool=self.entropy_pool),
             client_id=client_id,
             redirect_uri=redirect_uri,
             response_type=response_type,
@@ -79,14 +167,40 @@ class BaseDB:
         If client doesn't exists in database this method MUST return None
         to indicate to the validator that the requested ``client_id`` does not exist or is invalid.
 
+        When ``client_secret`` is given, it MUST be checked too, and None
+        returned if it doesn't match. ``verify_client_secret`` does so,
+        hashed secrets included.
+
         Method is used by all core grant types.
         Method is used by all core response types.
         """
         raise NotImplementedError("Method get_client must be implemented")
 
+    async def verify_client_secret(
+        self, request: Request, client: Client, client_secret: str
+    ) -> bool:
+        """Checks ``client_secret`` against the secret stored on ``client``.
+
+        Hashed secrets are verified by ``client_secret_verifier``, which may
+        raise ``PasswordHasherOverloaded``. Without one, secrets are compared
+        as plain text in constant time.
+
+        Method is used by all core grant types.
+        """
+        if self.client_secret_verifier is not None:
+            return await self.client_secret_verifier.verify(client, client_secret)
+
+        return hmac.compare_digest(
+            (client.client_secret or "").encode("utf-8"), client_secret.encode("utf-8")
+        )
+
     async def authenticate(self, request: Request) -> bool:
         """Authenticate user.
 
+        Implementations hashing passwords should verify them with
+        ``password_hasher.verify``, which may raise
+        ``PasswordHasherOverloaded``.
+
         Method is used by grant types:
             - PasswordGrantType
         """
@@ -119,6 +233,28 @@ class BaseDB:
             "Method delete_authorization_code must be implemented for AuthorizationCodeGrantType"
         )
 
+    async def consume_authorization_code(
+        self, request: Request, client_id: str, code: str
+    ) -> Optional[AuthorizationCode]:
+        """Gets existing AuthorizationCode and deletes it from database.
+
+        Returns None if the authorization code doesn't exist. A code MUST be
+        returned to one caller only, so that it can't be redeemed twice.
+        The default implementation calls ``get_authorization_code`` and
+        ``delete_authorization_code``, which is atomic only if neither of
+        them yields to the event loop. Backends should override it with a
+        single atomic operation.
+
+        Method is used by grant types:
+            - AuthorizationCodeGrantType
+        """
+        authorization_code = await self.get_authorization_code(request, client_id, code)
+
+        if authorization_code is not None:
+            await self.delete_authorization_code(request, client_id, code)
+
+        return authorization_code
+
     async def revoke_token(self, request: Request, refresh_token: str) -> None:
         """Revokes token in database.
 
@@ -130,3 +266,184 @@ class BaseDB:
         raise NotImplementedError(
             "Method revoke_token must be implemented for RefreshTokenGrantType"
         )
+
+    async def rotate_refresh_token(
+        self,
+        request: Request,
+        client_id: str,
+        refresh_token: str,
+        scope: Optional[str] = None,
+    ) -> Optional[Token]:
+        """Revokes the token of ``refresh_token`` and creates its successor.
+
+        The new token has the scope of the old one, narrowed down to
+        ``scope`` if given. Returns None if the token doesn't exist, is
+        revoked or its refresh token expired. A token MUST be rotated by
+        one caller only. The default implementation calls ``get_token``,
+        ``revoke_token`` and ``create_token``, backends should override it
+        with a single transaction.
+
+        Method is used by grant types:
+            - RefreshTokenGrantType
+        """
+        old_token = await self.get_token(
+            request=request, client_id=client_id, refresh_token=refresh_token
+        )
+
+        if not old_token or old_token.revoked or old_token.refresh_token_expired:
+            return None
+
+        await self.revoke_token(request=request, refresh_token=refresh_token)
+        return await self.create_token(
+            request, client_id, _rotated_scope(old_token.scope, scope)
+        )
+
+
+class ProxyDB(BaseDB):
+    """Forwards every call to the wrapped database.
+
+    Base class for layers (caches, instrumentation) that wrap an existing
+    ``BaseDB`` implementation and only override the methods they change.
+    The configuration attributes of ``BaseDB`` (``token_signer``,
+    ``entropy_pool``, ``password_hasher``, ``client_secret_verifier``) are
+    read from and assigned to the wrapped database, attributes ``BaseDB``
+    doesn't define, like ``close`` or ``add_client`` of a backend, are
+    looked up on it.
+    """
+
+    def __init__(self, db: BaseDB):
+        self.db = db
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for names not found on the layer itself. "db" is
+        # missing before __init__ ran, e.g. while copying or unpickling.
+        if name == "db":
+            raise AttributeError(name)
+        return getattr(self.db, name)
+
+    @property  # type: ignore
+    def token_signer(self) -> Optional[TokenSigner]:  # type: ignore
+        return self.db.token_signer
+
+    @token_signer.setter
+    def token_signer(self, token_signer: Optional[TokenSigner]):
+        self.db.token_signer = token_signer
+
+    @property  # type: ignore
+    def entropy_pool(self) -> Optional[EntropyPool]:  # type: ignore
+        return self.db.entropy_pool
+
+    @entropy_pool.setter
+    def entropy_pool(self, entropy_pool: Optional[EntropyPool]):
+        self.db.entropy_pool = entropy_pool
+
+    @property  # type: ignore
+    def password_hasher(self) -> Optional[PasswordHasher]:  # type: ignore
+        return self.db.password_hasher
+
+    @password_hasher.setter
+    def password_hasher(self, password_hasher: Optional[PasswordHasher]):
+        self.db.password_hasher = password_hasher
+
+    @property  # type: ignore
+    def client_secret_verifier(  # type: ignore
+        self,
+    ) -> Optional["ClientSecretVerifier"]:
+        return self.db.client_secret_verifier
+
+    @client_secret_verifier.setter
+    def client_secret_verifier(
+        self, client_secret_verifier: Optional["ClientSecretVerifier"]
+    ):
+        self.db.client_secret_verifier = client_secret_verifier
+
+    async def create_token(self, request: Request, client_id: str, scope: str) -> Token:
+        return await self.db.create_token(request, client_id, scope)
+
+    async def get_token(
+        self,
+        request: Request,
+        client_id: str,
+        access_token: Optional[str] = None,
+        refresh_token: Optional[str] = None,
+    ) -> Optional[Token]:
+        return await self.db.get_token(
+            request=request,
+            client_id=client_id,
+            access_token=access_token,
+            refresh_token=refresh_token,
+        )
+
+    async def get_tokens(
+        self, request: Request, client_id: str, access_tokens: List[str]
+    ) -> List[Optional[Token]]:
+        return await self.db.get_tokens(request, client_id, access_tokens)
+
+    async def is_token_revoked(
+        self, request: Request, client_id: str, access_token: str
+    ) -> bool:
+        return await self.db.is_token_revoked(request, client_id, access_token)
+
+    async def create_authorization_code(
+        self,
+        request: Request,
+        client_id: str,
+        scope: str,
+        response_type: ResponseType,
+        redirect_uri: str,
+        code_challenge_method: CodeChallengeMethod,
+        code_challenge: str,
+    ) -> AuthorizationCode:
+        return await self.db.create_authorization_code(
+            request,
+            client_id,
+            scope,
+            response_type,
+            redirect_uri,
+            code_challenge_method,
+            code_challenge,
+        )
+
+    async def get_client(
+        self, request: Request, client_id: str, client_secret: Optional[str] = None
+    ) -> Optional[Client]:
+        return await self.db.get_client(
+            request=request, client_id=client_id, client_secret=client_secret
+        )
+
+    async def verify_client_secret(
+        self, request: Request, client: Client, client_secret: str
+    ) -> bool:
+        return await self.db.verify_client_secret(request, client, client_secret)
+
+    async def authenticate(self, request: Request) -> bool:
+        return await self.db.authenticate(request)
+
+    async def get_authorization_code(
+        self, request: Request, client_id: str, code: str
+    ) -> Optional[AuthorizationCode]:
+        return await self.db.get_authorization_code(request, client_id, code)
+
+    async def delete_authorization_code(
+        self, request: Request, client_id: str, code: str
+    ) -> None:
+        await self.db.delete_authorization_code(request, client_id, code)
+
+    async def consume_authorization_code(
+        self, request: Request, client_id: str, code: str
+    ) -> Optional[AuthorizationCode]:
+        return await self.db.consume_authorization_code(request, client_id, code)
+
+    async def revoke_token(self, request: Request, refresh_token: str) -> None:
+        await self.db.revoke_token(request=request, refresh_token=refresh_token)
+
+    async def rotate_refresh_token(
+        self,
+        request: Request,
+        client_id: str,
+        refresh_token: str,
+        scope: Optional[str] = None,
+    ) -> Optional[Token]:
+        return await self.db.rotate_refresh_token(
+            request, client_id, refresh_token, scope
+        )
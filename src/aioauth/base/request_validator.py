@@ -1,8 +1,11 @@
+from typing import Any
+
 from aioauth.structures import CaseInsensitiveDict
 
 from ..constances import default_headers
 from ..errors import InsecureTransportError, MethodNotAllowedError
 from ..requests import Request
+from ..tracing import noop_span
 from ..types import RequestMethod
 from ..utils import is_secure_transport
 from .database import BaseDB
@@ -16,13 +19,23 @@ class BaseRequestValidator:
 
     def __init__(self, db: BaseDB):
         self.db = db
+        self.method_not_allowed_headers = CaseInsensitiveDict(
+            {**default_headers, "allow": ", ".join(self.allowed_methods)}
+        )
+
+    def span(self, request: Request, name: str) -> Any:
+        """Returns a context manager recording ``name`` as a span of the
+        request's trace, doing nothing if the request is not traced.
+        """
+        if request.trace is None:
+            return noop_span
+        return request.trace.span(f"{type(self).__name__}.{name}")
 
     async def validate_request(self, request: Request):
         if not is_secure_transport(request):
             raise InsecureTransportError(request=request)
 
         if request.method not in self.allowed_methods:
-            headers = CaseInsensitiveDict(
-                {**default_headers, "allow": ", ".join(self.allowed_methods)}
+            raise MethodNotAllowedError(
+                request=request, headers=self.method_not_allowed_headers.copy()
             )
-            raise MethodNotAllowedError(request=request, headers=headers)
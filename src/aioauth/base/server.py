@@ -1,5 +1,7 @@
-from typing import Dict, Optional, Type, Union
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Type, Union
 
+from ..deadline import DeadlineDB
 from ..grant_type import (
     AuthorizationCodeGrantType,
     ClientCredentialsGrantType,
@@ -7,11 +9,16 @@ from ..grant_type import (
     PasswordGrantType,
     RefreshTokenGrantType,
 )
+from ..loadshed import LoadShedder
+from ..metrics import Metrics, MetricsDB
+from ..ratelimit import RateLimiter
 from ..response_type import (
     ResponseTypeAuthorizationCode,
     ResponseTypeBase,
     ResponseTypeToken,
 )
+from ..signing import TokenSigner
+from ..tracing import Tracer, TracingDB
 from ..types import EndpointType, GrantType, ResponseType
 from .database import BaseDB
 
@@ -28,8 +35,71 @@ class BaseAuthorizationServer:
         GrantType.TYPE_REFRESH_TOKEN: RefreshTokenGrantType,
     }
 
-    def __init__(self, db: BaseDB):
+    def __init__(
+        self,
+        db: BaseDB,
+        token_signer: Optional[TokenSigner] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        load_shedder: Optional[LoadShedder] = None,
+        metrics: Optional[Metrics] = None,
+        tracer: Optional[Tracer] = None,
+        request_timeout: Optional[float] = None,
+    ):
+        # Endpoint calls are recorded by catch_errors_and_unavailability,
+        # database calls by the MetricsDB and TracingDB layers.
+        self.metrics = metrics
+        self.tracer = tracer
+        # Seconds a request may spend waiting on the database. Without it,
+        # the database is not wrapped and deadlines are not enforced.
+        self.request_timeout = request_timeout
+
+        # The layer of another server is replaced, to count in these metrics.
+        if request_timeout is not None:
+            if isinstance(db, DeadlineDB):
+                db = db.db
+            db = DeadlineDB(
+                db, None if metrics is None else metrics.db_deadline_expirations
+            )
+        if metrics is not None:
+            db = MetricsDB(db, metrics)
+        if tracer is not None:
+            db = TracingDB(db)
+
         self.db = db
+        # Checked by the token endpoint before any database access.
+        self.rate_limiter = rate_limiter
+        # Checked by every endpoint, before any other processing.
+        self.load_shedder = load_shedder
+
+        # Passed to the database with every request, the database itself
+        # is left as is, it may be shared with servers that don't sign.
+        if token_signer is None:
+            token_signer = self.db.token_signer
+        self.token_signer = token_signer
+
+        # Per-instance copies, so registrations never leak between servers.
+        self.response_type = dict(self.response_type)
+        self.grant_type = dict(self.grant_type)
+        self.build_handlers()
+
+    def build_handlers(self):
+        """Instantiates the registered endpoint classes once.
+
+        Handlers hold no per-request state, so a request is dispatched with a
+        single lookup in these read-only tables.
+        """
+        self.response_type_handlers: Mapping[
+            Optional[ResponseType], ResponseTypeBase
+        ] = MappingProxyType(
+            {key: cls(db=self.db) for key, cls in self.response_type.items()}
+        )
+        self.grant_type_handlers: Mapping[
+            Optional[GrantType], GrantTypeBase
+        ] = MappingProxyType(
+            {key: cls(db=self.db) for key, cls in self.grant_type.items()}
+        )
+        self.default_response_type_handler = ResponseTypeBase(db=self.db)
+        self.default_grant_type_handler = GrantTypeBase(db=self.db)
 
     def register(
         self,
@@ -39,9 +109,11 @@ class BaseAuthorizationServer:
     ):
         endpoint_dict = getattr(self, endpoint_type)
         endpoint_dict[server] = endpoint_cls
+        self.build_handlers()
 
     def unregister(
         self, endpoint_type: EndpointType, server: Union[ResponseType, GrantType]
     ):
         endpoint_dict = getattr(self, endpoint_type)
         del endpoint_dict[server]
+        self.build_handlers()
@@ -0,0 +1,320 @@
+import asyncio
+import functools
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Set, Tuple
+
+from .base.database import BaseDB, ProxyDB
+from .models import Client, Token
+from .requests import Request
+from .utils import get_running_loop
+
+_MISSING = object()
+
+
+def _retrieve_exception(future: "asyncio.Future[Any]") -> None:
+    # Marks the exception as retrieved when no caller was left to await it.
+    if not future.cancelled():
+        future.exception()
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    size: int
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire after a time-to-live.
+
+    ``on_evict`` is called with ``(key, value)`` for every entry dropped
+    because the cache was full or the entry expired.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 60.0,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive.")
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+
+        if expires_at <= self.clock():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            if self.on_evict is not None:
+                self.on_evict(key, value)
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    # Pairs with get, like the mapping methods, shadowing the builtin is fine.
+    def set(  # noqa: A003
+        self, key: Hashable, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        if ttl is None:
+            ttl = self.ttl
+
+        if ttl <= 0:
+            self.pop(key)
+            return
+
+        self._data[key] = (self.clock() + ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_entries:
+            evicted_key, (_, evicted) = self._data.popitem(last=False)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(evicted_key, evicted)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            expirations=self.expirations,
+            size=len(self._data),
+        )
+
+
+TokenCacheKey = Tuple[str, Optional[str], Optional[str]]
+
+
+class TokenCacheDB(ProxyDB):
+    """Caches ``get_token`` lookups of the wrapped database.
+
+    Entries live for at most ``ttl`` seconds and never beyond the expiration
+    of the cached access token. Entries are dropped as soon as the token is
+    revoked through ``revoke_token`` or ``rotate_refresh_token``. Revocations
+    made directly in the backend storage become visible once the cached
+    entry expires.
+    """
+
+    def __init__(self, db: BaseDB, max_entries: int = 10000, ttl: float = 60.0):
+        super().__init__(db)
+        self.cache = TTLCache(
+            max_entries=max_entries, ttl=ttl, on_evict=self._forget_key
+        )
+        self._keys_by_refresh_token: Dict[str, Set[TokenCacheKey]] = {}
+        # Bumped on every revocation so lookups that were in flight while a
+        # token got revoked don't put the stale record back into the cache.
+        self._revocations = 0
+
+    def _forget_key(self, key: Hashable, token: Token) -> None:
+        keys = self._keys_by_refresh_token.get(token.refresh_token)
+        if keys is not None:
+            keys.discard(key)  # type: ignore
+            if not keys:
+                del self._keys_by_refresh_token[token.refresh_token]
+
+    def _cache_token(self, key: TokenCacheKey, token: Token) -> None:
+        ttl = min(self.cache.ttl, token.token_expires_in - time.time())
+        if ttl <= 0:
+            return
+
+        self.cache.set(key, token, ttl=ttl)
+        self._keys_by_refresh_token.setdefault(token.refresh_token, set()).add(key)
+
+    def invalidate(self, refresh_token: str) -> None:
+        """Drops every cached lookup of the token with given refresh token."""
+        for key in self._keys_by_refresh_token.pop(refresh_token, ()):
+            self.cache.pop(key)
+
+    async def get_token(
+        self,
+        request: Request,
+        client_id: str,
+        access_token: Optional[str] = None,
+        refresh_token: Optional[str] = None,
+    ) -> Optional[Token]:
+        key = (client_id, access_token, refresh_token)
+        token = self.cache.get(key)
+
+        if token is not None:
+            return token
+
+        revocations = self._revocations
+        token = await super().get_token(
+            request=request,
+            client_id=client_id,
+            access_token=access_token,
+            refresh_token=refresh_token,
+        )
+
+        if token is not None and revocations == self._revocations:
+            self._cache_token(key, token)
+
+        return token
+
+    async def get_tokens(
+        self, request: Request, client_id: str, access_tokens: List[str]
+    ) -> List[Optional[Token]]:
+        tokens: List[Optional[Token]] = [
+            self.cache.get((client_id, access_token, None))
+            for access_token in access_tokens
+        ]
+        missing = [index for index, token in enumerate(tokens) if token is None]
+
+        if not missing:
+            return tokens
+
+        revocations = self._revocations
+        loaded = await super().get_tokens(
+            request, client_id, [access_tokens[index] for index in missing]
+        )
+
+        for index, token in zip(missing, loaded):
+            tokens[index] = token
+            if token is not None and revocations == self._revocations:
+                self._cache_token((client_id, access_tokens[index], None), token)
+
+        return tokens
+
+    async def revoke_token(self, request: Request, refresh_token: str) -> None:
+        try:
+            await super().revoke_token(request=request, refresh_token=refresh_token)
+        finally:
+            self._revocations += 1
+            self.invalidate(refresh_token)
+
+    async def rotate_refresh_token(
+        self,
+        request: Request,
+        client_id: str,
+        refresh_token: str,
+        scope: Optional[str] = None,
+    ) -> Optional[Token]:
+        try:
+            return await super().rotate_refresh_token(
+                request, client_id, refresh_token, scope
+            )
+        finally:
+            self._revocations += 1
+            self.invalidate(refresh_token)
+
+
+class ClientCacheDB(ProxyDB):
+    """Caches ``get_client`` lookups of the wrapped database.
+
+    Clients are loaded from the backend by ``client_id`` only, compiled
+    (see ``CompiledClient``) and cached for ``ttl`` seconds, unknown
+    ``client_id`` values are remembered for ``negative_ttl`` seconds.
+    Concurrent lookups of the same client share a single backend call.
+    When ``client_secret`` is given it is checked against the cached
+    record by ``verify_client_secret``.
+    """
+
+    def __init__(
+        self,
+        db: BaseDB,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        negative_ttl: float = 5.0,
+    ):
+        super().__init__(db)
+        self.cache = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.negative_ttl = negative_ttl
+        self._pending: Dict[str, "asyncio.Task[Optional[Client]]"] = {}
+
+    def invalidate(self, client_id: str) -> None:
+        self.cache.pop(client_id)
+
+    async def _load_client(self, request: Request, client_id: str) -> Optional[Client]:
+        while True:
+            client = self.cache.get(client_id, _MISSING)
+
+            if client is not _MISSING:
+                return client
+
+            pending = self._pending.get(client_id)
+
+            if pending is None or pending.done():
+                # The lookup runs in a task of its own, shared by every caller,
+                # which asyncio.wait doesn't cancel with a cancelled caller.
+                # The task is forgotten once done, even if it never ran.
+                pending = get_running_loop().create_task(
+                    self._fetch_client(request, client_id)
+                )
+                pending.add_done_callback(_retrieve_exception)
+                pending.add_done_callback(
+                    functools.partial(self._forget_pending, client_id)
+                )
+                self._pending[client_id] = pending
+
+            # Raises CancelledError only if this caller is cancelled.
+            await asyncio.wait((pending,))
+
+            if not pending.cancelled():
+                return pending.result()
+            # The lookup itself was cancelled, by whoever ran it. This caller
+            # was not, it looks the client up again.
+
+    def _forget_pending(
+        self, client_id: str, task: "asyncio.Task[Optional[Client]]"
+    ) -> None:
+        if self._pending.get(client_id) is task:
+            del self._pending[client_id]
+
+    async def _fetch_client(self, request: Request, client_id: str) -> Optional[Client]:
+        client = await super().get_client(request=request, client_id=client_id)
+
+        if client is not None:
+            client = client.compile()
+
+        self.cache.set(
+            client_id, client, ttl=self.cache.ttl if client else self.negative_ttl
+        )
+        return client
+
+    async def get_client(
+        self, request: Request, client_id: str, client_secret: Optional[str] = None
+    ) -> Optional[Client]:
+        client = await self._load_client(request, client_id)
+
+        if client is None or client_secret is None:
+            return client
+
+        if not await self.verify_client_secret(request, client, client_secret):
+            return None
+
+        return client
@@ -0,0 +1,67 @@
+import hashlib
+import hmac
+import time
+from typing import Callable, Optional
+
+from .cache import TTLCache
+from .models import Client
+from .passwords import PasswordHasher, is_password_hash
+
+
+class ClientSecretVerifier:
+    """Verifies client secrets stored hashed in ``Client.client_secret``.
+
+    Secrets hashed with ``PasswordHasher.encode`` are verified by ``hasher``
+    in its thread pool. Successful verifications are remembered for ``ttl``
+    seconds, keyed by client id and a SHA-256 digest of the presented
+    secret and the stored hash, so clients authenticating on every request
+    pay for the key derivation once per ``ttl``. A new stored hash leaves
+    the cached verifications of the old one unreachable, failed
+    verifications are never cached.
+
+    Secrets stored in plain text, by clients registered before secrets
+    were hashed, are compared in constant time.
+
+        verifier = ClientSecretVerifier()
+        client = Client(client_id="id", client_secret=verifier.hasher.encode("secret"))
+        db = InMemoryDB(clients=[client], client_secret_verifier=verifier)
+    """
+
+    def __init__(
+        self,
+        hasher: Optional[PasswordHasher] = None,
+        ttl: float = 60.0,
+        max_entries: int = 4096,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.hasher = hasher if hasher is not None else PasswordHasher()
+        self.cache = TTLCache(max_entries=max_entries, ttl=ttl, clock=clock)
+
+    # Same name as PasswordHasher.hash, which it forwards to.
+    async def hash(self, client_secret: str) -> str:  # noqa: A003
+        return await self.hasher.hash(client_secret)
+
+    async def verify(self, client: Client, client_secret: str) -> bool:
+        """Checks ``client_secret``, may raise ``PasswordHasherOverloaded``."""
+        stored = client.client_secret or ""
+
+        if not is_password_hash(stored):
+            return hmac.compare_digest(
+                stored.encode("utf-8"), client_secret.encode("utf-8")
+            )
+
+        digest = hashlib.sha256(f"{stored}\0{client_secret}".encode("utf-8"))
+        key = (client.client_id, digest.digest())
+
+        if self.cache.get(key, False):
+            return True
+
+        verified = await self.hasher.verify(client_secret, stored)
+
+        if verified:
+            self.cache.set(key, True)
+
+        return verified
+
+    def close(self) -> None:
+        self.hasher.close()
@@ -14,3 +14,15 @@ default_headers = CaseInsensitiveDict(
         "Pragma": "no-cache",
     }
 )
+
+"""
+Sent with invalid_client errors, when the client failed the HTTP Basic
+authentication.
+"""
+basic_auth_headers = CaseInsensitiveDict({"WWW-Authenticate": "Basic"})
+
+"""
+Sent with temporarily_unavailable errors of an overloaded server, asks
+the client to retry after a second.
+"""
+retry_after_headers = CaseInsensitiveDict({**default_headers, "Retry-After": "1"})
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from typing import Any, Optional, Set
+
+from .base.database import BaseDB, ProxyDB
+from .errors import DeadlineExceededError
+from .metrics import Counter, deadline_expirations_counter
+from .utils import get_running_loop
+
+try:
+    _current_task = asyncio.current_task
+except AttributeError:  # Python 3.6
+    _current_task = asyncio.Task.current_task
+
+# Tasks inside a bounded call, the calls they make through other DeadlineDB
+# layers are covered by the outermost one and are not bounded twice.
+_bounded_tasks: Set["asyncio.Task[Any]"] = set()
+
+WRITE_METHODS = frozenset(
+    {
+        "create_token",
+        "create_authorization_code",
+        "delete_authorization_code",
+        "consume_authorization_code",
+        "revoke_token",
+        "rotate_refresh_token",
+    }
+)
+
+
+class DeadlineDB(ProxyDB):
+    """Bounds every call made to the wrapped database by the deadline of
+    the request it is made for.
+
+    A call of a request with a ``deadline`` (see ``Request.deadline``, set
+    by servers created with a ``request_timeout``) waits at most until
+    then, after which it is cancelled and ``DeadlineExceededError`` raised.
+    Calls made past the deadline fail right away. Calls of requests without
+    a deadline are not bounded. Expired calls are counted in
+    ``expirations`` by method name.
+
+    Methods in ``WRITE_METHODS`` are only checked against the deadline
+    before they start, once running they are never bounded. Cancelling a
+    call stops the awaiting coroutine, not work a backend runs in a
+    thread, like ``SQLiteDB`` queries, so a request never answers 503 for a
+    code it consumed or a token it rotated.
+
+    Like ``asyncio.wait_for``, minus a task per call: a timer cancels the
+    calling task once the deadline passes.
+    """
+
+    def __init__(self, db: BaseDB, expirations: Optional[Counter] = None):
+        super().__init__(db)
+        if expirations is None:
+            expirations = deadline_expirations_counter()
+        self.expirations = expirations
+
+
+class _Expiry:
+    __slots__ = ("task", "expired")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.expired = False
+
+    def __call__(self) -> None:
+        self.expired = True
+        self.task.cancel()
+
+
+def _bounded(name: str) -> Any:
+    labels = (name,)
+    monotonic = time.monotonic
+    write = name in WRITE_METHODS
+
+    async def bounded(self: DeadlineDB, *args, **kwargs):
+        request = args[0] if args else kwargs.get("request")
+        deadline = getattr(request, "deadline", None)
+        task = None if deadline is None else _current_task()
+
+        if task is None or task in _bounded_tasks:
+            return await getattr(self.db, name)(*args, **kwargs)
+
+        remaining = deadline - monotonic()
+
+        if remaining <= 0:
+            self.expirations.inc(labels)
+            raise DeadlineExceededError(
+                request=request, description=f"Request deadline exceeded in {name}."
+            )
+
+        if write:
+            return await getattr(self.db, name)(*args, **kwargs)
+
+        expiry = _Expiry(task)
+        timer = get_running_loop().call_later(remaining, expiry)
+        _bounded_tasks.add(task)
+        try:
+            return await getattr(self.db, name)(*args, **kwargs)
+        except asyncio.CancelledError:
+            if not expiry.expired:
+                raise
+            # Python 3.11+ counts cancellations, ours is handled here.
+            uncancel = getattr(task, "uncancel", None)
+            if uncancel is not None and uncancel() > 0:
+                raise
+        finally:
+            timer.cancel()
+            _bounded_tasks.discard(task)
+
+        self.expirations.inc(labels)
+        raise DeadlineExceededError(
+            request=request, description=f"Request deadline exceeded in {name}."
+        )
+
+    bounded.__name__ = bounded.__qualname__ = name
+    return bounded
+
+
+# Every coroutine method forwarded by ProxyDB is bounded.
+for _name, _method in list(vars(ProxyDB).items()):
+    if not _name.startswith("_") and callable(_method):
+        setattr(DeadlineDB, _name, _bounded(_name))
+
+del _name, _method
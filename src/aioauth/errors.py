@@ -51,6 +51,11 @@ class InvalidRequestError(OAuth2Error):
     error = ErrorType.INVALID_REQUEST
 
 
+class RequestEntityTooLargeError(InvalidRequestError):
+    description = "Request body is too large."
+    status_code: HTTPStatus = HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+
+
 class InvalidClientError(OAuth2Error):
     """
     Client authentication failed (e.g. unknown client, no client
@@ -151,3 +156,34 @@ class TemporarilyUnavailableError(OAuth2Error):
     """
 
     error = ErrorType.TEMPORARILY_UNAVAILABLE
+
+
+class TooManyRequestsError(TemporarilyUnavailableError):
+    """
+    The client sent too many requests in a given amount of time. The
+    ``Retry-After`` header tells how many seconds to wait before retrying.
+    """
+
+    description = "Too many requests."
+    status_code: HTTPStatus = HTTPStatus.TOO_MANY_REQUESTS
+
+
+class ServiceUnavailableError(TemporarilyUnavailableError):
+    """
+    The authorization server is overloaded and rejected the request
+    without processing it. The ``Retry-After`` header tells how many
+    seconds to wait before retrying.
+    """
+
+    description = "Server is overloaded."
+    status_code: HTTPStatus = HTTPStatus.SERVICE_UNAVAILABLE
+
+
+class DeadlineExceededError(TemporarilyUnavailableError):
+    """
+    The request ran out of time waiting on the database. Its outstanding
+    database call was cancelled.
+    """
+
+    description = "Request deadline exceeded."
+    status_code: HTTPStatus = HTTPStatus.SERVICE_UNAVAILABLE
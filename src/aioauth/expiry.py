@@ -0,0 +1,264 @@
+import asyncio
+import math
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from .utils import get_running_loop
+
+
+class TimingWheel:
+    """Hierarchical timing wheel of keys that expire at a given time.
+
+    Time is split in ticks of ``resolution`` seconds. The first level has a
+    slot for each of the next ``slots`` ticks, every further level has
+    ``slots`` slots, each spanning a whole rotation of the level below.
+    Scheduling and cancelling a key are O(1), a key moves down at most
+    ``levels - 1`` times before it expires, so ``advance`` costs O(1)
+    amortized per expired key.
+
+    Keys never expire early, and at most ``resolution`` seconds late.
+    """
+
+    def __init__(
+        self,
+        resolution: float = 1.0,
+        slots: int = 256,
+        levels: int = 4,
+        clock: Callable[[], float] = time.time,
+    ):
+        if resolution <= 0 or slots < 2 or levels < 1:
+            raise ValueError("Invalid timing wheel dimensions.")
+
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+        self.clock = clock
+        self._spans = [slots ** level for level in range(levels)]
+        self._wheels: List[List[Dict[Hashable, int]]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ]
+        self._counts = [0] * levels
+        # Keys past the span of the top level, and keys already due.
+        self._overflow: Dict[Hashable, int] = {}
+        self._due: Dict[Hashable, int] = {}
+        # key -> (level, slot), level -1 is the overflow, -2 the due keys.
+        self._locations: Dict[Hashable, Tuple[int, int]] = {}
+        # Last tick processed, every tick up to it is in the past.
+        self._tick = math.floor(clock() / resolution)
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._locations
+
+    def _to_tick(self, when: float) -> int:
+        # The first tick starting at or after ``when``.
+        return math.ceil(when / self.resolution)
+
+    def _place(self, key: Hashable, tick: int) -> None:
+        current = self._tick
+
+        if tick <= current:
+            self._due[key] = tick
+            self._locations[key] = (-2, 0)
+            return
+
+        for level, span in enumerate(self._spans):
+            # Never the slot of the current tick, it is only visited again
+            # a whole rotation later.
+            if tick // span - current // span < self.slots:
+                slot = (tick // span) % self.slots
+                self._wheels[level][slot][key] = tick
+                self._counts[level] += 1
+                self._locations[key] = (level, slot)
+                return
+
+        self._overflow[key] = tick
+        self._locations[key] = (-1, 0)
+
+    def schedule(self, key: Hashable, expires_at: float) -> None:
+        """Schedules ``key`` to expire at ``expires_at``, replacing any
+        previous schedule of the same key.
+        """
+        self.cancel(key)
+        self._place(key, self._to_tick(expires_at))
+
+    def cancel(self, key: Hashable) -> bool:
+        location = self._locations.pop(key, None)
+
+        if location is None:
+            return False
+
+        level, slot = location
+        if level == -2:
+            del self._due[key]
+        elif level == -1:
+            del self._overflow[key]
+        else:
+            del self._wheels[level][slot][key]
+            self._counts[level] -= 1
+
+        return True
+
+    def _cascade(self, level: int, slot: int) -> None:
+        entries = self._wheels[level][slot]
+        self._wheels[level][slot] = {}
+        self._counts[level] -= len(entries)
+
+        for key, tick in entries.items():
+            self._place(key, tick)
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        """Moves the wheel to ``now``, returns the keys that expired."""
+        now = self.clock() if now is None else now
+        target = math.floor(now / self.resolution)
+        slots = self.slots
+        expired = list(self._due)
+        self._due.clear()
+
+        while self._tick < target:
+            if self._counts[0] == 0:
+                # Nothing to expire until the next level 0 rotation.
+                boundary = (self._tick // slots + 1) * slots
+                if boundary > target:
+                    self._tick = target
+                    break
+                self._tick = boundary - 1
+
+            self._tick += 1
+            tick = self._tick
+
+            if tick % slots == 0:
+                for level in range(self.levels - 1, 0, -1):
+                    span = self._spans[level]
+                    if tick % span == 0:
+                        self._cascade(level, (tick // span) % slots)
+
+                if self._overflow and tick % (self._spans[-1] * slots) == 0:
+                    overflow, self._overflow = self._overflow, {}
+                    for key, expires in overflow.items():
+                        self._place(key, expires)
+
+            slot = self._wheels[0][tick % slots]
+            if slot:
+                self._wheels[0][tick % slots] = {}
+                self._counts[0] -= len(slot)
+                expired.extend(slot)
+
+        # Keys placed in the due list while cascading.
+        if self._due:
+            expired.extend(self._due)
+            self._due.clear()
+
+        for key in expired:
+            del self._locations[key]
+
+        return expired
+
+    def next_expiry(self) -> Optional[float]:
+        """Returns when ``advance`` may return keys next, at the latest.
+
+        Exact for keys on the first level, otherwise the time of the next
+        cascade, which has to be run before those keys can expire.
+        """
+        if not self._locations:
+            return None
+
+        if self._due:
+            return self._tick * self.resolution
+
+        slots = self.slots
+        for offset in range(1, slots + 1):
+            tick = self._tick + offset
+            if tick % slots == 0 or self._wheels[0][tick % slots]:
+                return tick * self.resolution
+
+        return None  # pragma: no cover
+
+
+class ExpiryScheduler:
+    """Expires keys registered with a ``TimingWheel`` in the background.
+
+    ``on_expire`` is called with the list of keys whose time passed. The
+    background task starts with the first scheduled key, when the event
+    loop runs, and sleeps until the next key may expire, at most
+    ``max_sleep`` seconds. ``expire`` runs the same step synchronously.
+    """
+
+    def __init__(
+        self,
+        on_expire: Callable[[List[Hashable]], None],
+        resolution: float = 1.0,
+        max_sleep: float = 60.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.on_expire = on_expire
+        self.max_sleep = max_sleep
+        self.clock = clock
+        self.wheel = TimingWheel(resolution=resolution, clock=clock)
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._sleep_until = math.inf
+
+    def __len__(self) -> int:
+        return len(self.wheel)
+
+    def schedule(self, key: Hashable, expires_at: float) -> None:
+        self.wheel.schedule(key, expires_at)
+
+        if self._task is None or self._task.done():
+            self._start()
+        elif expires_at < self._sleep_until and self._wakeup is not None:
+            self._wakeup.set()
+
+    def cancel(self, key: Hashable) -> bool:
+        return self.wheel.cancel(key)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Expires due keys, returns how many expired."""
+        keys = self.wheel.advance(now)
+
+        if keys:
+            self.on_expire(keys)
+
+        return len(keys)
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def _start(self) -> None:
+        try:
+            loop = get_running_loop()
+        except RuntimeError:
+            # Keys scheduled before the loop runs expire once it does.
+            return
+
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        wakeup = self._wakeup
+        assert wakeup is not None
+
+        while True:
+            self.expire()
+
+            now = self.clock()
+            next_expiry = self.wheel.next_expiry()
+            self._sleep_until = now + self.max_sleep
+            if next_expiry is not None:
+                self._sleep_until = min(self._sleep_until, next_expiry)
+
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), max(0.0, self._sleep_until - now))
+            except asyncio.TimeoutError:
+                pass
@@ -1,19 +1,22 @@
 from typing import Optional, Tuple
 
 from .base.request_validator import BaseRequestValidator
+from .constances import retry_after_headers
 from .errors import (
     InvalidGrantError,
     InvalidRequestError,
     InvalidScopeError,
     MismatchingStateError,
+    ServiceUnavailableError,
     UnauthorizedClientError,
     UnsupportedGrantTypeError,
 )
 from .models import Client
+from .passwords import PasswordHasherOverloaded
 from .requests import Request
 from .responses import TokenResponse
 from .types import GrantType, RequestMethod
-from .utils import decode_auth_headers, list_to_scope, scope_to_list
+from .utils import get_client_credentials
 
 
 class GrantTypeBase(BaseRequestValidator):
@@ -24,7 +27,8 @@ class GrantTypeBase(BaseRequestValidator):
 
     async def create_token_response(self, request: Request) -> TokenResponse:
         """ Validate token request and create token response. """
-        client = await self.validate_request(request)
+        with self.span(request, "validate_request"):
+            client = await self.validate_request(request)
         token = await self.db.create_token(
             request, client.client_id, request.post.scope
         )
@@ -43,9 +47,17 @@ class GrantTypeBase(BaseRequestValidator):
 
         client_id, client_secret = self.get_client_credentials(request)
 
-        client = await self.db.get_client(
-            request, client_id=client_id, client_secret=client_secret
-        )
+        # Backends check the secret, built-in ones with verify_client_secret.
+        try:
+            client = await self.db.get_client(
+                request, client_id=client_id, client_secret=client_secret
+            )
+        except PasswordHasherOverloaded:
+            raise ServiceUnavailableError(
+                request=request,
+                description="Too many client verifications in progress.",
+                headers=retry_after_headers.copy(),
+            )
 
         if not client:
             raise InvalidRequestError(
@@ -69,13 +81,7 @@ class GrantTypeBase(BaseRequestValidator):
         return client
 
     def get_client_credentials(self, request: Request) -> Tuple[str, str]:
-        client_id = request.post.client_id
-        client_secret = request.post.client_secret
-
-        if client_id is None or client_secret is None:
-            client_id, client_secret = decode_auth_headers(request)
-
-        return client_id, client_secret
+        return get_client_credentials(request)
 
 
 class AuthorizationCodeGrantType(GrantTypeBase):
@@ -99,7 +105,9 @@ class AuthorizationCodeGrantType(GrantTypeBase):
                 request=request, description="Missing code parameter."
             )
 
-        authorization_code = await self.db.get_authorization_code(
+        # The code is consumed by the first attempt to redeem it, even if
+        # that attempt fails below.
+        authorization_code = await self.db.consume_authorization_code(
             request, client.client_id, request.post.code
         )
 
@@ -124,10 +132,6 @@ class AuthorizationCodeGrantType(GrantTypeBase):
         if authorization_code.is_expired(request):
             raise InvalidGrantError(request=request)
 
-        await self.db.delete_authorization_code(
-            request, client.client_id, request.post.code
-        )
-
         return client
 
 
@@ -142,7 +146,14 @@ class PasswordGrantType(GrantTypeBase):
                 request=request, description="Invalid credentials given."
             )
 
-        user = await self.db.authenticate(request)
+        try:
+            user = await self.db.authenticate(request)
+        except PasswordHasherOverloaded:
+            raise ServiceUnavailableError(
+                request=request,
+                description="Too many password verifications in progress.",
+                headers=retry_after_headers.copy(),
+            )
 
         if not user:
             raise InvalidGrantError(
@@ -157,36 +168,21 @@ class RefreshTokenGrantType(GrantTypeBase):
 
     async def create_token_response(self, request: Request) -> TokenResponse:
         """ Validate token request and create token response. """
-        client = await self.validate_request(request)
-
-        old_token = await self.db.get_token(
-            request=request,
-            client_id=client.client_id,
-            refresh_token=request.post.refresh_token,
+        with self.span(request, "validate_request"):
+            client = await self.validate_request(request)
+
+        # Revokes the old token and creates the new one in a single call,
+        # only one of concurrent refreshes of the same token gets a token.
+        token = await self.db.rotate_refresh_token(
+            request,
+            client.client_id,
+            request.post.refresh_token,
+            request.post.scope or None,
         )
 
-        if not old_token or old_token.revoked or old_token.refresh_token_expired:
+        if token is None:
             raise InvalidGrantError(request=request)
 
-        # Revoke old token
-        await self.db.revoke_token(
-            request=request, refresh_token=old_token.refresh_token
-        )
-
-        # new token should have at max the same scope as the old token
-        # (see https://www.oauth.com/oauth2-servers/making-authenticated-requests/refreshing-an-access-token/)
-        new_scope = old_token.scope
-        if request.post.scope:
-            # restrict requested tokens to requested scopes in the old token
-            new_scope = list_to_scope(
-                list(
-                    set(scope_to_list(old_token.scope))
-                    & set(scope_to_list(request.post.scope))
-                )
-            )
-
-        token = await self.db.create_token(request, client.client_id, new_scope)
-
         return TokenResponse(
             expires_in=token.expires_in,
             refresh_token_expires_in=token.refresh_token_expires_in,
@@ -0,0 +1,114 @@
+import asyncio
+import math
+import random
+import time
+from typing import Callable, Optional
+
+from .constances import default_headers
+from .errors import ServiceUnavailableError
+from .requests import Request
+from .structures import CaseInsensitiveDict
+from .utils import get_running_loop
+
+
+class LoadShedder:
+    """Rejects requests early while the process is overloaded.
+
+    Overload is detected from two signals:
+    - the number of requests in flight, requests beyond ``max_in_flight``
+      are always rejected;
+    - the event loop lag, how late a background task wakes up from its
+      ``interval`` sleeps, smoothed over recent samples. Past ``max_lag``
+      a growing share of requests is rejected, all of them once the lag
+      is twice ``max_lag``.
+
+    Rejected requests get a 503 response with a ``Retry-After`` header.
+    The lag keeps being measured while shedding, so requests are admitted
+    again as soon as the loop catches up. A threshold of None disables
+    the corresponding check.
+
+        server = AuthorizationServer(
+            db=DB(), load_shedder=LoadShedder(max_in_flight=500, max_lag=0.1)
+        )
+    """
+
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = 1000,
+        max_lag: Optional[float] = 0.1,
+        interval: float = 0.05,
+        smoothing: float = 0.3,
+        retry_after: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_lag = max_lag
+        self.interval = interval
+        self.smoothing = smoothing
+        self.retry_after = retry_after
+        self.clock = clock
+        self.rng = rng
+        self.in_flight = 0
+        self.lag = 0.0
+        self.shed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def overloaded(self) -> bool:
+        """Checks whether a new request should be rejected."""
+        if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+            return True
+
+        if self.max_lag is not None and self.lag > self.max_lag:
+            excess = self.lag / self.max_lag - 1
+            return excess >= 1 or self.rng() < excess
+
+        return False
+
+    def admit(self, request: Request) -> Optional[ServiceUnavailableError]:
+        """Returns the error to respond with if ``request`` is shed,
+        otherwise counts it as in flight until ``release`` is called.
+        """
+        if self.max_lag is not None and (self._task is None or self._task.done()):
+            self._start()
+
+        if self.overloaded():
+            self.shed += 1
+            headers = CaseInsensitiveDict(
+                {
+                    **default_headers,
+                    "retry-after": str(max(1, math.ceil(self.retry_after))),
+                }
+            )
+            return ServiceUnavailableError(request=request, headers=headers)
+
+        self.in_flight += 1
+        return None
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def _start(self) -> None:
+        try:
+            loop = get_running_loop()
+        except RuntimeError:
+            return
+
+        self._task = loop.create_task(self._monitor())
+
+    async def _monitor(self) -> None:
+        while True:
+            started = self.clock()
+            await asyncio.sleep(self.interval)
+            sample = max(0.0, self.clock() - started - self.interval)
+            self.lag += (sample - self.lag) * self.smoothing
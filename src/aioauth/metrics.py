@@ -0,0 +1,265 @@
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from .base.database import BaseDB, ProxyDB
+from .requests import Request
+from .responses import ErrorResponse, Response
+from .types import GrantType, ResponseType
+
+Labels = Tuple[Any, ...]
+
+# Request and database latencies in seconds, from 100us to 10s.
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Grant and response types come from user input, anything else is
+# reported as "other" to keep the number of label values bounded.
+_endpoint_types = {member.value: member.value for member in [*GrantType, *ResponseType]}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Iterable[Any]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(value)
+
+
+class Counter:
+    """Monotonic counter, one value per combination of label values.
+
+    Label values are converted to strings only when rendered.
+    """
+
+    # The Prometheus metric type, named as in the exposition format.
+    type = "counter"  # noqa: A003
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        values = self.values
+        values[labels] = values.get(labels, 0) + amount
+
+    def get(self, labels: Labels = ()) -> float:
+        return self.values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+            for labels, value in sorted(self.values.items())
+        ]
+
+
+class Histogram:
+    """Distribution of observed values over fixed upper bounds.
+
+    Every combination of label values keeps a count per bucket, their sum
+    and total count, so observing a value is a binary search and two
+    additions.
+    """
+
+    # The Prometheus metric type, named as in the exposition format.
+    type = "histogram"  # noqa: A003
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        if list(buckets) != sorted(buckets) or not buckets:
+            raise ValueError("Histogram buckets must be sorted and not empty.")
+
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self.values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        try:
+            counts = self.values[labels]
+        except KeyError:
+            counts = self.values[labels] = [0] * (len(self.buckets) + 2)
+
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def count(self, labels: Labels = ()) -> int:
+        counts = self.values.get(labels)
+        return 0 if counts is None else int(sum(counts[:-1]))
+
+    def samples(self) -> List[str]:
+        lines = []
+        names = self.labels + ("le",)
+
+        for labels, counts in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket = _format_labels(names, labels + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{bucket} {int(cumulative)}")
+
+            formatted = _format_labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{formatted} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{formatted} {int(cumulative)}")
+
+        return lines
+
+
+def deadline_expirations_counter() -> Counter:
+    """Counter of the database calls expired by ``DeadlineDB``."""
+    return Counter(
+        "aioauth_db_deadline_expirations_total",
+        "Database calls stopped by the request deadline, by method.",
+        ("method",),
+    )
+
+
+class Metrics:
+    """Request and database metrics of an ``AuthorizationServer``.
+
+    Passed to the server, it records every endpoint call and wraps the
+    database in ``MetricsDB`` to time every database method call:
+
+        metrics = Metrics()
+        server = AuthorizationServer(db=DB(), metrics=metrics)
+        body = metrics.render()  # Prometheus text exposition format
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.requests = Counter(
+            "aioauth_requests_total",
+            "Requests handled, by endpoint, grant or response type and status.",
+            ("endpoint", "type", "status"),
+        )
+        self.errors = Counter(
+            "aioauth_errors_total",
+            "Error responses, by endpoint and OAuth 2 error.",
+            ("endpoint", "error"),
+        )
+        self.request_duration = Histogram(
+            "aioauth_request_duration_seconds",
+            "Request latency, by endpoint and grant or response type.",
+            ("endpoint", "type"),
+            buckets,
+        )
+        self.db_errors = Counter(
+            "aioauth_db_errors_total",
+            "Database calls that raised, by method.",
+            ("method",),
+        )
+        self.db_duration = Histogram(
+            "aioauth_db_duration_seconds",
+            "Database call latency, by method.",
+            ("method",),
+            buckets,
+        )
+        self.db_deadline_expirations = deadline_expirations_counter()
+
+    @property
+    def metrics(self) -> List[Any]:
+        return [
+            self.requests,
+            self.errors,
+            self.request_duration,
+            self.db_duration,
+            self.db_errors,
+            self.db_deadline_expirations,
+        ]
+
+    def observe_request(
+        self, endpoint: str, request: Request, response: Response, duration: float
+    ) -> None:
+        value = request.post.grant_type or request.query.response_type
+        endpoint_type = ""
+        if value:
+            value = getattr(value, "value", value)
+            endpoint_type = _endpoint_types.get(value, "other")  # type: ignore
+
+        self.request_duration.observe(duration, (endpoint, endpoint_type))
+        self.requests.inc((endpoint, endpoint_type, int(response.status_code)))
+
+        if isinstance(response.content, ErrorResponse):
+            error = response.content.error
+            self.errors.inc((endpoint, getattr(error, "value", error)))
+
+    def render(self) -> str:
+        """Renders all metrics in the Prometheus text exposition format."""
+        lines = []
+
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsDB(ProxyDB):
+    """Times every call made to the wrapped database.
+
+    Calls are recorded in ``metrics`` by method name, calls that raised
+    are counted separately.
+    """
+
+    def __init__(self, db: BaseDB, metrics: Metrics):
+        super().__init__(db)
+        self.metrics = metrics
+
+
+def _timed(name: str) -> Any:
+    labels = (name,)
+    perf_counter = time.perf_counter
+
+    # Calls the wrapped database directly, skipping the ProxyDB forwarder.
+    async def timed(self: MetricsDB, *args, **kwargs):
+        started = perf_counter()
+        failed = True
+        try:
+            result = await getattr(self.db, name)(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            if failed:
+                self.metrics.db_errors.inc(labels)
+            self.metrics.db_duration.observe(perf_counter() - started, labels)
+
+    timed.__name__ = timed.__qualname__ = name
+    return timed
+
+
+# Every coroutine method forwarded by ProxyDB is timed.
+for _name, _method in list(vars(ProxyDB).items()):
+    if not _name.startswith("_") and callable(_method):
+        setattr(MetricsDB, _name, _timed(_name))
+
+del _name, _method
@@ -1,7 +1,8 @@
 import time
-from typing import List, NamedTuple, Optional, Text
+from typing import FrozenSet, Iterable, List, NamedTuple, Optional, Text
 
 from .requests import Request
+from .scopes import scope_registry
 from .types import CodeChallengeMethod, GrantType, ResponseType
 from .utils import create_s256_code_challenge, list_to_scope, scope_to_list
 
@@ -30,9 +31,65 @@ class Client(NamedTuple):
         scopes = scope_to_list(scope)
         return list_to_scope([s for s in scopes if s in allowed])
 
-    def check_scope(self, scope: str) -> bool:
-        allowed_scope = self.get_allowed_scope(scope)
-        return not (set(scope_to_list(scope)) - set(scope_to_list(allowed_scope)))
+    @property
+    def scope_mask(self) -> int:
+        return scope_registry.register(self.scope)
+
+    def check_scope(self, scope: Optional[str]) -> bool:
+        if not scope:
+            return True
+
+        # Registers the client scope before the requested one is looked up.
+        allowed_mask = self.scope_mask
+        mask = scope_registry.mask(scope)
+        return mask is not None and not mask & ~allowed_mask
+
+    # A method, the builtin stays reachable everywhere else.
+    def compile(self) -> "CompiledClient":  # noqa: A003
+        """Returns the client with its lookup structures prebuilt."""
+        return CompiledClient(*self)
+
+
+class CompiledClient(Client):
+    """Client with lookup structures built once, when it is loaded.
+
+    Behaves exactly like ``Client``, but grant types, response types and
+    redirect URIs are checked with frozenset lookups and the scope mask is
+    computed up front. Storage backends and caches should return compiled
+    clients for records that are read many times.
+    """
+
+    _grant_types: FrozenSet[GrantType]
+    _response_types: FrozenSet[ResponseType]
+    _redirect_uris: FrozenSet[str]
+    _scope_mask: int
+
+    def __init__(self, *args, **kwargs):
+        self._grant_types = frozenset(self.grant_types)
+        self._response_types = frozenset(self.response_types)
+        self._redirect_uris = frozenset(self.redirect_uris)
+        self._scope_mask = scope_registry.register(self.scope)
+
+    @classmethod
+    def _make(cls, iterable: Iterable) -> "CompiledClient":
+        return cls(*iterable)
+
+    def check_redirect_uri(self, redirect_uri) -> bool:
+        return redirect_uri in self._redirect_uris
+
+    def check_grant_type(self, grant_type: GrantType) -> bool:
+        return grant_type in self._grant_types
+
+    def check_response_type(self, response_type: ResponseType) -> bool:
+        return response_type in self._response_types
+
+    @property
+    def scope_mask(self) -> int:
+        return self._scope_mask
+
+    # A method, the builtin stays reachable everywhere else.
+    def compile(self) -> "CompiledClient":  # noqa: A003
+        return self
 
 
 class AuthorizationCode(NamedTuple):
@@ -81,6 +138,11 @@ class Token(NamedTuple):
     def is_expired(self, request: Request) -> bool:
         return self.token_expires_in < time.time()
 
+    @property
+    def scope_mask(self) -> Optional[int]:
+        # Only client scopes are registered, None if a name is in none of them.
+        return scope_registry.mask(self.scope)
+
     @property
     def refresh_token_expires_in(self) -> int:
         expires_at = self.issued_at + self.expires_in * 2
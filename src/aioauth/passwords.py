@@ -0,0 +1,160 @@
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from .utils import get_running_loop
+
+T = TypeVar("T")
+
+SCRYPT = "scrypt"
+PBKDF2_SHA256 = "pbkdf2_sha256"
+
+
+class PasswordHasherOverloaded(Exception):
+    """Raised when too many password hashes are already queued."""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(  # type: ignore
+        password.encode("utf-8"),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        # Memory needed by scrypt is 128 * r * n bytes, leave some room.
+        maxmem=256 * r * n + 1024 * 1024,
+        dklen=32,
+    )
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+
+
+def is_password_hash(encoded: str) -> bool:
+    """Tells hashes encoded by ``PasswordHasher`` from plain text values."""
+    return encoded.partition("$")[0] in (SCRYPT, PBKDF2_SHA256)
+
+
+def check_password(password: str, encoded: str) -> bool:
+    """Checks ``password`` against a hash encoded by ``PasswordHasher``.
+
+    Either algorithm is accepted, whatever the parameters of the hasher
+    that made it, so stored hashes stay valid when they change.
+    """
+    try:
+        algorithm, *params = encoded.split("$")
+        if algorithm == SCRYPT:
+            n, r, p, salt, expected = params
+            actual = _scrypt(password, _b64decode(salt), int(n), int(r), int(p))
+        elif algorithm == PBKDF2_SHA256:
+            iterations, salt, expected = params
+            actual = _pbkdf2(password, _b64decode(salt), int(iterations))
+        else:
+            return False
+        # binascii.Error, raised by malformed base64, is a ValueError.
+        expected_bytes = _b64decode(expected)
+    except ValueError:
+        return False
+
+    return hmac.compare_digest(actual, expected_bytes)
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords in a bounded pool of threads.
+
+    Key derivation functions are slow on purpose. Both ``hashlib.scrypt``
+    and ``hashlib.pbkdf2_hmac`` release the GIL, so running them in
+    ``workers`` threads keeps the event loop serving other requests and
+    uses several cores. Calls made while ``workers + max_queue`` hashes
+    are in progress raise ``PasswordHasherOverloaded`` instead of queueing
+    without bounds.
+
+    ``verify`` of a missing hash still runs a full verification, so
+    unknown usernames can't be told apart by response time.
+
+        hasher = PasswordHasher()
+        db = InMemoryDB(
+            users={"user": hasher.encode("password")}, password_hasher=hasher
+        )
+    """
+
+    def __init__(
+        self,
+        algorithm: str = SCRYPT,
+        workers: int = 4,
+        max_queue: int = 64,
+        scrypt_n: int = 2 ** 14,
+        scrypt_r: int = 8,
+        scrypt_p: int = 1,
+        pbkdf2_iterations: int = 600000,
+    ):
+        if algorithm == SCRYPT and not hasattr(hashlib, "scrypt"):
+            raise ValueError("hashlib.scrypt requires Python built with OpenSSL 1.1+.")
+        if algorithm not in (SCRYPT, PBKDF2_SHA256):
+            raise ValueError(f"Unsupported password hashing algorithm: {algorithm}")
+        if workers <= 0 or max_queue < 0:
+            raise ValueError("Invalid password hasher pool dimensions.")
+
+        self.algorithm = algorithm
+        self.workers = workers
+        self.max_queue = max_queue
+        self.scrypt_n = scrypt_n
+        self.scrypt_r = scrypt_r
+        self.scrypt_p = scrypt_p
+        self.pbkdf2_iterations = pbkdf2_iterations
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="aioauth-password"
+        )
+        # Verified in place of missing hashes.
+        self._dummy_hash = self.encode("")
+
+    def encode(self, password: str) -> str:
+        """Hashes ``password`` in the calling thread."""
+        salt = os.urandom(16)
+
+        if self.algorithm == SCRYPT:
+            n, r, p = self.scrypt_n, self.scrypt_r, self.scrypt_p
+            derived = _scrypt(password, salt, n, r, p)
+            return f"{SCRYPT}${n}${r}${p}${_b64encode(salt)}${_b64encode(derived)}"
+
+        iterations = self.pbkdf2_iterations
+        derived = _pbkdf2(password, salt, iterations)
+        return f"{PBKDF2_SHA256}${iterations}${_b64encode(salt)}${_b64encode(derived)}"
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        if self.pending >= self.workers + self.max_queue:
+            raise PasswordHasherOverloaded()
+
+        self.pending += 1
+        try:
+            loop = get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    # A method, the builtin stays reachable everywhere else.
+    async def hash(self, password: str) -> str:  # noqa: A003
+        return await self._run(self.encode, password)
+
+    async def verify(self, password: str, encoded: Optional[str]) -> bool:
+        if encoded is None:
+            await self._run(check_password, password, self._dummy_hash)
+            return False
+
+        return await self._run(check_password, password, encoded)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
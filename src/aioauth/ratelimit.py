@@ -0,0 +1,152 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Container, Hashable, Mapping, NamedTuple, Optional
+
+from .constances import default_headers
+from .errors import InvalidClientError, TooManyRequestsError
+from .requests import Request
+from .structures import CaseInsensitiveDict
+from .types import GrantType
+from .utils import get_client_credentials
+
+
+class RateLimit(NamedTuple):
+    """Allows ``rate`` requests per second, in bursts of up to ``burst``."""
+
+    rate: float
+    burst: int = 1
+
+
+DEFAULT_LIMIT = RateLimit(rate=10, burst=20)
+
+
+class TokenBuckets:
+    """Token buckets of many keys, kept in a bounded LRU mapping.
+
+    A bucket is stored as a single float, the time at which it is full
+    again (the generic cell rate algorithm), so buckets are refilled
+    lazily and need no timers. Once ``max_entries`` keys are tracked, the
+    least recently used bucket is dropped, which at worst gives its key a
+    full bucket again.
+    """
+
+    def __init__(
+        self, max_entries: int = 10000, clock: Callable[[], float] = time.monotonic
+    ):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive.")
+
+        self.max_entries = max_entries
+        self.clock = clock
+        self._full_at: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._full_at)
+
+    def acquire(self, key: Hashable, limit: RateLimit) -> float:
+        """Takes a token from the bucket of ``key``.
+
+        Returns 0 if a token was taken, otherwise how many seconds to wait
+        until one is available.
+        """
+        now = self.clock()
+        interval = 1 / limit.rate
+        full_at = max(self._full_at.get(key, now), now) + interval
+        wait = full_at - now - limit.burst * interval
+
+        # Tolerates rounding errors of the float arithmetic above.
+        if wait > 1e-9:
+            return wait
+
+        self._full_at[key] = full_at
+        self._full_at.move_to_end(key)
+
+        if len(self._full_at) > self.max_entries:
+            self._full_at.popitem(last=False)
+
+        return 0.0
+
+
+class RateLimiter:
+    """Throttles token requests per client and per source address.
+
+    Every client has a bucket per grant type, limited by ``client_limits``
+    for that client, else by ``grant_type_limits`` for that grant type,
+    else by ``default_limit``. Requests are additionally limited by
+    ``source_limit`` per ``Request.remote_addr``, if known. A limit of
+    None disables the corresponding check.
+
+    Checks run before any database access, so the client id is taken from
+    the request as is, without authenticating it, from the same credentials
+    the grant types authenticate. Grant types the server has no handler
+    for share a single "other" bucket per client, so made up grant types
+    don't get buckets of their own.
+
+        server = AuthorizationServer(
+            db=DB(), rate_limiter=RateLimiter(default_limit=RateLimit(5, 20))
+        )
+    """
+
+    def __init__(
+        self,
+        default_limit: Optional[RateLimit] = DEFAULT_LIMIT,
+        client_limits: Optional[Mapping[str, RateLimit]] = None,
+        grant_type_limits: Optional[Mapping[GrantType, RateLimit]] = None,
+        source_limit: Optional[RateLimit] = None,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.default_limit = default_limit
+        self.client_limits = dict(client_limits or {})
+        self.grant_type_limits = dict(grant_type_limits or {})
+        self.source_limit = source_limit
+        self.clients = TokenBuckets(max_entries=max_entries, clock=clock)
+        self.sources = TokenBuckets(max_entries=max_entries, clock=clock)
+
+    def client_limit(
+        self, client_id: str, grant_type: Optional[GrantType]
+    ) -> Optional[RateLimit]:
+        limit = self.client_limits.get(client_id)
+
+        if limit is None and grant_type is not None:
+            limit = self.grant_type_limits.get(grant_type)
+
+        return self.default_limit if limit is None else limit
+
+    def check(self, request: Request, grant_types: Container[Any] = ()) -> None:
+        """Raises ``TooManyRequestsError`` if ``request`` is over a limit.
+
+        ``grant_types`` are the grant types the server handles.
+        """
+        if self.source_limit is not None and request.remote_addr:
+            wait = self.sources.acquire(request.remote_addr, self.source_limit)
+            if wait:
+                raise too_many_requests(request, wait)
+
+        try:
+            client_id, _ = get_client_credentials(request)
+        except InvalidClientError:
+            client_id = ""
+
+        if not client_id:
+            # Rejected without touching the database anyway.
+            return
+
+        grant_type = request.post.grant_type
+        if grant_type not in grant_types:
+            grant_type = None
+        limit = self.client_limit(client_id, grant_type)
+
+        if limit is not None:
+            key = (client_id, "other" if grant_type is None else grant_type)
+            wait = self.clients.acquire(key, limit)
+            if wait:
+                raise too_many_requests(request, wait)
+
+
+def too_many_requests(request: Request, wait: float) -> TooManyRequestsError:
+    headers = CaseInsensitiveDict(
+        {**default_headers, "retry-after": str(max(1, math.ceil(wait)))}
+    )
+    return TooManyRequestsError(request=request, headers=headers)
@@ -1,7 +1,7 @@
-from typing import Any, NamedTuple, Optional
+from typing import Any, List, NamedTuple, Optional, Union
 
 from .config import Settings
-from .structures import CaseInsensitiveDict
+from .structures import CaseInsensitiveDict, RawHeaders
 from .types import CodeChallengeMethod, GrantType, RequestMethod, ResponseType
 
 
@@ -27,13 +27,24 @@ class Post(NamedTuple):
     code: Optional[str] = None
     token: Optional[str] = None
     code_verifier: Optional[str] = None
+    tokens: Optional[List[str]] = None
 
 
 class Request(NamedTuple):
     method: RequestMethod
-    headers: CaseInsensitiveDict = CaseInsensitiveDict()
+    headers: Union[CaseInsensitiveDict, RawHeaders] = CaseInsensitiveDict()
     query: Query = Query()
     post: Post = Post()
     url: str = ""
     user: Optional[Any] = None
     settings: Settings = Settings()
+    # Address of the client connection, used to rate limit by source.
+    remote_addr: Optional[str] = None
+    # Set by the server while the request is traced, see aioauth.tracing.
+    trace: Optional[Any] = None
+    # time.monotonic() value past which database calls fail, see
+    # aioauth.deadline. Set from the server's request_timeout when missing.
+    deadline: Optional[float] = None
+    # Set by a server with a token_signer, the access tokens issued for the
+    # request are signed with it, see aioauth.signing.
+    token_signer: Optional[Any] = None
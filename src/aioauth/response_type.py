@@ -81,7 +81,8 @@ class ResponseTypeBase(BaseRequestValidator):
 
     async def create_authorization_response(self, request: Request) -> Client:
         """Validate authorization request and create authorization response."""
-        return await self.validate_request(request)
+        with self.span(request, "validate_request"):
+            return await self.validate_request(request)
 
 
 class ResponseTypeToken(ResponseTypeBase):
@@ -1,10 +1,52 @@
+import json
+from functools import lru_cache
 from http import HTTPStatus
-from typing import NamedTuple, Optional, Union
+from typing import Any, Callable, List, NamedTuple, Optional, Union
 
 from .constances import default_headers
-from .structures import CaseInsensitiveDict
+from .structures import CaseInsensitiveDict, RawHeaderList
 from .types import ErrorType
 
+JSONEncoder = Callable[[Any], Union[str, bytes]]
+
+
+def _default_json_encoder(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+_json_encoder: JSONEncoder = _default_json_encoder
+
+
+def set_json_encoder(encoder: Optional[JSONEncoder] = None) -> None:
+    """Replaces the encoder used to render ``Response.body``.
+
+    ``encoder`` takes plain ``dict``/``list`` values and returns ``str`` or
+    ``bytes``, e.g. ``orjson.dumps``. ``None`` restores the ``json`` module.
+    """
+    global _json_encoder
+    _json_encoder = _default_json_encoder if encoder is None else encoder
+    _render_error.cache_clear()
+
+
+def to_dict(value: Any) -> Any:
+    """Converts response content, including nested NamedTuples, to plain types."""
+    if hasattr(value, "_asdict"):
+        return {key: to_dict(item) for key, item in value._asdict().items()}
+
+    if isinstance(value, list):
+        return [to_dict(item) for item in value]
+
+    return value
+
+
+def render_json(value: Any) -> bytes:
+    body = _json_encoder(to_dict(value))
+
+    if isinstance(body, str):
+        return body.encode("utf-8")
+
+    return body
+
 
 class ErrorResponse(NamedTuple):
     """Response for error.
@@ -18,6 +60,16 @@ class ErrorResponse(NamedTuple):
     error_uri: str = ""
 
 
+@lru_cache(maxsize=512)
+def _render_error(content: ErrorResponse) -> bytes:
+    # Error contents repeat across requests, render every one of them once.
+    # error_uri is left out unless Settings.ERROR_URI is set.
+    value = to_dict(content)
+    if not content.error_uri:
+        del value["error_uri"]
+    return render_json(value)
+
+
 class AuthorizationCodeResponse(NamedTuple):
     """Response for authorization_code.
 
@@ -66,6 +118,19 @@ class TokenInactiveIntrospectionResponse(NamedTuple):
     active: bool = False
 
 
+class TokenBatchIntrospectionResponse(NamedTuple):
+    """Response for many tokens introspected at once.
+
+    Holds one introspection response per requested token, in request order.
+
+    Used by token introspection server.
+    """
+
+    tokens: List[
+        Union[TokenActiveIntrospectionResponse, TokenInactiveIntrospectionResponse]
+    ]
+
+
 class Response(NamedTuple):
     """General response class.
 
@@ -80,7 +145,29 @@ class Response(NamedTuple):
             AuthorizationCodeResponse,
             TokenActiveIntrospectionResponse,
             TokenInactiveIntrospectionResponse,
+            TokenBatchIntrospectionResponse,
         ]
     ] = None
     status_code: HTTPStatus = HTTPStatus.OK
     headers: CaseInsensitiveDict = default_headers
+
+    @property
+    def body(self) -> bytes:
+        """JSON encoded ``content``, empty for responses without content."""
+        if self.content is None:
+            return b""
+
+        if type(self.content) is ErrorResponse:
+            return _render_error(self.content)
+
+        return render_json(self.content)
+
+    @property
+    def raw_headers(self) -> RawHeaderList:
+        """``headers`` as byte pairs, cached by the ``CaseInsensitiveDict``."""
+        headers = self.headers
+
+        if not isinstance(headers, CaseInsensitiveDict):
+            headers = CaseInsensitiveDict(headers)
+
+        return headers.raw
@@ -0,0 +1,125 @@
+import threading
+from typing import Dict, List, Optional, Text
+
+
+class ScopeRegistry:
+    """Interns scope names as bit positions.
+
+    Space separated scope strings are converted to integer bitmasks once
+    and cached, so subset and intersection checks become integer
+    operations. Masks are converted back to strings only when needed.
+
+    Only the scopes clients declare are registered, any other scope is
+    looked up with ``mask``, which does not grow the registry. Names
+    unknown to the registry are handled as plain strings.
+    """
+
+    def __init__(self, max_cached: int = 4096):
+        self.max_cached = max_cached
+        self._bits: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._masks: Dict[str, Optional[int]] = {}
+        self._scopes: Dict[int, Text] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._bits
+
+    def _cache(self, cache: Dict, key, value) -> None:
+        if len(cache) >= self.max_cached:
+            cache.clear()
+        cache[key] = value
+
+    def register(self, scope: Text) -> int:
+        """Returns the mask of ``scope``, registering all unknown names."""
+        mask = self._masks.get(scope)
+
+        if mask is not None:
+            return mask
+
+        names = scope.split()
+
+        if any(name not in self._bits for name in names):
+            with self._lock:
+                for name in names:
+                    if name not in self._bits:
+                        self._bits[name] = len(self._names)
+                        self._names.append(name)
+                # Lookups cached as unknown may contain the new names.
+                self._masks.clear()
+
+        return self.mask(scope)  # type: ignore
+
+    def mask(self, scope: Text) -> Optional[int]:
+        """Returns the mask of ``scope``, or None if it has unknown names."""
+        try:
+            return self._masks[scope]
+        except KeyError:
+            pass
+
+        mask: Optional[int] = 0
+
+        for name in scope.split():
+            bit = self._bits.get(name)
+            if bit is None:
+                mask = None
+                break
+            mask |= 1 << bit  # type: ignore
+
+        self._cache(self._masks, scope, mask)
+        return mask
+
+    def to_scope(self, mask: int) -> Text:
+        """Converts ``mask`` to a space separated string, in registration order."""
+        try:
+            return self._scopes[mask]
+        except KeyError:
+            pass
+
+        names = []
+        remaining = mask
+
+        while remaining:
+            lowest = remaining & -remaining
+            names.append(self._names[lowest.bit_length() - 1])
+            remaining ^= lowest
+
+        scope = " ".join(names)
+        self._cache(self._scopes, mask, scope)
+        return scope
+
+    def is_subset(self, scope: Text, allowed: Text) -> bool:
+        """Checks that every name of ``scope`` is in ``allowed``."""
+        mask = self.mask(scope)
+        allowed_mask = self.mask(allowed)
+
+        if mask is None or allowed_mask is None:
+            return set(scope.split()) <= set(allowed.split())
+
+        return not mask & ~allowed_mask
+
+    def intersection(self, scope: Text, other: Text) -> Text:
+        """Returns the names present in both ``scope`` and ``other``."""
+        mask = self.mask(scope)
+
+        if mask is None:
+            others = set(other.split())
+            return " ".join(name for name in scope.split() if name in others)
+
+        other_mask = self.mask(other)
+
+        if other_mask is None:
+            # Unknown names can't be in ``scope``, drop them.
+            other_mask = 0
+            for name in other.split():
+                bit = self._bits.get(name)
+                if bit is not None:
+                    other_mask |= 1 << bit
+
+        return self.to_scope(mask & other_mask)
+
+
+scope_registry = ScopeRegistry()
@@ -1,32 +1,41 @@
+import asyncio
 from http import HTTPStatus
-from typing import Type, Union
+from typing import List, Optional, Union
 
 from .base.server import BaseAuthorizationServer
 from .constances import default_headers
-from .grant_type import (
-    AuthorizationCodeGrantType,
-    ClientCredentialsGrantType,
-    GrantTypeBase,
-    PasswordGrantType,
-    RefreshTokenGrantType,
-)
+from .errors import InvalidRequestError
+from .models import Token
 from .requests import Request
-from .response_type import (
-    ResponseTypeAuthorizationCode,
-    ResponseTypeBase,
-    ResponseTypeToken,
-)
 from .responses import (
     Response,
     TokenActiveIntrospectionResponse,
+    TokenBatchIntrospectionResponse,
     TokenInactiveIntrospectionResponse,
 )
+from .signing import is_signed_token
 from .structures import CaseInsensitiveDict
 from .types import ResponseType
 from .utils import build_uri, catch_errors_and_unavailability, decode_auth_headers
 
+IntrospectionResponse = Union[
+    TokenActiveIntrospectionResponse, TokenInactiveIntrospectionResponse
+]
+
+
+def introspect_token(request: Request, token: Optional[Token]) -> IntrospectionResponse:
+    if token and not token.is_expired(request) and not token.revoked:
+        return TokenActiveIntrospectionResponse(
+            scope=token.scope, client_id=token.client_id, exp=token.expires_in
+        )
+
+    return TokenInactiveIntrospectionResponse()
+
 
 class AuthorizationServer(BaseAuthorizationServer):
+    # Upper bound of tokens accepted by a single batch introspection request.
+    max_batch_introspection_tokens: int = 100
+
     @catch_errors_and_unavailability
     async def create_token_introspection_response(self, request: Request) -> Response:
         """Endpoint returns information about a token.
@@ -34,20 +43,106 @@ class AuthorizationServer(BaseAuthorizationServer):
         See Section 2.1: https://tools.ietf.org/html/rfc7662#section-2.1
         """
         client_id, _ = decode_auth_headers(request)
+        token_signer = self.token_signer
+
+        if token_signer is not None and is_signed_token(request.post.token):
+            token_response = await self._introspect_signed_token(
+                request, client_id, request.post.token  # type: ignore
+            )
+            return Response(
+                content=token_response,
+                status_code=HTTPStatus.OK,
+                headers=default_headers,
+            )
 
         token = await self.db.get_token(
             request=request, client_id=client_id, access_token=request.post.token
         )
+        token_response = introspect_token(request, token)
+
+        return Response(
+            content=token_response, status_code=HTTPStatus.OK, headers=default_headers
+        )
 
-        token_response = TokenInactiveIntrospectionResponse()
+    @catch_errors_and_unavailability
+    async def create_token_batch_introspection_response(
+        self, request: Request
+    ) -> Response:
+        """Endpoint returns information about many tokens at once.
+
+        Accepts the tokens in ``request.post.tokens`` and resolves the opaque
+        ones with a single ``get_tokens`` database call. Signed tokens are
+        verified in-process and checked for revocation, like single
+        introspection does.
+        """
+        client_id, _ = decode_auth_headers(request)
+        access_tokens = request.post.tokens
+
+        if not access_tokens:
+            raise InvalidRequestError(
+                request=request, description="Missing tokens parameter."
+            )
+
+        if len(access_tokens) > self.max_batch_introspection_tokens:
+            raise InvalidRequestError(
+                request=request, description="Too many tokens requested."
+            )
 
-        if token and not token.is_expired(request) and not token.revoked:
-            token_response = TokenActiveIntrospectionResponse(
-                scope=token.scope, client_id=token.client_id, exp=token.expires_in
+        token_signer = self.token_signer
+        signed: List[int] = []
+        lookups: List[int] = []
+
+        for index, access_token in enumerate(access_tokens):
+            if token_signer is not None and is_signed_token(access_token):
+                signed.append(index)
+            else:
+                lookups.append(index)
+
+        async def look_up() -> List[IntrospectionResponse]:
+            if not lookups:
+                return []
+            tokens = await self.db.get_tokens(
+                request, client_id, [access_tokens[index] for index in lookups]
             )
+            return [introspect_token(request, token) for token in tokens]
+
+        # Signed tokens are checked the way single introspection checks
+        # them, concurrently with the lookup of the opaque ones.
+        *signed_results, looked_up = await asyncio.gather(
+            *[
+                self._introspect_signed_token(request, client_id, access_tokens[index])
+                for index in signed
+            ],
+            look_up(),
+        )
+        results: List[IntrospectionResponse] = [
+            TokenInactiveIntrospectionResponse()
+        ] * len(access_tokens)
+
+        for index, result in zip(signed + lookups, signed_results + looked_up):
+            results[index] = result
 
         return Response(
-            content=token_response, status_code=HTTPStatus.OK, headers=default_headers
+            content=TokenBatchIntrospectionResponse(tokens=results),
+            status_code=HTTPStatus.OK,
+            headers=default_headers,
+        )
+
+    async def _introspect_signed_token(
+        self, request: Request, client_id: str, access_token: str
+    ) -> IntrospectionResponse:
+        payload = self.token_signer.verify(access_token)  # type: ignore
+
+        if (
+            payload is None
+            or payload.client_id != client_id
+            or payload.is_expired()
+            or await self.db.is_token_revoked(request, client_id, access_token)
+        ):
+            return TokenInactiveIntrospectionResponse()
+
+        return TokenActiveIntrospectionResponse(
+            scope=payload.scope, client_id=payload.client_id, exp=payload.expires_in
         )
 
     @catch_errors_and_unavailability
@@ -58,14 +153,12 @@ class AuthorizationServer(BaseAuthorizationServer):
 
         See Section 4.1.3: https://tools.ietf.org/html/rfc6749#section-4.1.3
         """
-        GrantTypeClass: Union[
-            Type[AuthorizationCodeGrantType],
-            Type[ClientCredentialsGrantType],
-            Type[PasswordGrantType],
-            Type[RefreshTokenGrantType],
-            Type[GrantTypeBase],
-        ] = self.grant_type.get(request.post.grant_type, GrantTypeBase)
-        grant_type = GrantTypeClass(db=self.db)
+        if self.rate_limiter is not None:
+            self.rate_limiter.check(request, self.grant_type_handlers)
+
+        grant_type = self.grant_type_handlers.get(
+            request.post.grant_type, self.default_grant_type_handler
+        )
 
         response = await grant_type.create_token_response(request)
 
@@ -81,12 +174,9 @@ class AuthorizationServer(BaseAuthorizationServer):
 
         See Section 4.1.1: https://tools.ietf.org/html/rfc6749#section-4.1.1
         """
-        ResponseTypeClass: Union[
-            Type[ResponseTypeToken],
-            Type[ResponseTypeAuthorizationCode],
-            Type[ResponseTypeBase],
-        ] = self.response_type.get(request.query.response_type, ResponseTypeBase)
-        response_type = ResponseTypeClass(db=self.db)
+        response_type = self.response_type_handlers.get(
+            request.query.response_type, self.default_response_type_handler
+        )
 
         response = await response_type.create_authorization_response(request)
 
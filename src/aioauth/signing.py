@@ -0,0 +1,114 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import NamedTuple, Optional, Text, Union
+
+from .utils import generate_token
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+class SignedTokenPayload(NamedTuple):
+    """Claims carried by a signed access token."""
+
+    client_id: Text
+    scope: Text
+    issued_at: int
+    expires_in: int
+
+    @property
+    def token_expires_in(self) -> int:
+        return self.issued_at + self.expires_in
+
+    def is_expired(self) -> bool:
+        return self.token_expires_in < time.time()
+
+
+class TokenSigner:
+    """Issues and verifies self-contained HMAC signed access tokens.
+
+    Tokens use the JWT compact serialization
+    (``base64url(header).base64url(claims).base64url(signature)``),
+    so they can be verified in-process without a database lookup.
+
+    The signing key is parsed once on construction, every ``sign`` and
+    ``verify`` call only copies the already keyed HMAC state.
+    """
+
+    algorithms = {
+        "HS256": hashlib.sha256,
+        "HS384": hashlib.sha384,
+        "HS512": hashlib.sha512,
+    }
+
+    def __init__(self, secret_key: Union[str, bytes], algorithm: str = "HS256"):
+        if algorithm not in self.algorithms:
+            raise ValueError(f"Unsupported signing algorithm: {algorithm}")
+
+        if isinstance(secret_key, str):
+            secret_key = secret_key.encode("utf-8")
+
+        if not secret_key:
+            raise ValueError("Signing key must not be empty.")
+
+        self.algorithm = algorithm
+        self._hmac = hmac.new(secret_key, digestmod=self.algorithms[algorithm])
+        self._header = _b64encode(
+            json.dumps({"alg": algorithm, "typ": "JWT"}, separators=(",", ":")).encode()
+        )
+
+    def _signature(self, signing_input: bytes) -> bytes:
+        mac = self._hmac.copy()
+        mac.update(signing_input)
+        return _b64encode(mac.digest())
+
+    def sign(self, client_id: str, scope: str, issued_at: int, expires_in: int) -> str:
+        claims = {
+            "client_id": client_id,
+            "scope": scope,
+            "issued_at": issued_at,
+            "expires_in": expires_in,
+            # Keeps tokens issued for the same client within a second unique.
+            "jti": generate_token(16),
+        }
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        signing_input = self._header + b"." + payload
+        return (signing_input + b"." + self._signature(signing_input)).decode("ascii")
+
+    def verify(self, token: str) -> Optional[SignedTokenPayload]:
+        """Returns token claims, or None if the token was not signed by this signer."""
+        try:
+            signing_input, _, signature = token.encode("ascii").rpartition(b".")
+            header, _, payload = signing_input.partition(b".")
+        except UnicodeEncodeError:
+            return None
+
+        if header != self._header or not payload:
+            return None
+
+        if not hmac.compare_digest(signature, self._signature(signing_input)):
+            return None
+
+        try:
+            claims = json.loads(_b64decode(payload))
+            return SignedTokenPayload(
+                client_id=claims["client_id"],
+                scope=claims["scope"],
+                issued_at=int(claims["issued_at"]),
+                expires_in=int(claims["expires_in"]),
+            )
+        except (ValueError, KeyError, TypeError):
+            return None
+
+
+def is_signed_token(token: Optional[str]) -> bool:
+    """Opaque tokens never contain a dot, signed tokens always do."""
+    return token is not None and "." in token
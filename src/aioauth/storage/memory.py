@@ -0,0 +1,275 @@
+import hmac
+import time
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+from ..base.database import BaseDB, _rotated_scope
+from ..client_secrets import ClientSecretVerifier
+from ..expiry import ExpiryScheduler
+from ..models import AuthorizationCode, Client, CompiledClient, Token
+from ..passwords import PasswordHasher
+from ..requests import Request
+from ..types import CodeChallengeMethod, ResponseType
+
+TOKEN = 0
+AUTHORIZATION_CODE = 1
+
+
+class InMemoryDB(BaseDB):
+    """In-process ``BaseDB`` with hash indexes for every lookup.
+
+    Tokens are indexed by access and refresh token, authorization codes by
+    code and clients by client id, so every method is a constant number of
+    dictionary operations. None of the methods awaits between reading and
+    writing the indexes, which keeps them atomic under any number of
+    concurrent tasks on the event loop.
+
+    Tokens are dropped once their refresh token expired and authorization
+    codes once they expired. Their deadlines are kept in a timing wheel
+    (see ``ExpiryScheduler``) with ticks of ``expiry_resolution`` seconds,
+    a background task started with the first stored record reclaims them
+    as their deadlines pass, read from ``expiry_clock``, ``close`` stops it.
+
+        db = InMemoryDB(clients=[client], users={"user": "password"})
+
+    With a ``password_hasher``, ``users`` maps usernames to password hashes
+    made by ``PasswordHasher.encode``, otherwise to plain passwords. With a
+    ``client_secret_verifier``, clients may be registered with hashed
+    secrets.
+    """
+
+    def __init__(
+        self,
+        clients: Iterable[Client] = (),
+        users: Optional[Dict[str, str]] = None,
+        expiry_resolution: float = 1.0,
+        expiry_interval: float = 60.0,
+        expiry_clock: Callable[[], float] = time.time,
+        password_hasher: Optional[PasswordHasher] = None,
+        client_secret_verifier: Optional[ClientSecretVerifier] = None,
+    ):
+        self.password_hasher = password_hasher
+        self.client_secret_verifier = client_secret_verifier
+        self.clients: Dict[str, CompiledClient] = {}
+        self.users: Dict[str, str] = dict(users or {})
+        self.tokens: Dict[str, Token] = {}
+        self.refresh_tokens: Dict[str, str] = {}
+        self.authorization_codes: Dict[str, AuthorizationCode] = {}
+        self.expiry = ExpiryScheduler(
+            self._on_expire,
+            resolution=expiry_resolution,
+            max_sleep=expiry_interval,
+            clock=expiry_clock,
+        )
+
+        for client in clients:
+            self.add_client(client)
+
+    def add_client(self, client: Client) -> None:
+        self.clients[client.client_id] = client.compile()
+
+    def remove_client(self, client_id: str) -> None:
+        self.clients.pop(client_id, None)
+
+    def add_token(self, token: Token) -> None:
+        self.tokens[token.access_token] = token
+        self.refresh_tokens[token.refresh_token] = token.access_token
+        self.expiry.schedule(
+            (TOKEN, token.access_token), token.refresh_token_expires_in
+        )
+
+    def remove_token(self, access_token: str) -> Optional[Token]:
+        token = self.tokens.pop(access_token, None)
+
+        if token is not None:
+            self.refresh_tokens.pop(token.refresh_token, None)
+            self.expiry.cancel((TOKEN, access_token))
+
+        return token
+
+    def add_authorization_code(
+        self, authorization_code: AuthorizationCode, expires_at: float
+    ) -> None:
+        self.authorization_codes[authorization_code.code] = authorization_code
+        self.expiry.schedule((AUTHORIZATION_CODE, authorization_code.code), expires_at)
+
+    def remove_authorization_code(self, code: str) -> Optional[AuthorizationCode]:
+        self.expiry.cancel((AUTHORIZATION_CODE, code))
+        return self.authorization_codes.pop(code, None)
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """Drops records whose deadline passed, returns how many were dropped."""
+        return self.expiry.expire(now)
+
+    async def close(self) -> None:
+        await self.expiry.close()
+
+    def _on_expire(self, keys: List[Hashable]) -> None:
+        for kind, key in keys:  # type: ignore
+            if kind == TOKEN:
+                token = self.tokens.pop(key, None)
+                if token is not None:
+                    self.refresh_tokens.pop(token.refresh_token, None)
+            else:
+                self.authorization_codes.pop(key, None)
+
+    async def create_token(self, request: Request, client_id: str, scope: str) -> Token:
+        token = await super().create_token(request, client_id, scope)
+        self.add_token(token)
+        return token
+
+    async def get_token(
+        self,
+        request: Request,
+        client_id: str,
+        access_token: Optional[str] = None,
+        refresh_token: Optional[str] = None,
+    ) -> Optional[Token]:
+        if access_token is None and refresh_token is not None:
+            access_token = self.refresh_tokens.get(refresh_token)
+
+        if access_token is None:
+            return None
+
+        token = self.tokens.get(access_token)
+
+        if token is None or token.client_id != client_id:
+            return None
+
+        return token
+
+    async def get_tokens(
+        self, request: Request, client_id: str, access_tokens: List[str]
+    ) -> List[Optional[Token]]:
+        tokens = self.tokens
+        results: List[Optional[Token]] = []
+
+        for access_token in access_tokens:
+            token = tokens.get(access_token)
+            results.append(
+                token if token is not None and token.client_id == client_id else None
+            )
+
+        return results
+
+    async def is_token_revoked(
+        self, request: Request, client_id: str, access_token: str
+    ) -> bool:
+        token = self.tokens.get(access_token)
+        return token is None or token.client_id != client_id or token.revoked
+
+    async def revoke_token(self, request: Request, refresh_token: str) -> None:
+        access_token = self.refresh_tokens.get(refresh_token)
+
+        if access_token is not None:
+            token = self.tokens[access_token]
+            self.tokens[access_token] = token._replace(revoked=True)
+
+    async def rotate_refresh_token(
+        self,
+        request: Request,
+        client_id: str,
+        refresh_token: str,
+        scope: Optional[str] = None,
+    ) -> Optional[Token]:
+        access_token = self.refresh_tokens.get(refresh_token)
+        old_token = None if access_token is None else self.tokens.get(access_token)
+
+        if (
+            old_token is None
+            or old_token.client_id != client_id
+            or old_token.revoked
+            or old_token.refresh_token_expired
+        ):
+            return None
+
+        # Revoked before yielding, so concurrent rotations find it revoked.
+        self.tokens[old_token.access_token] = old_token._replace(revoked=True)
+        return await self.create_token(
+            request, client_id, _rotated_scope(old_token.scope, scope)
+        )
+
+    async def create_authorization_code(
+        self,
+        request: Request,
+        client_id: str,
+        scope: str,
+        response_type: ResponseType,
+        redirect_uri: str,
+        code_challenge_method: CodeChallengeMethod,
+        code_challenge: str,
+    ) -> AuthorizationCode:
+        authorization_code = await super().create_authorization_code(
+            request,
+            client_id,
+            scope,
+            response_type,
+            redirect_uri,
+            code_challenge_method,
+            code_challenge,
+        )
+        self.add_authorization_code(
+            authorization_code,
+            authorization_code.auth_time
+            + request.settings.AUTHORIZATION_CODE_EXPIRES_IN,
+        )
+        return authorization_code
+
+    async def get_authorization_code(
+        self, request: Request, client_id: str, code: str
+    ) -> Optional[AuthorizationCode]:
+        authorization_code = self.authorization_codes.get(code)
+
+        if authorization_code is None or authorization_code.client_id != client_id:
+            return None
+
+        return authorization_code
+
+    async def delete_authorization_code(
+        self, request: Request, client_id: str, code: str
+    ) -> None:
+        authorization_code = self.authorization_codes.get(code)
+
+        if authorization_code is not None and authorization_code.client_id == client_id:
+            self.remove_authorization_code(code)
+
+    async def consume_authorization_code(
+        self, request: Request, client_id: str, code: str
+    ) -> Optional[AuthorizationCode]:
+        authorization_code = self.authorization_codes.get(code)
+
+        if authorization_code is None or authorization_code.client_id != client_id:
+            return None
+
+        self.remove_authorization_code(code)
+        return authorization_code
+
+    async def get_client(
+        self, request: Request, client_id: str, client_secret: Optional[str] = None
+    ) -> Optional[Client]:
+        client = self.clients.get(client_id)
+
+        if client is None:
+            return None
+
+        if client_secret is not None and not await self.verify_client_secret(
+            request, client, client_secret
+        ):
+            return None
+
+        return client
+
+    async def authenticate(self, request: Request) -> bool:
+        username, password = request.post.username, request.post.password
+
+        if username is None or password is None:
+            return False
+
+        expected = self.users.get(username)
+
+        if self.password_hasher is not None:
+            return await self.password_hasher.verify(password, expected)
+
+        if expected is None:
+            return False
+
+        return hmac.compare_digest(expected.encode("utf-8"), password.encode("utf-8"))
@@ -0,0 +1,495 @@
+import asyncio
+import functools
+import hmac
+import json
+import queue
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from ..base.database import BaseDB, _rotated_scope
+from ..client_secrets import ClientSecretVerifier
+from ..models import AuthorizationCode, Client, Token
+from ..passwords import PasswordHasher, is_password_hash
+from ..requests import Request
+from ..types import CodeChallengeMethod, GrantType, ResponseType
+from ..utils import get_running_loop
+
+T = TypeVar("T")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    client_id TEXT PRIMARY KEY,
+    client_secret TEXT NOT NULL,
+    grant_types TEXT NOT NULL,
+    response_types TEXT NOT NULL,
+    redirect_uris TEXT NOT NULL,
+    scope TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tokens (
+    access_token TEXT PRIMARY KEY,
+    refresh_token TEXT NOT NULL UNIQUE,
+    scope TEXT NOT NULL,
+    issued_at INTEGER NOT NULL,
+    expires_in INTEGER NOT NULL,
+    client_id TEXT NOT NULL,
+    token_type TEXT NOT NULL,
+    revoked INTEGER NOT NULL DEFAULT 0,
+    expires_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tokens_expires_at ON tokens (expires_at);
+CREATE TABLE IF NOT EXISTS authorization_codes (
+    code TEXT PRIMARY KEY,
+    client_id TEXT NOT NULL,
+    redirect_uri TEXT NOT NULL,
+    response_type TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    auth_time INTEGER NOT NULL,
+    code_challenge TEXT,
+    code_challenge_method TEXT,
+    nonce TEXT,
+    expires_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS authorization_codes_expires_at
+    ON authorization_codes (expires_at);
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL
+);
+"""
+
+TOKEN_COLUMNS = (
+    "access_token, refresh_token, scope, issued_at, expires_in, client_id, "
+    "token_type, revoked"
+)
+AUTHORIZATION_CODE_COLUMNS = (
+    "code, client_id, redirect_uri, response_type, scope, auth_time, "
+    "code_challenge, code_challenge_method, nonce"
+)
+
+INSERT_TOKEN = (
+    f"INSERT INTO tokens ({TOKEN_COLUMNS}, expires_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SELECT_TOKEN_BY_ACCESS_TOKEN = (
+    f"SELECT {TOKEN_COLUMNS} FROM tokens WHERE access_token = ? AND client_id = ?"
+)
+SELECT_TOKEN_BY_REFRESH_TOKEN = (
+    f"SELECT {TOKEN_COLUMNS} FROM tokens WHERE refresh_token = ? AND client_id = ?"
+)
+SELECT_TOKEN_REVOKED = (
+    "SELECT revoked FROM tokens WHERE access_token = ? AND client_id = ?"
+)
+REVOKE_TOKEN = "UPDATE tokens SET revoked = 1 WHERE refresh_token = ?"
+INSERT_AUTHORIZATION_CODE = (
+    f"INSERT INTO authorization_codes ({AUTHORIZATION_CODE_COLUMNS}, expires_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SELECT_AUTHORIZATION_CODE = (
+    f"SELECT {AUTHORIZATION_CODE_COLUMNS} FROM authorization_codes "
+    "WHERE code = ? AND client_id = ?"
+)
+DELETE_AUTHORIZATION_CODE = (
+    "DELETE FROM authorization_codes WHERE code = ? AND client_id = ?"
+)
+SELECT_CLIENT = (
+    "SELECT client_id, client_secret, grant_types, response_types, "
+    "redirect_uris, scope FROM clients WHERE client_id = ?"
+)
+UPSERT_CLIENT = (
+    "INSERT OR REPLACE INTO clients (client_id, client_secret, grant_types, "
+    "response_types, redirect_uris, scope) VALUES (?, ?, ?, ?, ?, ?)"
+)
+SELECT_USER_PASSWORD = "SELECT password FROM users WHERE username = ?"
+UPSERT_USER = "INSERT OR REPLACE INTO users (username, password) VALUES (?, ?)"
+DELETE_EXPIRED_TOKENS = "DELETE FROM tokens WHERE expires_at <= ?"
+DELETE_EXPIRED_AUTHORIZATION_CODES = (
+    "DELETE FROM authorization_codes WHERE expires_at <= ?"
+)
+
+# Lowest default of SQLITE_MAX_VARIABLE_NUMBER across SQLite versions.
+MAX_VARIABLES = 999
+
+
+def _token_from_row(row: Sequence[Any]) -> Token:
+    return Token(*row[:7], revoked=bool(row[7]))
+
+
+def _authorization_code_from_row(row: Sequence[Any]) -> AuthorizationCode:
+    code_challenge_method = row[7]
+    return AuthorizationCode(
+        code=row[0],
+        client_id=row[1],
+        redirect_uri=row[2],
+        response_type=ResponseType(row[3]),
+        scope=row[4],
+        auth_time=row[5],
+        code_challenge=row[6],
+        code_challenge_method=(
+            None
+            if code_challenge_method is None
+            else CodeChallengeMethod(code_challenge_method)
+        ),
+        nonce=row[8],
+    )
+
+
+def _client_from_row(row: Sequence[Any]) -> Client:
+    return Client(
+        client_id=row[0],
+        client_secret=row[1],
+        grant_types=[GrantType(value) for value in json.loads(row[2])],
+        response_types=[ResponseType(value) for value in json.loads(row[3])],
+        redirect_uris=json.loads(row[4]),
+        scope=row[5],
+    )
+
+
+def _token_row(token: Token) -> Tuple[Any, ...]:
+    return (
+        token.access_token,
+        token.refresh_token,
+        token.scope,
+        token.issued_at,
+        token.expires_in,
+        token.client_id,
+        token.token_type,
+        int(token.revoked),
+        token.refresh_token_expires_in,
+    )
+
+
+class SQLiteDB(BaseDB):
+    """``BaseDB`` persisted in a SQLite database file.
+
+    Queries run in a thread pool of ``pool_size`` workers, each of them
+    borrowing one of ``pool_size`` connections opened up front in WAL mode,
+    so reads proceed concurrently with a writer. Tokens issued by concurrent
+    ``create_token`` calls are inserted together, in a single transaction.
+
+    Tokens are indexed by access and refresh token, authorization codes by
+    code and clients by client id. Expired records are deleted by
+    ``purge_expired``. ``path`` must name a file, every connection to
+    ``":memory:"`` would open a database of its own. With a
+    ``password_hasher``, ``add_user`` stores password hashes, with a
+    ``client_secret_verifier``, ``add_client`` stores client secret hashes.
+
+        db = SQLiteDB("oauth.db")
+        await db.add_client(client)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        pool_size: int = 4,
+        timeout: float = 5.0,
+        password_hasher: Optional[PasswordHasher] = None,
+        client_secret_verifier: Optional[ClientSecretVerifier] = None,
+    ):
+        if pool_size <= 0:
+            raise ValueError("pool_size must be positive.")
+
+        self.path = path
+        self.password_hasher = password_hasher
+        self.client_secret_verifier = client_secret_verifier
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="aioauth-sqlite"
+        )
+        self._connections: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._all_connections: List[sqlite3.Connection] = []
+        self._pending_tokens: List[Token] = []
+        self._flush: Optional[asyncio.Future] = None
+
+        for _ in range(pool_size):
+            connection = sqlite3.connect(
+                path, timeout=timeout, check_same_thread=False, isolation_level=None,
+            )
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._all_connections.append(connection)
+            self._connections.put(connection)
+
+        self._all_connections[0].executescript(SCHEMA)
+
+    def _execute(self, func: Callable[[sqlite3.Connection], T], write: bool) -> T:
+        connection = self._connections.get()
+        try:
+            if not write:
+                return func(connection)
+
+            # Take the write lock up front instead of upgrading a read lock.
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(connection)
+                connection.execute("COMMIT")
+            finally:
+                # Whatever failed, the write or the COMMIT, the next user of
+                # the pooled connection must not inherit an open transaction.
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+            return result
+        finally:
+            self._connections.put(connection)
+
+    async def _run(
+        self, func: Callable[[sqlite3.Connection], T], write: bool = False
+    ) -> T:
+        return await get_running_loop().run_in_executor(
+            self._executor, functools.partial(self._execute, func, write)
+        )
+
+    async def _fetchone(self, sql: str, *parameters: Any) -> Optional[Tuple]:
+        return await self._run(
+            lambda connection: connection.execute(sql, parameters).fetchone()
+        )
+
+    async def _write(self, sql: str, *parameters: Any) -> int:
+        return await self._run(
+            lambda connection: connection.execute(sql, parameters).rowcount, write=True,
+        )
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+        for connection in self._all_connections:
+            connection.close()
+
+    async def add_client(self, client: Client) -> None:
+        client_secret = client.client_secret
+
+        if self.client_secret_verifier is not None and not is_password_hash(
+            client_secret
+        ):
+            client_secret = await self.client_secret_verifier.hash(client_secret)
+
+        await self._write(
+            UPSERT_CLIENT,
+            client.client_id,
+            client_secret,
+            json.dumps(
+                [getattr(value, "value", value) for value in client.grant_types]
+            ),
+            json.dumps(
+                [getattr(value, "value", value) for value in client.response_types]
+            ),
+            json.dumps(client.redirect_uris),
+            client.scope,
+        )
+
+    async def add_user(self, username: str, password: str) -> None:
+        if self.password_hasher is not None:
+            password = await self.password_hasher.hash(password)
+
+        await self._write(UPSERT_USER, username, password)
+
+    async def purge_expired(self, now: Optional[float] = None) -> int:
+        """Deletes expired tokens and codes, returns how many were deleted."""
+        now = time.time() if now is None else now
+
+        def purge(connection: sqlite3.Connection) -> int:
+            tokens = connection.execute(DELETE_EXPIRED_TOKENS, (now,))
+            codes = connection.execute(DELETE_EXPIRED_AUTHORIZATION_CODES, (now,))
+            return tokens.rowcount + codes.rowcount
+
+        return await self._run(purge, write=True)
+
+    async def _flush_tokens(self) -> None:
+        # Let create_token calls running in this loop iteration join the batch.
+        await asyncio.sleep(0)
+        tokens, self._pending_tokens = self._pending_tokens, []
+        self._flush = None
+
+        await self._run(
+            lambda connection: connection.executemany(
+                INSERT_TOKEN, [_token_row(token) for token in tokens]
+            ),
+            write=True,
+        )
+
+    async def create_token(self, request: Request, client_id: str, scope: str) -> Token:
+        token = await super().create_token(request, client_id, scope)
+
+        self._pending_tokens.append(token)
+        if self._flush is None:
+            self._flush = asyncio.ensure_future(self._flush_tokens())
+
+        # A cancelled caller must not abort the batch of the other callers.
+        await asyncio.shield(self._flush)
+        return token
+
+    async def get_token(
+        self,
+        request: Request,
+        client_id: str,
+        access_token: Optional[str] = None,
+        refresh_token: Optional[str] = None,
+    ) -> Optional[Token]:
+        if access_token is not None:
+            row = await self._fetchone(
+                SELECT_TOKEN_BY_ACCESS_TOKEN, access_token, client_id
+            )
+        elif refresh_token is not None:
+            row = await self._fetchone(
+                SELECT_TOKEN_BY_REFRESH_TOKEN, refresh_token, client_id
+            )
+        else:
+            return None
+
+        return None if row is None else _token_from_row(row)
+
+    async def get_tokens(
+        self, request: Request, client_id: str, access_tokens: List[str]
+    ) -> List[Optional[Token]]:
+        def select(connection: sqlite3.Connection) -> Dict[str, Token]:
+            tokens: Dict[str, Token] = {}
+            step = MAX_VARIABLES - 1
+
+            for start in range(0, len(access_tokens), step):
+                chunk = access_tokens[start : start + step]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = connection.execute(
+                    f"SELECT {TOKEN_COLUMNS} FROM tokens WHERE client_id = ? "
+                    f"AND access_token IN ({placeholders})",
+                    [client_id, *chunk],
+                )
+                for row in rows:
+                    tokens[row[0]] = _token_from_row(row)
+
+            return tokens
+
+        tokens = await self._run(select)
+        return [tokens.get(access_token) for access_token in access_tokens]
+
+    async def is_token_revoked(
+        self, request: Request, client_id: str, access_token: str
+    ) -> bool:
+        row = await self._fetchone(SELECT_TOKEN_REVOKED, access_token, client_id)
+        return row is None or bool(row[0])
+
+    async def revoke_token(self, request: Request, refresh_token: str) -> None:
+        await self._write(REVOKE_TOKEN, refresh_token)
+
+    async def rotate_refresh_token(
+        self,
+        request: Request,
+        client_id: str,
+        refresh_token: str,
+        scope: Optional[str] = None,
+    ) -> Optional[Token]:
+        def rotate(connection: sqlite3.Connection) -> Optional[Token]:
+            row = connection.execute(
+                SELECT_TOKEN_BY_REFRESH_TOKEN, (refresh_token, client_id)
+            ).fetchone()
+            old_token = None if row is None else _token_from_row(row)
+
+            if not old_token or old_token.revoked or old_token.refresh_token_expired:
+                return None
+
+            token = self._new_token(
+                request, client_id, _rotated_scope(old_token.scope, scope)
+            )
+            connection.execute(REVOKE_TOKEN, (refresh_token,))
+            connection.execute(INSERT_TOKEN, _token_row(token))
+            return token
+
+        return await self._run(rotate, write=True)
+
+    async def create_authorization_code(
+        self,
+        request: Request,
+        client_id: str,
+        scope: str,
+        response_type: ResponseType,
+        redirect_uri: str,
+        code_challenge_method: CodeChallengeMethod,
+        code_challenge: str,
+    ) -> AuthorizationCode:
+        authorization_code = await super().create_authorization_code(
+            request,
+            client_id,
+            scope,
+            response_type,
+            redirect_uri,
+            code_challenge_method,
+            code_challenge,
+        )
+        method = authorization_code.code_challenge_method
+
+        await self._write(
+            INSERT_AUTHORIZATION_CODE,
+            authorization_code.code,
+            authorization_code.client_id,
+            authorization_code.redirect_uri,
+            authorization_code.response_type.value,
+            authorization_code.scope,
+            authorization_code.auth_time,
+            authorization_code.code_challenge,
+            None if method is None else method.value,
+            authorization_code.nonce,
+            authorization_code.auth_time
+            + request.settings.AUTHORIZATION_CODE_EXPIRES_IN,
+        )
+        return authorization_code
+
+    async def get_authorization_code(
+        self, request: Request, client_id: str, code: str
+    ) -> Optional[AuthorizationCode]:
+        row = await self._fetchone(SELECT_AUTHORIZATION_CODE, code, client_id)
+        return None if row is None else _authorization_code_from_row(row)
+
+    async def delete_authorization_code(
+        self, request: Request, client_id: str, code: str
+    ) -> None:
+        await self._write(DELETE_AUTHORIZATION_CODE, code, client_id)
+
+    async def consume_authorization_code(
+        self, request: Request, client_id: str, code: str
+    ) -> Optional[AuthorizationCode]:
+        def consume(connection: sqlite3.Connection) -> Optional[Tuple]:
+            # Both statements run in one write transaction, no other
+            # connection can consume the code in between.
+            row = connection.execute(
+                SELECT_AUTHORIZATION_CODE, (code, client_id)
+            ).fetchone()
+            if row is not None:
+                connection.execute(DELETE_AUTHORIZATION_CODE, (code, client_id))
+            return row
+
+        row = await self._run(consume, write=True)
+        return None if row is None else _authorization_code_from_row(row)
+
+    async def get_client(
+        self, request: Request, client_id: str, client_secret: Optional[str] = None
+    ) -> Optional[Client]:
+        row = await self._fetchone(SELECT_CLIENT, client_id)
+
+        if row is None:
+            return None
+
+        client = _client_from_row(row)
+
+        if client_secret is not None and not await self.verify_client_secret(
+            request, client, client_secret
+        ):
+            return None
+
+        return client
+
+    async def authenticate(self, request: Request) -> bool:
+        username, password = request.post.username, request.post.password
+
+        if username is None or password is None:
+            return False
+
+        row = await self._fetchone(SELECT_USER_PASSWORD, username)
+
+        if self.password_hasher is not None:
+            return await self.password_hasher.verify(
+                password, None if row is None else row[0]
+            )
+
+        if row is None:
+            return False
+
+        return hmac.compare_digest(row[0].encode("utf-8"), password.encode("utf-8"))
@@ -1,11 +1,159 @@
-from collections import UserDict
+from typing import Any, Iterable, Iterator, Mapping, Optional, Tuple
 
+RawHeaderList = Tuple[Tuple[bytes, bytes], ...]
 
-class CaseInsensitiveDict(UserDict):
-    """A case-insensitive ``dict``-like object."""
+_MISSING = object()
+
+
+class CaseInsensitiveDict(dict):
+    """A case-insensitive ``dict``-like object.
+
+    Keys are lowercased once when stored, every lookup lowercases the
+    requested key, so ``get``, ``in`` and ``update`` behave consistently
+    regardless of the key case.
+
+    ``raw`` holds the latin-1 encoded header block, it is built on first
+    access and dropped by every mutation.
+    """
+
+    __slots__ = ("_raw",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._raw: Optional[RawHeaderList] = None
+        self.update(*args, **kwargs)
 
     def __setitem__(self, key, value):
+        self._raw = None
         super().__setitem__(key.lower(), value)
 
     def __getitem__(self, key):
         return super().__getitem__(key.lower())
+
+    def __delitem__(self, key):
+        self._raw = None
+        super().__delitem__(key.lower())
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, str) and super().__contains__(key.lower())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({super().__repr__()})"
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def get(self, key, default=None):
+        return super().get(key.lower(), default)
+
+    def pop(self, key, default=_MISSING):
+        self._raw = None
+        if default is _MISSING:
+            return super().pop(key.lower())
+        return super().pop(key.lower(), default)
+
+    def setdefault(self, key, default=None):
+        self._raw = None
+        return super().setdefault(key.lower(), default)
+
+    def popitem(self):
+        self._raw = None
+        return super().popitem()
+
+    def clear(self):
+        self._raw = None
+        super().clear()
+
+    def update(self, *args, **kwargs):
+        self._raw = None
+        if args:
+            (other,) = args
+
+            if isinstance(other, CaseInsensitiveDict):
+                # Keys are lowercased already.
+                super().update(other)
+            elif hasattr(other, "keys"):
+                for key in other.keys():
+                    self[key] = other[key]
+            else:
+                for key, value in other:
+                    self[key] = value
+
+        for key, value in kwargs.items():
+            self[key] = value
+
+    @property
+    def raw(self) -> RawHeaderList:
+        """Headers as ``(name, value)`` byte pairs, as ASGI servers expect."""
+        if self._raw is None:
+            self._raw = tuple(
+                (key.encode("latin-1"), str(value).encode("latin-1"))
+                for key, value in self.items()
+            )
+        return self._raw
+
+    def copy(self) -> "CaseInsensitiveDict":
+        return type(self)(self)
+
+    @classmethod
+    def fromkeys(cls, keys, value=None) -> "CaseInsensitiveDict":
+        return cls((key, value) for key in keys)
+
+
+class RawHeaders(Mapping):
+    """Read-only, case-insensitive view of raw ASGI-style headers.
+
+    Wraps a list of ``(name, value)`` byte pairs without copying it. Nothing
+    is decoded up front, a lookup scans the list and decodes only the value
+    of the matching header.
+    """
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw: Iterable[Tuple[bytes, bytes]]):
+        self.raw = raw
+
+    def get(self, key: str, default: Any = None) -> Any:
+        name = key.lower().encode("latin-1")
+
+        for header, value in self.raw:
+            if header.lower() == name:
+                return value.decode("latin-1")
+
+        return default
+
+    def __getitem__(self, key: str) -> str:
+        value = self.get(key, _MISSING)
+
+        if value is _MISSING:
+            raise KeyError(key)
+
+        return value
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, str) and self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        seen = set()
+
+        for header, _ in self.raw:
+            name = header.decode("latin-1").lower()
+            if name not in seen:
+                seen.add(name)
+                yield name
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.raw!r})"
+
+    def to_dict(self) -> CaseInsensitiveDict:
+        """Decodes all headers, the first value wins for repeated headers."""
+        headers = CaseInsensitiveDict()
+
+        for header, value in self.raw:
+            headers.setdefault(header.decode("latin-1"), value.decode("latin-1"))
+
+        return headers
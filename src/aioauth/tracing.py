@@ -0,0 +1,214 @@
+import heapq
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from .base.database import ProxyDB
+from .requests import Request
+
+
+class Span:
+    """Timed phase of a request, ``depth`` is its nesting level."""
+
+    __slots__ = ("name", "depth", "start", "end", "error")
+
+    def __init__(self, name: str, depth: int, start: float):
+        self.name = name
+        self.depth = depth
+        self.start = start
+        self.end: Optional[float] = None
+        self.error: Optional[BaseException] = None
+
+    @property
+    def duration(self) -> float:
+        return 0.0 if self.end is None else self.end - self.start
+
+    def __repr__(self) -> str:
+        return f"Span({self.name!r}, {self.duration * 1e6:.1f}us)"
+
+
+class SpanContext:
+    """Context manager timing one span of ``trace``."""
+
+    __slots__ = ("trace", "name", "span")
+
+    def __init__(self, trace: "Trace", name: str):
+        self.trace = trace
+        self.name = name
+        self.span: Optional[Span] = None
+
+    def __enter__(self) -> Optional[Span]:
+        trace = self.trace
+        span = self.span = Span(self.name, trace.depth, trace.tracer.clock())
+        trace.depth += 1
+        trace.spans.append(span)
+        trace.tracer.on_span_start(trace, span)
+        return span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        trace, span = self.trace, self.span
+        assert span is not None
+        span.end = trace.tracer.clock()
+        span.error = exc
+        trace.depth -= 1
+        trace.tracer.on_span_end(trace, span)
+
+
+class NoopSpanContext:
+    """Stands in for ``SpanContext`` when a request is not traced."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> Optional[Span]:
+        return None
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+noop_span = NoopSpanContext()
+
+
+class Trace:
+    """Spans recorded while serving one request at endpoint ``name``."""
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "request",
+        "spans",
+        "start",
+        "end",
+        "depth",
+        "status_code",
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, request: Request):
+        self.tracer = tracer
+        self.name = name
+        self.request = request
+        self.spans: List[Span] = []
+        self.start = tracer.clock()
+        self.end: Optional[float] = None
+        self.depth = 0
+        self.status_code: Optional[int] = None
+
+    @property
+    def duration(self) -> float:
+        return 0.0 if self.end is None else self.end - self.start
+
+    def span(self, name: str) -> SpanContext:
+        return SpanContext(self, name)
+
+    def finish(self, status_code: Optional[int] = None) -> None:
+        self.end = self.tracer.clock()
+        self.status_code = status_code
+        self.tracer.on_trace_end(self)
+
+
+class Tracer:
+    """Receives the start and end of every traced request and its phases.
+
+    Passed to the server, every endpoint call is traced. The validation
+    step of grant and response types (see ``BaseRequestValidator.span``)
+    and every database call, through ``TracingDB``, are recorded as spans
+    of the trace, which requests carry in ``Request.trace``. The hooks of
+    this class do nothing, subclasses override them to export or collect
+    traces. Requests of a server without a tracer are not traced at all.
+
+        server = AuthorizationServer(db=DB(), tracer=SlowestRequests(10))
+    """
+
+    clock: Callable[[], float] = staticmethod(time.perf_counter)  # type: ignore
+
+    def start_trace(self, name: str, request: Request) -> Trace:
+        return Trace(self, name, request)
+
+    def on_span_start(self, trace: Trace, span: Span) -> None:
+        pass
+
+    def on_span_end(self, trace: Trace, span: Span) -> None:
+        pass
+
+    def on_trace_end(self, trace: Trace) -> None:
+        pass
+
+
+class SlowestRequests(Tracer):
+    """Keeps the ``size`` slowest traces seen, in a min-heap."""
+
+    def __init__(self, size: int = 10):
+        if size <= 0:
+            raise ValueError("size must be positive.")
+
+        self.size = size
+        self._heap: List[Tuple[float, int, Trace]] = []
+        self._count = 0
+
+    def on_trace_end(self, trace: Trace) -> None:
+        # The counter breaks ties, traces themselves are not comparable.
+        self._count += 1
+        entry = (trace.duration, self._count, trace)
+
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, entry)
+        elif entry[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    @property
+    def traces(self) -> List[Trace]:
+        """The collected traces, slowest first."""
+        return [trace for _, _, trace in sorted(self._heap, reverse=True)]
+
+    def clear(self) -> None:
+        self._heap.clear()
+
+    def report(self) -> str:
+        """Renders the per phase breakdown of the collected traces."""
+        lines = []
+
+        for trace in self.traces:
+            request = trace.request
+            kind = request.post.grant_type or request.query.response_type or ""
+            lines.append(
+                f"{trace.name} {getattr(kind, 'value', kind)} "
+                f"{trace.status_code} {trace.duration * 1e3:.3f}ms"
+            )
+            for span in trace.spans:
+                error = f" ({type(span.error).__name__})" if span.error else ""
+                lines.append(
+                    f"  {'  ' * span.depth}{span.name} "
+                    f"{span.duration * 1e3:.3f}ms{error}"
+                )
+
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class TracingDB(ProxyDB):
+    """Records every call made to the wrapped database as a span of the
+    trace of the request it is made for.
+    """
+
+
+def _traced(name: str) -> Any:
+    span_name = f"db.{name}"
+
+    async def traced(self: TracingDB, *args, **kwargs):
+        request = args[0] if args else kwargs.get("request")
+        trace = getattr(request, "trace", None)
+
+        if trace is None:
+            return await getattr(self.db, name)(*args, **kwargs)
+
+        with trace.span(span_name):
+            return await getattr(self.db, name)(*args, **kwargs)
+
+    traced.__name__ = traced.__qualname__ = name
+    return traced
+
+
+# Every coroutine method forwarded by ProxyDB is traced.
+for _name, _method in list(vars(ProxyDB).items()):
+    if not _name.startswith("_") and callable(_method):
+        setattr(TracingDB, _name, _traced(_name))
+
+del _name, _method
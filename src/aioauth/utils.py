@@ -1,14 +1,20 @@
+import asyncio
 import base64
 import binascii
 import functools
 import hashlib
 import logging
-import random
+import os
+import secrets
 import string
+import threading
+import time
+import weakref
 from base64 import b64decode, b64encode
 from typing import Callable, Dict, List, Optional, Set, Text, Tuple, Union
 from urllib.parse import quote, urlencode, urlparse, urlunsplit
 
+from .constances import basic_auth_headers
 from .errors import (
     InvalidClientError,
     OAuth2Error,
@@ -25,6 +31,22 @@ UNICODE_ASCII_CHARACTER_SET = string.ascii_letters + string.digits
 log = logging.getLogger(__name__)
 
 
+def _get_running_loop() -> asyncio.AbstractEventLoop:
+    # Python 3.6 has no asyncio.get_running_loop.
+    loop = asyncio.get_event_loop()
+
+    if not loop.is_running():
+        raise RuntimeError("no running event loop")
+
+    return loop
+
+
+# Returns the running event loop, raises RuntimeError outside of one.
+get_running_loop: Callable[[], asyncio.AbstractEventLoop] = getattr(
+    asyncio, "get_running_loop", _get_running_loop
+)
+
+
 def is_secure_transport(request: Request) -> bool:
     """Check if the uri is over ssl."""
     if request.settings.INSECURE_TRANSPORT:
@@ -63,16 +85,122 @@ def scope_to_list(scope: Union[Text, List, Set, Tuple]) -> List:
         return scope.strip().split(" ")
 
 
-def generate_token(length: int = 30, chars: str = UNICODE_ASCII_CHARACTER_SET) -> str:
+class EntropyPool:
+    """Buffer of random token characters refilled in large blocks.
+
+    Each refill reads ``size`` bytes with a single ``os.urandom`` call and
+    maps all of them to token characters at once, so generating a token
+    only slices the buffer. Every thread gets its own buffers and buffers
+    are discarded in forked children, so random bytes are never shared.
+    """
+
+    def __init__(self, size: int = 4096):
+        self.size = size
+        self._local = threading.local()
+        _entropy_pools.add(self)
+
+    def clear(self) -> None:
+        self._local = threading.local()
+
+    def take(self, length: int, table: bytes, rejected: bytes) -> bytes:
+        """Returns ``length`` random bytes translated with ``table``."""
+        try:
+            buffers = self._local.buffers
+        except AttributeError:
+            buffers = self._local.buffers = {}
+
+        state = buffers.get(table)
+
+        if state is None:
+            state = buffers[table] = [b"", 0]
+
+        buffer, start = state
+        end = start + length
+
+        while end > len(buffer):
+            refill = os.urandom(max(self.size, length))
+            buffer = state[0] = buffer[start:] + refill.translate(table, rejected)
+            start, end = 0, length
+
+        state[1] = end
+        return buffer[start:end]
+
+
+_entropy_pools: "weakref.WeakSet[EntropyPool]" = weakref.WeakSet()
+
+
+def _clear_entropy_pools():
+    for pool in list(_entropy_pools):
+        pool.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_clear_entropy_pools)
+
+
+@functools.lru_cache(maxsize=32)
+def _get_translation_table(chars: str) -> Optional[Tuple[bytes, bytes]]:
+    """Maps random bytes to ``chars`` without modulo bias.
+
+    Returns ``bytes.translate`` arguments that map every byte below the
+    largest multiple of ``len(chars)`` to a character and delete the rest,
+    or None if ``chars`` is not a set of ASCII characters.
+    """
+    if not chars or len(chars) > 256:
+        return None
+
+    try:
+        alphabet = chars.encode("ascii")
+    except UnicodeEncodeError:
+        return None
+
+    limit = 256 - 256 % len(alphabet)
+    table = bytes(alphabet[byte % len(alphabet)] for byte in range(limit))
+    return table.ljust(256, b"\0"), bytes(range(limit, 256))
+
+
+def generate_token(
+    length: int = 30,
+    chars: str = UNICODE_ASCII_CHARACTER_SET,
+    pool: Optional[EntropyPool] = None,
+) -> str:
     """Generates a non-guessable OAuth token
 
     OAuth (1 and 2) does not specify the format of tokens except that they
     should be strings of random characters. Tokens should not be guessable
     and entropy when generating the random characters is important. Which is
-    why SystemRandom is used instead of the default random.choice method.
+    why the token is built from ``os.urandom`` bytes, using rejection
+    sampling so that every character of ``chars`` is equally likely.
     """
-    rand = random.SystemRandom()
-    return "".join(rand.choice(chars) for _ in range(length))
+    translation = _get_translation_table(chars)
+
+    if translation is None:
+        return "".join(secrets.choice(chars) for _ in range(length))
+
+    table, rejected = translation
+
+    if pool is not None:
+        return pool.take(length, table, rejected).decode("ascii")
+
+    token = b""
+
+    while len(token) < length:
+        missing = length - len(token)
+        # Oversample, so that a single read is almost always enough.
+        token += os.urandom(missing + missing // 4 + 8).translate(table, rejected)
+
+    return token[:length].decode("ascii")
+
+
+@functools.lru_cache(maxsize=1024)
+def _split_uri(url: str) -> Tuple[str, str, str]:
+    """Parses and memoizes the parts of url reused by ``build_uri``.
+
+    ``build_uri`` is only called with redirect URIs already validated against
+    the client registration, so the number of distinct entries stays small.
+    """
+    parsed_url = urlparse(url)
+    return parsed_url.scheme, parsed_url.netloc, parsed_url.path
 
 
 def build_uri(
@@ -85,12 +213,12 @@ def build_uri(
     if fragment is None:
         fragment = {}
 
-    parsed_url = urlparse(url)
+    scheme, netloc, path = _split_uri(url)
     uri = urlunsplit(
         (
-            parsed_url.scheme,
-            parsed_url.netloc,
-            parsed_url.path,
+            scheme,
+            netloc,
+            path,
             urlencode(query_params, quote_via=quote),
             urlencode(fragment, quote_via=quote),
         )
@@ -110,21 +238,33 @@ def decode_auth_headers(request: Request) -> Tuple[str, str]:
     """
     authorization = request.headers.get("Authorization", "")
 
-    headers = CaseInsensitiveDict({"WWW-Authenticate": "Basic"})
-
     scheme, param = get_authorization_scheme_param(authorization)
     if not authorization or scheme.lower() != "basic":
-        raise InvalidClientError(request=request, headers=headers)
+        raise InvalidClientError(request=request, headers=basic_auth_headers.copy())
 
     try:
         data = b64decode(param).decode("ascii")
     except (ValueError, UnicodeDecodeError, binascii.Error):
-        raise InvalidClientError(request=request, headers=headers)
+        raise InvalidClientError(request=request, headers=basic_auth_headers.copy())
 
     client_id, separator, client_secret = data.partition(":")
 
     if not separator:
-        raise InvalidClientError(request=request, headers=headers)
+        raise InvalidClientError(request=request, headers=basic_auth_headers.copy())
+
+    return client_id, client_secret
+
+
+def get_client_credentials(request: Request) -> Tuple[str, str]:
+    """Returns the (client_id, client_secret) of the request, taken from the
+    post parameters if both are given, else from the HTTP basic
+    authentication header.
+    """
+    client_id = request.post.client_id
+    client_secret = request.post.client_secret
+
+    if client_id is None or client_secret is None:
+        client_id, client_secret = decode_auth_headers(request)
 
     return client_id, client_secret
 
@@ -140,31 +280,71 @@ def create_s256_code_challenge(code_verifier: str) -> str:
     return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
 
 
+def error_response(error: OAuth2Error) -> Response:
+    content = ErrorResponse(
+        error=error.error, description=error.description, error_uri=error.error_uri
+    )
+    return Response(
+        content=content, status_code=error.status_code, headers=error.headers
+    )
+
+
 def catch_errors_and_unavailability(f) -> Callable:
-    @functools.wraps(f)
-    async def wrapper(self, request: Request, *args, **kwargs) -> Optional[Response]:
+    async def handle(self, request: Request, *args, **kwargs) -> Response:
         if not request.settings.AVAILABLE:
-            error = TemporarilyUnavailableError(request=request)
-            content = ErrorResponse(error=error.error, description=error.description)
-            return Response(
-                content=content, status_code=error.status_code, headers=error.headers
-            )
+            return error_response(TemporarilyUnavailableError(request=request))
+
+        timeout = getattr(self, "request_timeout", None)
+        if timeout is not None and request.deadline is None:
+            request = request._replace(deadline=time.monotonic() + timeout)
+
+        token_signer = getattr(self, "token_signer", None)
+        if token_signer is not None and request.token_signer is None:
+            request = request._replace(token_signer=token_signer)
+
+        load_shedder = getattr(self, "load_shedder", None)
+
+        if load_shedder is not None:
+            error = load_shedder.admit(request)
+            if error is not None:
+                return error_response(error)
 
         try:
             response = await f(self, request, *args, **kwargs)
             return response
         except OAuth2Error as exc:
-            content = ErrorResponse(error=exc.error, description=exc.description)
             log.debug(exc)
-            return Response(
-                content=content, status_code=exc.status_code, headers=exc.headers
-            )
+            return error_response(exc)
         except Exception:
-            error = ServerError(request=request)
             log.exception("Exception caught while processing request.")
-            content = ErrorResponse(error=error.error, description=error.description)
-            return Response(
-                content=content, status_code=error.status_code, headers=error.headers,
+            return error_response(ServerError(request=request))
+        finally:
+            if load_shedder is not None:
+                load_shedder.release()
+
+    @functools.wraps(f)
+    async def wrapper(self, request: Request, *args, **kwargs) -> Optional[Response]:
+        metrics = getattr(self, "metrics", None)
+        tracer = getattr(self, "tracer", None)
+
+        if metrics is None and tracer is None:
+            return await handle(self, request, *args, **kwargs)
+
+        trace = None
+        if tracer is not None:
+            trace = tracer.start_trace(f.__name__, request)
+            request = trace.request = request._replace(trace=trace)
+
+        started = time.perf_counter()
+        response = await handle(self, request, *args, **kwargs)
+
+        if metrics is not None:
+            metrics.observe_request(
+                f.__name__, request, response, time.perf_counter() - started
             )
+        if trace is not None:
+            trace.finish(int(response.status_code))
+
+        return response
 
     return wrapper
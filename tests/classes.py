@@ -13,13 +13,6 @@ class DB(BaseDB):
     storage: Dict[str, List]
     defaults: Defaults
 
-    def _get_by_client_secret(self, client_id: str, client_secret: str):
-        clients: List[Client] = self.storage.get("clients", [])
-
-        for client in clients:
-            if client.client_id == client_id and client.client_secret == client_secret:
-                return client
-
     def _get_by_client_id(self, client_id: str):
         clients: List[Client] = self.storage.get("clients", [])
 
@@ -30,10 +23,13 @@ class DB(BaseDB):
     async def get_client(
         self, request: Request, client_id: str, client_secret: Optional[str] = None
     ) -> Optional[Client]:
-        if client_secret is not None:
-            return self._get_by_client_secret(client_id, client_secret)
+        client = self._get_by_client_id(client_id)
+
+        if client is not None and client_secret is not None:
+            if not await self.verify_client_secret(request, client, client_secret):
+                return None
 
-        return self._get_by_client_id(client_id)
+        return client
 
     async def create_token(self, request: Request, client_id: str, scope: str) -> Token:
         token = await super().create_token(request, client_id, scope)
@@ -0,0 +1,221 @@
+import json
+from http import HTTPStatus
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import pytest
+from aioauth.asgi import ASGIApplication, build_request, parse_post, parse_query
+from aioauth.config import Settings
+from aioauth.server import AuthorizationServer
+from aioauth.types import CodeChallengeMethod, GrantType, RequestMethod, ResponseType
+from aioauth.utils import encode_auth_headers
+
+from .models import Defaults
+
+
+class User:
+    def __init__(self, is_authenticated: bool):
+        self.is_authenticated = is_authenticated
+
+
+async def call(
+    app: ASGIApplication,
+    method: str,
+    path: str,
+    query: Optional[Dict] = None,
+    form: Optional[Dict] = None,
+    headers: Optional[Dict] = None,
+    user=None,
+    chunks: Optional[List[bytes]] = None,
+):
+    body = urlencode(form or {}, doseq=True).encode()
+    raw_headers = [(b"host", b"localhost")]
+    if form is not None:
+        raw_headers.append((b"content-type", b"application/x-www-form-urlencoded"))
+    for key, value in (headers or {}).items():
+        raw_headers.append((key.lower().encode(), value.encode()))
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "scheme": "https",
+        "path": path,
+        "query_string": urlencode(query or {}).encode(),
+        "headers": raw_headers,
+    }
+    if user is not None:
+        scope["user"] = user
+
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": True}
+        for chunk in chunks or []
+    ] + [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+
+    start, body_message = sent
+    response_headers = {key.decode(): value.decode() for key, value in start["headers"]}
+    content = json.loads(body_message["body"]) if body_message["body"] else None
+    assert int(response_headers["content-length"]) == len(body_message["body"])
+    return start["status"], response_headers, content
+
+
+def test_parse_params():
+    query = parse_query(b"response_type=code&code_challenge_method=S256&unknown=1")
+    assert query.response_type is ResponseType.TYPE_CODE
+    assert query.code_challenge_method is CodeChallengeMethod.S256
+
+    query = parse_query(b"response_type=invalid&state=a&state=b")
+    assert query.response_type == "invalid"
+    assert query.state == "a"
+
+    post = parse_post(b"grant_type=password&token=a&token=b&tokens=c")
+    assert post.grant_type is GrantType.TYPE_PASSWORD
+    assert post.token == "a"
+    assert post.tokens == ["a", "b"]
+
+
+def test_build_request():
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "scheme": "http",
+        "server": ("127.0.0.1", 8000),
+        "client": ("10.0.0.1", 51234),
+        "root_path": "/oauth",
+        "path": "/token",
+        "headers": [(b"content-type", b"application/json")],
+    }
+    request = build_request(scope, b"grant_type=password")
+    assert request.method is RequestMethod.POST
+    assert request.url == "http://127.0.0.1:8000/oauth/token"
+    assert request.remote_addr == "10.0.0.1"
+    # Only form encoded bodies are parsed
+    assert request.post.grant_type is None
+
+
+@pytest.mark.asyncio
+async def test_asgi_authorization_code_flow(
+    server: AuthorizationServer, defaults: Defaults
+):
+    app = ASGIApplication(server)
+    query = {
+        "client_id": defaults.client_id,
+        "response_type": "code",
+        "redirect_uri": defaults.redirect_uri,
+        "scope": defaults.scope,
+        "state": "state",
+    }
+
+    status, headers, _ = await call(
+        app, "GET", "/authorize", query=query, user=User(is_authenticated=False)
+    )
+    assert status == HTTPStatus.UNAUTHORIZED
+
+    status, headers, content = await call(
+        app, "GET", "/authorize", query=query, user=User(is_authenticated=True)
+    )
+    assert status == HTTPStatus.FOUND
+    assert content is None
+    code = dict(parse_qsl(urlparse(headers["location"]).query))["code"]
+
+    auth_headers = dict(encode_auth_headers(defaults.client_id, defaults.client_secret))
+    form = {
+        "grant_type": "authorization_code",
+        "redirect_uri": defaults.redirect_uri,
+        "code": code,
+        "scope": defaults.scope,
+    }
+    status, headers, content = await call(
+        app, "POST", "/token", form=form, headers=auth_headers
+    )
+    assert status == HTTPStatus.OK
+    assert headers["cache-control"] == "no-store"
+    assert content["scope"] == defaults.scope
+
+    status, _, content = await call(
+        app,
+        "POST",
+        "/introspect/batch",
+        form={"token": [content["access_token"], "invalid"]},
+        headers=auth_headers,
+    )
+    assert status == HTTPStatus.OK
+    assert [token["active"] for token in content["tokens"]] == [True, False]
+
+
+@pytest.mark.asyncio
+async def test_asgi_errors(server: AuthorizationServer):
+    app = ASGIApplication(server, settings=Settings(), max_body_size=8)
+
+    status, _, content = await call(app, "GET", "/unknown")
+    assert status == HTTPStatus.NOT_FOUND
+    assert content is None
+
+    status, headers, content = await call(app, "DELETE", "/token")
+    assert status == HTTPStatus.METHOD_NOT_ALLOWED
+    assert headers["allow"] == "GET, POST"
+
+    status, _, content = await call(
+        app, "POST", "/token", form={}, chunks=[b"grant_type=", b"password"]
+    )
+    assert status == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    assert content["error"] == "invalid_request"
+
+    status, _, content = await call(app, "POST", "/token", form={})
+    assert status == HTTPStatus.UNAUTHORIZED
+    assert content["error"] == "invalid_client"
+
+
+@pytest.mark.asyncio
+async def test_asgi_client_disconnected(server: AuthorizationServer):
+    app = ASGIApplication(server)
+    calls = []
+
+    async def endpoint(request):
+        calls.append(request)
+
+    app.endpoints["/token"] = endpoint
+    scope = {"type": "http", "method": "POST", "path": "/token", "headers": []}
+    messages = [
+        {"type": "http.request", "body": b"grant_type=", "more_body": True},
+        {"type": "http.disconnect"},
+    ]
+    sent: List[Dict] = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    # The truncated body is neither processed nor answered
+    await app(scope, receive, send)
+    assert calls == []
+    assert sent == []
+
+
+@pytest.mark.asyncio
+async def test_asgi_lifespan(server: AuthorizationServer):
+    app = ASGIApplication(server)
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    await app({"type": "lifespan"}, receive, send)
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+
+    with pytest.raises(ValueError):
+        await app({"type": "websocket"}, receive, send)
@@ -0,0 +1,263 @@
+import asyncio
+import time
+from http import HTTPStatus
+from typing import Type
+
+import pytest
+from aioauth.base.database import BaseDB, ProxyDB
+from aioauth.cache import ClientCacheDB, TokenCacheDB, TTLCache
+from aioauth.deadline import DeadlineDB
+from aioauth.errors import DeadlineExceededError
+from aioauth.models import CompiledClient, Token
+from aioauth.requests import Post, Request
+from aioauth.server import AuthorizationServer
+from aioauth.types import GrantType, RequestMethod
+from aioauth.utils import encode_auth_headers
+
+from .models import Defaults
+from .utils import Clock
+
+
+def test_ttl_cache_lru_eviction():
+    evicted = []
+    cache = TTLCache(max_entries=2, on_evict=lambda *item: evicted.append(item))
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert evicted == [("b", 2)]
+    assert cache.stats().evictions == 1
+    assert len(cache) == 2
+
+
+def test_ttl_cache_expiration():
+    clock = Clock(0.0)
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=20)
+    cache.set("c", 3, ttl=0)
+
+    clock.now = 15
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get("c") is None
+
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 2
+    assert stats.expirations == 1
+    assert stats.size == 1
+
+    with pytest.raises(ValueError):
+        TTLCache(max_entries=0)
+
+
+class CountingDB(ProxyDB):
+    calls = 0
+
+    async def get_token(self, *args, **kwargs):
+        self.calls += 1
+        return await super().get_token(*args, **kwargs)
+
+    async def get_tokens(self, *args, **kwargs):
+        self.calls += 1
+        return await super().get_tokens(*args, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_token_cache_db(db_class: Type[BaseDB], defaults: Defaults):
+    backend = CountingDB(db_class())
+    db = TokenCacheDB(backend)
+    server = AuthorizationServer(db=db)
+
+    introspection_request = Request(
+        post=Post(token=defaults.access_token),
+        method=RequestMethod.POST,
+        headers=encode_auth_headers(defaults.client_id, defaults.client_secret),
+    )
+
+    for _ in range(3):
+        response = await server.create_token_introspection_response(
+            introspection_request
+        )
+        assert response.content.active
+
+    assert backend.calls == 1
+    assert db.cache.stats().hits == 2
+
+    # Refresh revokes the old token, which must drop it from the cache
+    post = Post(
+        grant_type=GrantType.TYPE_REFRESH_TOKEN, refresh_token=defaults.refresh_token,
+    )
+    request = Request(
+        url="https://localhost",
+        post=post,
+        method=RequestMethod.POST,
+        headers=encode_auth_headers(defaults.client_id, defaults.client_secret),
+    )
+    response = await server.create_token_response(request)
+    assert response.status_code == HTTPStatus.OK
+
+    response = await server.create_token_introspection_response(introspection_request)
+    assert not response.content.active
+
+
+@pytest.mark.asyncio
+async def test_token_cache_db_skips_expired_tokens(
+    db_class: Type[BaseDB], storage, defaults: Defaults
+):
+    token = Token(
+        client_id=defaults.client_id,
+        expires_in=10,
+        access_token="expired",
+        refresh_token="expired",
+        issued_at=int(time.time()) - 20,
+        scope=defaults.scope,
+    )
+    storage["tokens"].append(token)
+    db = TokenCacheDB(db_class())
+    request = Request(method=RequestMethod.POST)
+
+    assert await db.get_token(request, defaults.client_id, "expired") == token
+    assert len(db.cache) == 0
+
+
+class SlowClientDB(ProxyDB):
+    calls = 0
+    delay = 0.01
+    error: Exception = None
+
+    async def get_client(self, *args, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return await super().get_client(*args, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_client_cache_db(db_class: Type[BaseDB], defaults: Defaults):
+    backend = SlowClientDB(db_class())
+    db = ClientCacheDB(backend)
+    request = Request(method=RequestMethod.POST)
+
+    clients = await asyncio.gather(
+        *[db.get_client(request, defaults.client_id) for _ in range(10)]
+    )
+    assert all(client.client_id == defaults.client_id for client in clients)
+    assert backend.calls == 1
+
+    client = await db.get_client(request, defaults.client_id, defaults.client_secret)
+    assert client.client_id == defaults.client_id
+    assert isinstance(client, CompiledClient)
+    assert await db.get_client(request, defaults.client_id, "invalid") is None
+    assert await db.get_client(request, defaults.client_id, "ключ") is None
+    assert backend.calls == 1
+
+    db.invalidate(defaults.client_id)
+    assert await db.get_client(request, defaults.client_id) is not None
+    assert backend.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_client_cache_db_negative_caching(db_class: Type[BaseDB]):
+    backend = SlowClientDB(db_class())
+    db = ClientCacheDB(backend, negative_ttl=60)
+    request = Request(method=RequestMethod.POST)
+
+    for _ in range(5):
+        assert await db.get_client(request, "unknown") is None
+    assert backend.calls == 1
+
+    db = ClientCacheDB(backend, negative_ttl=0)
+    await db.get_client(request, "unknown")
+    await db.get_client(request, "unknown")
+    assert backend.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_client_cache_db_backend_error(
+    db_class: Type[BaseDB], defaults: Defaults
+):
+    backend = SlowClientDB(db_class())
+    backend.error = RuntimeError("database is down")
+    db = ClientCacheDB(backend)
+    request = Request(method=RequestMethod.POST)
+
+    results = await asyncio.gather(
+        *[db.get_client(request, defaults.client_id) for _ in range(3)],
+        return_exceptions=True,
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert backend.calls == 1
+
+    backend.error = None
+    assert await db.get_client(request, defaults.client_id) is not None
+
+
+@pytest.mark.asyncio
+async def test_client_cache_db_cancelled_caller(
+    db_class: Type[BaseDB], defaults: Defaults
+):
+    backend = SlowClientDB(db_class())
+    backend.delay = 0.1
+    db = DeadlineDB(ClientCacheDB(backend))
+    request = Request(method=RequestMethod.POST)
+    client_id = defaults.client_id
+
+    # The first caller gives up, the lookup goes on for the second one
+    results = await asyncio.gather(
+        db.get_client(request._replace(deadline=time.monotonic() + 0.02), client_id),
+        db.get_client(request._replace(deadline=time.monotonic() + 5), client_id),
+        return_exceptions=True,
+    )
+    assert isinstance(results[0], DeadlineExceededError)
+    assert results[1].client_id == defaults.client_id
+    assert backend.calls == 1
+
+    # Callers of a lookup cancelled from within look the client up again
+    db = ClientCacheDB(backend)
+    lookup = asyncio.ensure_future(db.get_client(request, client_id))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(db.get_client(request, client_id))
+    await asyncio.sleep(0)
+    db._pending[client_id].cancel()
+    assert (await follower).client_id == defaults.client_id
+    assert (await lookup).client_id == defaults.client_id
+    assert backend.calls == 3
+
+    # A lookup cancelled before it started is not left behind either
+    db = ClientCacheDB(backend)
+    lookup = asyncio.ensure_future(db.get_client(request, client_id))
+    await asyncio.sleep(0)
+    db._pending[client_id].cancel()
+    lookup.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await lookup
+    assert client_id not in db._pending
+    client = await asyncio.wait_for(db.get_client(request, client_id), 1)
+    assert client.client_id == defaults.client_id
+    assert backend.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_token_cache_db_get_tokens(db_class: Type[BaseDB], defaults: Defaults):
+    backend = CountingDB(db_class())
+    db = TokenCacheDB(backend)
+    request = Request(method=RequestMethod.POST)
+
+    await db.get_token(request, defaults.client_id, defaults.access_token)
+    assert backend.calls == 1
+
+    tokens = await db.get_tokens(
+        request, defaults.client_id, [defaults.access_token, "unknown"]
+    )
+    assert tokens[0].access_token == defaults.access_token
+    assert tokens[1] is None
+    assert backend.calls == 2
+
+    tokens = await db.get_tokens(request, defaults.client_id, [defaults.access_token])
+    assert tokens[0].access_token == defaults.access_token
+    assert backend.calls == 2
@@ -0,0 +1,160 @@
+from http import HTTPStatus
+
+import pytest
+from aioauth.client_secrets import ClientSecretVerifier
+from aioauth.grant_type import ClientCredentialsGrantType
+from aioauth.models import Client
+from aioauth.passwords import PasswordHasher, is_password_hash
+from aioauth.requests import Post, Request
+from aioauth.server import AuthorizationServer
+from aioauth.storage.memory import InMemoryDB
+from aioauth.storage.sqlite import SQLiteDB
+from aioauth.types import EndpointType, GrantType, RequestMethod
+from aioauth.utils import encode_auth_headers
+
+from .utils import token_request
+
+
+class CountingHasher(PasswordHasher):
+    def __init__(self, **kwargs):
+        # Cheap parameters, the tests don't need hashes that are hard to crack.
+        super().__init__(scrypt_n=2 ** 4, **kwargs)
+        self.verifications = 0
+
+    async def verify(self, password, encoded):
+        self.verifications += 1
+        return await super().verify(password, encoded)
+
+
+def create_client(client_secret: str) -> Client:
+    return Client(
+        client_id="client",
+        client_secret=client_secret,
+        grant_types=[GrantType.TYPE_CLIENT_CREDENTIALS],
+        response_types=[],
+        redirect_uris=[],
+        scope="read",
+    )
+
+
+@pytest.mark.asyncio
+async def test_client_secret_verifier():
+    now = [0.0]
+    hasher = CountingHasher()
+    verifier = ClientSecretVerifier(hasher, ttl=10, clock=lambda: now[0])
+    client = create_client(hasher.encode("secret"))
+
+    assert await verifier.verify(client, "secret")
+    assert await verifier.verify(client, "secret")
+    assert hasher.verifications == 1
+
+    # Failures are not cached
+    assert not await verifier.verify(client, "wrong")
+    assert not await verifier.verify(client, "wrong")
+    assert hasher.verifications == 3
+
+    # A new secret hash doesn't reuse the verifications of the old one
+    rotated = create_client(hasher.encode("secret"))
+    assert await verifier.verify(rotated, "secret")
+    assert hasher.verifications == 4
+    assert not await verifier.verify(create_client(hasher.encode("new")), "secret")
+    assert hasher.verifications == 5
+
+    now[0] = 10
+    assert await verifier.verify(client, "secret")
+    assert hasher.verifications == 6
+
+    # Secrets stored in plain text are compared without the hasher
+    assert await verifier.verify(create_client("plain"), "plain")
+    assert not await verifier.verify(create_client("plain"), "ключ")
+    assert hasher.verifications == 6
+
+    verifier.close()
+
+
+@pytest.mark.asyncio
+async def test_client_credentials_with_hashed_secret(tmp_path):
+    hasher = CountingHasher(workers=1, max_queue=0)
+    verifier = ClientSecretVerifier(hasher)
+    request = Request(method=RequestMethod.POST)
+    sqlite_db = SQLiteDB(str(tmp_path / "oauth.db"), client_secret_verifier=verifier)
+    await sqlite_db.add_client(create_client("secret"))
+    stored = await sqlite_db.get_client(request, "client")
+    assert is_password_hash(stored.client_secret)
+    memory_db = InMemoryDB(
+        clients=[create_client(hasher.encode("secret"))],
+        client_secret_verifier=verifier,
+    )
+
+    def client_request(client_secret: str) -> Request:
+        return token_request(
+            "client",
+            client_secret,
+            grant_type=GrantType.TYPE_CLIENT_CREDENTIALS,
+            scope="read",
+        )
+
+    for db in [memory_db, sqlite_db]:
+        server = AuthorizationServer(db=db)
+        server.register(
+            EndpointType.GRANT_TYPE,
+            GrantType.TYPE_CLIENT_CREDENTIALS,
+            ClientCredentialsGrantType,
+        )
+
+        response = await server.create_token_response(client_request("secret"))
+        assert response.status_code == HTTPStatus.OK
+        response = await server.create_token_response(client_request("wrong"))
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert await db.get_client(request, "client", "secret") is not None
+        assert await db.get_client(request, "client", "wrong") is None
+
+        # Cached verifications don't need a worker
+        hasher.pending = 1
+        response = await server.create_token_response(client_request("secret"))
+        assert response.status_code == HTTPStatus.OK
+        verifier.cache.clear()
+        response = await server.create_token_response(client_request("secret"))
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert response.headers["retry-after"] == "1"
+        hasher.pending = 0
+
+    await memory_db.close()
+    await sqlite_db.close()
+    verifier.close()
+
+
+class LegacySecretDB(InMemoryDB):
+    """Checks client secrets in get_client, without verify_client_secret."""
+
+    async def get_client(self, request, client_id, client_secret=None):
+        client = self.clients.get(client_id)
+        if client is None or client_secret != "legacy":
+            return None
+        return client
+
+
+@pytest.mark.asyncio
+async def test_client_secret_checked_by_get_client():
+    db = LegacySecretDB(clients=[create_client("stored hash")])
+    server = AuthorizationServer(db=db)
+    server.register(
+        EndpointType.GRANT_TYPE,
+        GrantType.TYPE_CLIENT_CREDENTIALS,
+        ClientCredentialsGrantType,
+    )
+
+    for client_secret, status_code in [
+        ("legacy", HTTPStatus.OK),
+        ("wrong", HTTPStatus.BAD_REQUEST),
+    ]:
+        request = Request(
+            url="https://localhost/token",
+            method=RequestMethod.POST,
+            headers=encode_auth_headers("client", client_secret),
+            post=Post(grant_type=GrantType.TYPE_CLIENT_CREDENTIALS, scope="read"),
+        )
+        response = await server.create_token_response(request)
+        assert response.status_code == status_code
+
+    await db.close()
@@ -1,10 +1,18 @@
+import copy
 from typing import Dict, List
 
 import pytest
 from aioauth.base.database import BaseDB
+from aioauth.client_secrets import ClientSecretVerifier
+from aioauth.metrics import Metrics
 from aioauth.models import AuthorizationCode, Client, Token
+from aioauth.passwords import PasswordHasher
 from aioauth.requests import Request
+from aioauth.server import AuthorizationServer
+from aioauth.storage.memory import InMemoryDB
+from aioauth.tracing import Tracer
 from aioauth.types import RequestMethod
+from aioauth.utils import EntropyPool
 
 
 @pytest.mark.asyncio
@@ -40,3 +48,70 @@ async def test_db(storage: Dict[str, List]):
         )
     with pytest.raises(NotImplementedError):
         await db.revoke_token(request=request, refresh_token=token.refresh_token)
+
+
+@pytest.mark.asyncio
+async def test_consume_authorization_code(db: BaseDB, defaults):
+    request = Request(method=RequestMethod.POST)
+    consume = db.consume_authorization_code
+
+    assert await consume(request, "unknown", defaults.code) is None
+    authorization_code = await consume(request, defaults.client_id, defaults.code)
+    assert authorization_code.code == defaults.code
+    assert await consume(request, defaults.client_id, defaults.code) is None
+
+
+@pytest.mark.asyncio
+async def test_rotate_refresh_token(db: BaseDB, defaults):
+    request = Request(method=RequestMethod.POST)
+    rotate = db.rotate_refresh_token
+
+    assert await rotate(request, "unknown", defaults.refresh_token) is None
+    token = await rotate(request, defaults.client_id, defaults.refresh_token, "read")
+    assert token.scope == "read"
+    assert token.refresh_token != defaults.refresh_token
+    assert await rotate(request, defaults.client_id, defaults.refresh_token) is None
+
+
+@pytest.mark.asyncio
+async def test_backend_methods_through_layers():
+    db = InMemoryDB()
+    server = AuthorizationServer(db=db, metrics=Metrics(), tracer=Tracer())
+    client = Client(
+        client_id="client",
+        client_secret="secret",
+        grant_types=[],
+        response_types=[],
+        redirect_uris=[],
+    )
+    request = Request(method=RequestMethod.POST)
+
+    # Methods of the backend are reachable through every wrapping layer
+    server.db.add_client(client)
+    assert await server.db.get_client(request, "client") == client
+    assert server.db.purge_expired() == 0
+    await server.db.close()
+
+    with pytest.raises(AttributeError):
+        server.db.unknown
+    assert copy.copy(server.db).db is server.db.db
+
+
+def test_configuration_through_layers():
+    hasher = PasswordHasher(workers=1)
+    db = InMemoryDB(password_hasher=hasher)
+    server = AuthorizationServer(db=db, metrics=Metrics(), tracer=Tracer())
+
+    # Read from and assigned to the backend, not the wrapping layers
+    assert server.db.password_hasher is hasher
+    assert server.db.client_secret_verifier is None
+    pool = EntropyPool()
+    server.db.entropy_pool = pool
+    assert db.entropy_pool is pool
+    verifier = ClientSecretVerifier(hasher)
+    server.db.client_secret_verifier = verifier
+    assert db.client_secret_verifier is verifier
+    server.db.password_hasher = None
+    assert db.password_hasher is None
+
+    hasher.close()
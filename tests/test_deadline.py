@@ -0,0 +1,135 @@
+import asyncio
+import time
+from http import HTTPStatus
+
+import pytest
+from aioauth.base.database import BaseDB, ProxyDB
+from aioauth.deadline import DeadlineDB
+from aioauth.errors import DeadlineExceededError
+from aioauth.metrics import Metrics
+from aioauth.requests import Request
+from aioauth.server import AuthorizationServer
+from aioauth.types import ErrorType, GrantType
+
+from .models import Defaults
+from .utils import token_request
+
+
+class SlowDB(ProxyDB):
+    delay = 0.0
+    cancelled = 0
+
+    async def get_client(self, *args, **kwargs):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return await super().get_client(*args, **kwargs)
+
+    async def create_token(self, *args, **kwargs):
+        await asyncio.sleep(self.delay)
+        return await super().create_token(*args, **kwargs)
+
+
+def client_request(defaults: Defaults, **kwargs) -> Request:
+    request = token_request(
+        defaults.client_id,
+        defaults.client_secret,
+        grant_type=GrantType.TYPE_CLIENT_CREDENTIALS,
+        scope="read",
+    )
+    return request._replace(**kwargs)
+
+
+@pytest.mark.asyncio
+async def test_request_timeout(server: AuthorizationServer, defaults: Defaults):
+    db = SlowDB(server.db)
+    metrics = Metrics()
+    server = AuthorizationServer(db=db, metrics=metrics, request_timeout=0.05)
+
+    db.delay = 1.0
+    started = time.monotonic()
+    response = await server.create_token_response(client_request(defaults))
+    assert time.monotonic() - started < 0.5
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.content.error == ErrorType.TEMPORARILY_UNAVAILABLE
+    assert db.cancelled == 1
+    assert metrics.db_deadline_expirations.get(("get_client",)) == 1
+    assert (
+        'aioauth_db_deadline_expirations_total{method="get_client"} 1\n'
+        in metrics.render()
+    )
+
+    # Calls within the budget are not affected
+    db.delay = 0.0
+    response = await server.create_token_response(client_request(defaults))
+    assert response.status_code == HTTPStatus.OK
+
+    # Without a timeout, the database is not wrapped and requests not bounded
+    server = AuthorizationServer(db=db, metrics=metrics)
+    assert not isinstance(server.db.db, DeadlineDB)
+    db.delay = 0.1
+    response = await server.create_token_response(client_request(defaults))
+    assert response.status_code == HTTPStatus.OK
+    assert metrics.db_deadline_expirations.get(("get_client",)) == 1
+
+
+@pytest.mark.asyncio
+async def test_request_deadline(server: AuthorizationServer, defaults: Defaults):
+    db = SlowDB(server.db)
+    deadline_db = DeadlineDB(db)
+    request = client_request(defaults, deadline=time.monotonic() - 1)
+
+    # Past the deadline, the database is not called at all
+    with pytest.raises(DeadlineExceededError):
+        await deadline_db.get_client(request, defaults.client_id)
+    with pytest.raises(DeadlineExceededError):
+        await deadline_db.get_token(request=request, client_id=defaults.client_id)
+    assert deadline_db.expirations.get(("get_client",)) == 1
+    assert deadline_db.expirations.get(("get_token",)) == 1
+    assert db.cancelled == 0
+
+    # A deadline given with the request takes precedence over the timeout
+    server = AuthorizationServer(db=db, request_timeout=10)
+    response = await server.create_token_response(request)
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    response = await server.create_token_response(
+        request._replace(deadline=time.monotonic() + 10)
+    )
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.asyncio
+async def test_nested_deadline_layers(server: AuthorizationServer, defaults: Defaults):
+    db = SlowDB(server.db)
+    db.delay = 1.0
+    inner = DeadlineDB(db)
+    outer = DeadlineDB(inner)
+    request = client_request(defaults, deadline=time.monotonic() + 0.02)
+
+    with pytest.raises(DeadlineExceededError):
+        await outer.get_client(request, defaults.client_id)
+    assert db.cancelled == 1
+    assert outer.expirations.get(("get_client",)) == 1
+    assert inner.expirations.get(("get_client",)) == 0
+
+    # The task is not left with a pending cancellation
+    await asyncio.sleep(0.05)
+
+
+@pytest.mark.asyncio
+async def test_writes_are_not_cancelled(db: BaseDB, defaults: Defaults):
+    db = SlowDB(db)
+    db.delay = 0.05
+    deadline_db = DeadlineDB(db)
+    request = client_request(defaults, deadline=time.monotonic() + 0.01)
+
+    # Started before the deadline, a write runs to completion
+    token = await deadline_db.create_token(request, defaults.client_id, "read")
+    assert token.client_id == defaults.client_id
+    assert deadline_db.expirations.get(("create_token",)) == 0
+
+    with pytest.raises(DeadlineExceededError):
+        await deadline_db.create_token(request, defaults.client_id, "read")
+    assert deadline_db.expirations.get(("create_token",)) == 1
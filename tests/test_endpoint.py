@@ -154,3 +154,68 @@ async def test_endpoint_availability(db_class: Type[BaseDB]):
     response = await server.create_token_introspection_response(request)
     assert response.status_code == HTTPStatus.BAD_REQUEST
     assert response.content.error == ErrorType.TEMPORARILY_UNAVAILABLE
+
+
+@pytest.mark.asyncio
+async def test_batch_introspection(
+    server: AuthorizationServer, storage: Dict[str, List], defaults: Defaults
+):
+    settings = Settings()
+    expired_token = Token(
+        client_id=defaults.client_id,
+        expires_in=settings.TOKEN_EXPIRES_IN,
+        access_token=generate_token(42),
+        refresh_token=generate_token(48),
+        issued_at=int(time.time() - settings.TOKEN_EXPIRES_IN),
+        scope=defaults.scope,
+    )
+    storage["tokens"].append(expired_token)
+    valid_token = storage["tokens"][0]
+
+    post = Post(
+        tokens=[valid_token.access_token, "invalid token", expired_token.access_token]
+    )
+    request = Request(
+        post=post,
+        method=RequestMethod.POST,
+        headers=encode_auth_headers(defaults.client_id, defaults.client_secret),
+    )
+    response = await server.create_token_batch_introspection_response(request)
+    assert response.status_code == HTTPStatus.OK
+    assert [result.active for result in response.content.tokens] == [
+        True,
+        False,
+        False,
+    ]
+    assert response.content.tokens[0].client_id == defaults.client_id
+
+
+@pytest.mark.asyncio
+async def test_batch_introspection_invalid_request(
+    server: AuthorizationServer, defaults: Defaults
+):
+    headers = encode_auth_headers(defaults.client_id, defaults.client_secret)
+    request = Request(post=Post(), method=RequestMethod.POST, headers=headers)
+    response = await server.create_token_batch_introspection_response(request)
+    assert response.content.error == ErrorType.INVALID_REQUEST
+
+    post = Post(tokens=["token"] * (server.max_batch_introspection_tokens + 1))
+    request = Request(post=post, method=RequestMethod.POST, headers=headers)
+    response = await server.create_token_batch_introspection_response(request)
+    assert response.content.error == ErrorType.INVALID_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_registrations_are_per_server(db_class: Type[BaseDB]):
+    first = AuthorizationServer(db=db_class())
+    second = AuthorizationServer(db=db_class())
+
+    first.unregister(EndpointType.GRANT_TYPE, GrantType.TYPE_PASSWORD)
+    assert GrantType.TYPE_PASSWORD not in first.grant_type_handlers
+    assert GrantType.TYPE_PASSWORD in second.grant_type_handlers
+    assert GrantType.TYPE_PASSWORD in AuthorizationServer.grant_type
+
+    handler = second.grant_type_handlers[GrantType.TYPE_CLIENT_CREDENTIALS]
+    assert handler.db is second.db
+    with pytest.raises(TypeError):
+        second.grant_type_handlers[GrantType.TYPE_PASSWORD] = handler  # type: ignore
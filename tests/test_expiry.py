@@ -0,0 +1,74 @@
+import asyncio
+import random
+import time
+
+import pytest
+from aioauth.expiry import ExpiryScheduler, TimingWheel
+
+from .utils import Clock
+
+
+def test_timing_wheel():
+    clock = Clock()
+    wheel = TimingWheel(resolution=1.0, slots=4, levels=2, clock=clock)
+
+    wheel.schedule("soon", 1002.5)
+    wheel.schedule("later", 1010)
+    wheel.schedule("overflow", 1100)
+    wheel.schedule("past", 999)
+    wheel.schedule("cancelled", 1001)
+    assert wheel.cancel("cancelled")
+    assert not wheel.cancel("cancelled")
+    assert len(wheel) == 4
+    assert "soon" in wheel
+
+    assert wheel.advance() == ["past"]
+    assert wheel.next_expiry() == 1003
+    assert wheel.advance(1002.9) == []
+    assert wheel.advance(1003) == ["soon"]
+
+    # Rescheduling replaces the previous deadline
+    wheel.schedule("later", 1020)
+    assert wheel.advance(1015) == []
+    assert sorted(wheel.advance(1101)) == ["later", "overflow"]
+    assert len(wheel) == 0
+    assert wheel.next_expiry() is None
+
+    with pytest.raises(ValueError):
+        TimingWheel(slots=1)
+
+
+def test_timing_wheel_never_early_nor_late():
+    rnd = random.Random(0)
+    clock = Clock(rnd.uniform(0, 1e6))
+    wheel = TimingWheel(resolution=0.5, slots=8, levels=3, clock=clock)
+    deadlines = {}
+
+    for key in range(1000):
+        deadlines[key] = clock.now + rnd.expovariate(1 / rnd.choice([1, 50, 5000]))
+        wheel.schedule(key, deadlines[key])
+
+    now = clock.now
+    while deadlines:
+        now += rnd.expovariate(1 / rnd.choice([0.2, 10, 300]))
+        for key in wheel.advance(now):
+            assert deadlines.pop(key) <= now
+        assert all(deadline > now - wheel.resolution for deadline in deadlines.values())
+
+
+@pytest.mark.asyncio
+async def test_expiry_scheduler():
+    expired = []
+    scheduler = ExpiryScheduler(expired.extend, resolution=0.01, max_sleep=1.0)
+
+    scheduler.schedule("a", time.time() + 0.02)
+    scheduler.schedule("b", time.time() + 60)
+    assert len(scheduler) == 2
+
+    await asyncio.sleep(0.1)
+    assert expired == ["a"]
+    assert scheduler.cancel("b")
+
+    assert scheduler.expire() == 0
+    await scheduler.close()
+    await scheduler.close()
@@ -150,19 +150,21 @@ async def test_authorization_code_flow_pkce_code_challenge(
         code_challenge=code_challenge,
     )
 
-    request = Request(
+    authorization_request = Request(
         url=request_url, query=query, method=RequestMethod.GET, user=user,
     )
-    response = await server.create_authorization_response(request)
-    assert response.status_code == HTTPStatus.FOUND
-    location = response.headers["location"]
-    location = urlparse(location)
-    query = dict(parse_qsl(location.query))
-    assert query["state"] == state
-    assert query["scope"] == scope
-    assert "code" in query
-    code = query["code"]
 
+    async def authorize() -> str:
+        response = await server.create_authorization_response(authorization_request)
+        assert response.status_code == HTTPStatus.FOUND
+        location = urlparse(response.headers["location"])
+        query = dict(parse_qsl(location.query))
+        assert query["state"] == state
+        assert query["scope"] == scope
+        assert "code" in query
+        return query["code"]
+
+    code = await authorize()
     post = Post(
         grant_type=GrantType.TYPE_AUTHORIZATION_CODE,
         redirect_uri=defaults.redirect_uri,
@@ -178,7 +180,13 @@ async def test_authorization_code_flow_pkce_code_challenge(
         headers=encode_auth_headers(client_id, client_secret),
     )
 
-    await check_request_validators(request, server.create_token_response)
+    async def with_new_code(request: Request) -> Request:
+        # Every attempt to redeem a code uses it up, even a failed one
+        return request._replace(post=request.post._replace(code=await authorize()))
+
+    await check_request_validators(
+        request, server.create_token_response, prepare=with_new_code
+    )
 
     code_record = await db.get_authorization_code(request, client_id, code)
     assert code_record
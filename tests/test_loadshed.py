@@ -0,0 +1,81 @@
+import asyncio
+import time
+from http import HTTPStatus
+
+import pytest
+from aioauth.loadshed import LoadShedder
+from aioauth.requests import Post, Request
+from aioauth.server import AuthorizationServer
+from aioauth.types import ErrorType, RequestMethod
+from aioauth.utils import encode_auth_headers
+
+from .models import Defaults
+
+
+def test_load_shedder_overloaded():
+    rolls = [0.9, 0.1]
+    shedder = LoadShedder(max_in_flight=2, max_lag=0.1, rng=rolls.pop)
+
+    assert not shedder.overloaded()
+    shedder.in_flight = 2
+    assert shedder.overloaded()
+    shedder.in_flight = 0
+
+    # Past max_lag, a growing share of requests is shed
+    shedder.lag = 0.15
+    assert shedder.overloaded()
+    assert not shedder.overloaded()
+    shedder.lag = 0.2
+    assert shedder.overloaded()
+
+    assert not LoadShedder(max_in_flight=None, max_lag=None).overloaded()
+
+
+@pytest.mark.asyncio
+async def test_load_shedder_measures_lag():
+    shedder = LoadShedder(max_lag=0.02, interval=0.01, smoothing=1.0)
+    request = Request(method=RequestMethod.POST)
+
+    assert shedder.admit(request) is None
+    shedder.release()
+    await asyncio.sleep(0)
+    # Blocks the event loop, the monitor wakes up late
+    time.sleep(0.1)
+    await asyncio.sleep(0.001)
+    assert shedder.lag >= 0.08
+    assert shedder.overloaded()
+
+    # Recovers on its own once the loop keeps up again
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if not shedder.overloaded():
+            break
+    assert shedder.lag <= 0.02
+
+    await shedder.close()
+    await shedder.close()
+
+
+@pytest.mark.asyncio
+async def test_load_shedding_server(server: AuthorizationServer, defaults: Defaults):
+    shedder = server.load_shedder = LoadShedder(max_in_flight=1, retry_after=2.5)
+    request = Request(
+        url="https://localhost/token",
+        method=RequestMethod.POST,
+        headers=encode_auth_headers(defaults.client_id, defaults.client_secret),
+        post=Post(token=defaults.access_token),
+    )
+
+    response = await server.create_token_introspection_response(request)
+    assert response.status_code == HTTPStatus.OK
+    assert shedder.in_flight == 0
+
+    shedder.in_flight = 1
+    response = await server.create_token_introspection_response(request)
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.content.error == ErrorType.TEMPORARILY_UNAVAILABLE
+    assert response.headers["retry-after"] == "3"
+    assert shedder.shed == 1
+    assert shedder.in_flight == 1
+
+    await shedder.close()
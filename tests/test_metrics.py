@@ -0,0 +1,83 @@
+from http import HTTPStatus
+
+import pytest
+from aioauth.base.database import BaseDB
+from aioauth.metrics import Counter, Histogram, Metrics, MetricsDB
+from aioauth.requests import Request
+from aioauth.server import AuthorizationServer
+from aioauth.types import GrantType
+
+from .models import Defaults
+from .utils import token_request
+
+
+def test_counter_and_histogram():
+    counter = Counter("requests_total", "Requests.", ("path",))
+    counter.inc(("/token",))
+    counter.inc(("/token",), 2)
+    counter.inc(('a"b\\c\n',))
+    assert counter.get(("/token",)) == 3
+    assert counter.samples() == [
+        'requests_total{path="/token"} 3',
+        'requests_total{path="a\\"b\\\\c\\n"} 1',
+    ]
+
+    histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.count() == 4
+    assert histogram.samples() == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 5.65",
+        "latency_seconds_count 4",
+    ]
+
+    with pytest.raises(ValueError):
+        Histogram("latency_seconds", "Latency.", buckets=(1.0, 0.1))
+
+
+@pytest.mark.asyncio
+async def test_server_metrics(server: AuthorizationServer, defaults: Defaults):
+    metrics = Metrics()
+    server = AuthorizationServer(db=server.db, metrics=metrics)
+    assert isinstance(server.db, MetricsDB)
+
+    def client_request(grant_type):
+        return token_request(
+            defaults.client_id,
+            defaults.client_secret,
+            grant_type=grant_type,
+            scope="read",
+        )
+
+    response = await server.create_token_response(
+        client_request(GrantType.TYPE_CLIENT_CREDENTIALS)
+    )
+    assert response.status_code == HTTPStatus.OK
+    response = await server.create_token_response(client_request("unknown"))
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    endpoint = "create_token_response"
+    assert metrics.requests.get((endpoint, "client_credentials", 200)) == 1
+    assert metrics.requests.get((endpoint, "other", 400)) == 1
+    assert metrics.errors.get((endpoint, "unsupported_grant_type")) == 1
+    assert metrics.request_duration.count((endpoint, "client_credentials")) == 1
+    assert metrics.db_duration.count(("get_client",)) == 2
+    assert metrics.db_duration.count(("create_token",)) == 1
+    assert metrics.db_errors.get(("get_client",)) == 0
+
+    with pytest.raises(NotImplementedError):
+        await MetricsDB(BaseDB(), metrics).get_client(Request(method="POST"), "id")
+    assert metrics.db_errors.get(("get_client",)) == 1
+    assert metrics.db_duration.count(("get_client",)) == 3
+
+    text = metrics.render()
+    assert "# TYPE aioauth_request_duration_seconds histogram\n" in text
+    assert (
+        'aioauth_requests_total{endpoint="create_token_response",'
+        'type="client_credentials",status="200"} 1\n'
+    ) in text
+    assert 'aioauth_db_duration_seconds_count{method="get_client"} 3\n' in text
+    assert 'aioauth_db_errors_total{method="get_client"} 1\n' in text
@@ -0,0 +1,120 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+from aioauth.grant_type import PasswordGrantType
+from aioauth.models import Client
+from aioauth.passwords import (
+    PBKDF2_SHA256,
+    PasswordHasher,
+    PasswordHasherOverloaded,
+    check_password,
+)
+from aioauth.requests import Request
+from aioauth.server import AuthorizationServer
+from aioauth.storage.memory import InMemoryDB
+from aioauth.storage.sqlite import SQLiteDB
+from aioauth.types import EndpointType, GrantType
+
+from .utils import token_request
+
+
+def create_hasher(**kwargs) -> PasswordHasher:
+    # Cheap parameters, the tests don't need hashes that are hard to crack.
+    return PasswordHasher(scrypt_n=2 ** 4, pbkdf2_iterations=10, **kwargs)
+
+
+def test_check_password():
+    scrypt = create_hasher()
+    pbkdf2 = create_hasher(algorithm=PBKDF2_SHA256)
+    encoded = scrypt.encode("password")
+
+    assert encoded.startswith("scrypt$16$8$1$")
+    assert encoded != scrypt.encode("password")
+    assert check_password("password", encoded)
+    assert not check_password("wrong", encoded)
+    assert check_password("pässword", pbkdf2.encode("pässword"))
+    assert not check_password("password", "md5$abc")
+    assert not check_password("password", "scrypt$16$8")
+    assert not check_password("password", "plain")
+    assert not check_password("password", "scrypt$16384$8$1$c2FsdA$abcde")
+
+    with pytest.raises(ValueError):
+        PasswordHasher(algorithm="md5")
+    with pytest.raises(ValueError):
+        PasswordHasher(workers=0)
+
+    scrypt.close()
+    pbkdf2.close()
+
+
+@pytest.mark.asyncio
+async def test_password_hasher():
+    hasher = create_hasher(workers=1, max_queue=1)
+    encoded = await hasher.hash("password")
+
+    assert await hasher.verify("password", encoded)
+    assert not await hasher.verify("wrong", encoded)
+    assert not await hasher.verify("password", None)
+
+    # Beyond the workers and the queue, calls are rejected
+    results = await asyncio.gather(
+        *[hasher.verify("password", encoded) for _ in range(3)], return_exceptions=True,
+    )
+    assert results[:2] == [True, True]
+    assert isinstance(results[2], PasswordHasherOverloaded)
+    assert hasher.pending == 0
+
+    hasher.close()
+
+
+@pytest.mark.asyncio
+async def test_password_grant_with_hasher(tmp_path):
+    hasher = create_hasher(workers=1, max_queue=0)
+    client = Client(
+        client_id="client",
+        client_secret="secret",
+        grant_types=[GrantType.TYPE_PASSWORD],
+        response_types=[],
+        redirect_uris=[],
+        scope="read",
+    )
+    sqlite_db = SQLiteDB(str(tmp_path / "oauth.db"), password_hasher=hasher)
+    await sqlite_db.add_client(client)
+    await sqlite_db.add_user("user", "password")
+    memory_db = InMemoryDB(
+        clients=[client],
+        users={"user": hasher.encode("password")},
+        password_hasher=hasher,
+    )
+
+    def password_request(password: str) -> Request:
+        return token_request(
+            "client",
+            "secret",
+            grant_type=GrantType.TYPE_PASSWORD,
+            username="user",
+            password=password,
+        )
+
+    for db in [memory_db, sqlite_db]:
+        server = AuthorizationServer(db=db)
+        server.register(
+            EndpointType.GRANT_TYPE, GrantType.TYPE_PASSWORD, PasswordGrantType
+        )
+
+        response = await server.create_token_response(password_request("password"))
+        assert response.status_code == HTTPStatus.OK
+        response = await server.create_token_response(password_request("wrong"))
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+        # The only worker is busy and nothing may queue
+        hasher.pending = 1
+        response = await server.create_token_response(password_request("password"))
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert response.headers["retry-after"] == "1"
+        hasher.pending = 0
+
+    await memory_db.close()
+    await sqlite_db.close()
+    hasher.close()
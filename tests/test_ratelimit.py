@@ -0,0 +1,154 @@
+from http import HTTPStatus
+
+import pytest
+from aioauth.ratelimit import RateLimit, RateLimiter, TokenBuckets
+from aioauth.requests import Request
+from aioauth.server import AuthorizationServer
+from aioauth.types import ErrorType, GrantType, RequestMethod
+
+from .models import Defaults
+from .utils import Clock, token_request
+
+
+def test_token_buckets():
+    clock = Clock()
+    buckets = TokenBuckets(max_entries=2, clock=clock)
+    limit = RateLimit(rate=2, burst=3)
+
+    assert [buckets.acquire("a", limit) for _ in range(3)] == [0, 0, 0]
+    assert buckets.acquire("a", limit) == pytest.approx(0.5)
+
+    # Refilled at ``rate`` tokens per second, never above ``burst``
+    clock.now += 0.5
+    assert buckets.acquire("a", limit) == 0
+    assert buckets.acquire("a", limit) > 0
+    clock.now += 60
+    assert [buckets.acquire("a", limit) for _ in range(3)] == [0, 0, 0]
+    assert buckets.acquire("a", limit) > 0
+
+    # The least recently used bucket is dropped
+    assert buckets.acquire("b", RateLimit(rate=1)) == 0
+    assert buckets.acquire("c", RateLimit(rate=1)) == 0
+    assert len(buckets) == 2
+    assert buckets.acquire("a", limit) == 0
+
+    with pytest.raises(ValueError):
+        TokenBuckets(max_entries=0)
+
+
+def test_rate_limiter_limits():
+    limiter = RateLimiter(
+        default_limit=RateLimit(1),
+        client_limits={"trusted": RateLimit(100)},
+        grant_type_limits={GrantType.TYPE_PASSWORD: RateLimit(5)},
+    )
+
+    assert limiter.client_limit("trusted", GrantType.TYPE_PASSWORD).rate == 100
+    assert limiter.client_limit("other", GrantType.TYPE_PASSWORD).rate == 5
+    assert limiter.client_limit("other", GrantType.TYPE_REFRESH_TOKEN).rate == 1
+    assert limiter.client_limit("other", None).rate == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_token_endpoint(
+    server: AuthorizationServer, defaults: Defaults
+):
+    clock = Clock()
+    server.rate_limiter = RateLimiter(
+        default_limit=RateLimit(rate=0.1, burst=2),
+        source_limit=RateLimit(rate=1, burst=3),
+        clock=clock,
+    )
+
+    def client_request(client_secret: str = defaults.client_secret, remote_addr=None):
+        request = token_request(
+            defaults.client_id,
+            client_secret,
+            grant_type=GrantType.TYPE_CLIENT_CREDENTIALS,
+            scope="read",
+        )
+        return request._replace(remote_addr=remote_addr)
+
+    # Requests with wrong credentials count against the client too
+    response = await server.create_token_response(client_request("wrong"))
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    response = await server.create_token_response(client_request())
+    assert response.status_code == HTTPStatus.OK
+
+    response = await server.create_token_response(client_request())
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert response.content.error == ErrorType.TEMPORARILY_UNAVAILABLE
+    assert response.headers["retry-after"] == "10"
+
+    clock.now += 10
+    response = await server.create_token_response(client_request())
+    assert response.status_code == HTTPStatus.OK
+
+    # Sources are limited across clients
+    limiter = server.rate_limiter
+    limiter.default_limit = None
+    statuses = [
+        (
+            await server.create_token_response(client_request(remote_addr="10.0.0.1"))
+        ).status_code
+        for _ in range(4)
+    ]
+    assert statuses == [HTTPStatus.OK] * 3 + [HTTPStatus.TOO_MANY_REQUESTS]
+    response = await server.create_token_response(
+        client_request(remote_addr="10.0.0.2")
+    )
+    assert response.status_code == HTTPStatus.OK
+
+    # Requests without a client id are left to the client authentication
+    response = await server.create_token_response(
+        Request(url="https://localhost/token", method=RequestMethod.POST)
+    )
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def keyed_token_request(
+    defaults: Defaults, index: int, grant_type=GrantType.TYPE_CLIENT_CREDENTIALS
+) -> Request:
+    return token_request(
+        f"junk-{index}",
+        "secret",
+        grant_type=grant_type,
+        client_id=defaults.client_id,
+        client_secret=defaults.client_secret,
+        scope="read",
+    )
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_post_credentials(
+    server: AuthorizationServer, defaults: Defaults
+):
+    server.rate_limiter = RateLimiter(default_limit=RateLimit(rate=1), clock=Clock())
+
+    # The client is the one authenticated by its post parameters, whatever
+    # the Authorization header says
+    statuses = [
+        (
+            await server.create_token_response(keyed_token_request(defaults, index))
+        ).status_code
+        for index in range(3)
+    ]
+    assert statuses == [HTTPStatus.OK] + [HTTPStatus.TOO_MANY_REQUESTS] * 2
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_unknown_grant_types(
+    server: AuthorizationServer, defaults: Defaults
+):
+    server.rate_limiter = RateLimiter(default_limit=RateLimit(rate=1), clock=Clock())
+
+    # Grant types without a handler share a single bucket
+    statuses = [
+        (
+            await server.create_token_response(
+                keyed_token_request(defaults, index, grant_type=f"unknown-{index}")
+            )
+        ).status_code
+        for index in range(3)
+    ]
+    assert statuses == [HTTPStatus.BAD_REQUEST] + [HTTPStatus.TOO_MANY_REQUESTS] * 2
@@ -0,0 +1,86 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from aioauth.config import Settings
+from aioauth.requests import Request
+from aioauth.responses import (
+    ErrorResponse,
+    Response,
+    TokenBatchIntrospectionResponse,
+    TokenInactiveIntrospectionResponse,
+    set_json_encoder,
+)
+from aioauth.structures import CaseInsensitiveDict
+from aioauth.types import ErrorType, RequestMethod
+from aioauth.utils import catch_errors_and_unavailability
+
+
+def test_response_body():
+    assert Response().body == b""
+
+    response = Response(
+        content=TokenBatchIntrospectionResponse(
+            tokens=[TokenInactiveIntrospectionResponse()]
+        )
+    )
+    assert json.loads(response.body) == {"tokens": [{"active": False}]}
+
+    error = Response(
+        content=ErrorResponse(error=ErrorType.INVALID_CLIENT, description="")
+    )
+    assert error.body is error._replace(status_code=HTTPStatus.UNAUTHORIZED).body
+
+
+def test_set_json_encoder():
+    error = Response(
+        content=ErrorResponse(error=ErrorType.INVALID_GRANT, description="")
+    )
+    before = error.body
+
+    set_json_encoder(lambda value: json.dumps(value, indent=2))
+    try:
+        assert error.body != before
+        assert json.loads(error.body) == json.loads(before)
+    finally:
+        set_json_encoder()
+
+    assert error.body == before
+
+
+def test_response_raw_headers():
+    headers = CaseInsensitiveDict({"Content-Type": "application/json"})
+    response = Response(headers=headers)
+
+    assert response.raw_headers == ((b"content-type", b"application/json"),)
+    assert response.raw_headers is response.raw_headers
+
+    headers["Location"] = "https://example.com"
+    assert response.raw_headers[-1] == (b"location", b"https://example.com")
+
+    assert Response(headers={"Allow": "GET"}).raw_headers == ((b"allow", b"GET"),)
+
+
+@pytest.mark.asyncio
+async def test_error_response_error_uri():
+    class Server:
+        @catch_errors_and_unavailability
+        async def endpoint(self, request):
+            raise ValueError()
+
+    request = Request(
+        method=RequestMethod.POST,
+        settings=Settings(ERROR_URI="https://example.com/errors/"),
+    )
+    response = await Server().endpoint(request)
+
+    assert json.loads(response.body)["error_uri"] == (
+        "https://example.com/errors/server_error"
+    )
+
+    # Without an ERROR_URI, the body has no error_uri at all
+    response = await Server().endpoint(request._replace(settings=Settings()))
+    assert json.loads(response.body) == {
+        "error": "server_error",
+        "description": response.content.description,
+    }
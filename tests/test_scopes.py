@@ -0,0 +1,81 @@
+from aioauth.models import Client, CompiledClient
+from aioauth.scopes import ScopeRegistry
+from aioauth.types import GrantType, ResponseType
+
+
+def test_scope_registry():
+    registry = ScopeRegistry()
+    mask = registry.register("read write")
+
+    assert len(registry) == 2
+    assert "read" in registry
+    assert registry.register("write  read") == mask
+    assert registry.mask("read") == 1
+    assert registry.mask("") == 0
+    assert registry.mask("read delete") is None
+    assert len(registry) == 2
+    assert registry.to_scope(mask) == "read write"
+    assert registry.to_scope(0) == ""
+
+    # Names registered later are visible to previously failed lookups
+    registry.register("delete")
+    assert registry.mask("read delete") == 0b101
+
+
+def test_scope_registry_subset_and_intersection():
+    registry = ScopeRegistry(max_cached=2)
+    registry.register("read write")
+
+    assert registry.is_subset("read", "read write")
+    assert registry.is_subset("", "read write")
+    assert not registry.is_subset("read delete", "read write")
+    assert not registry.is_subset("unknown", "read write")
+
+    assert registry.intersection("read write", "write delete") == "write"
+    assert registry.intersection("read write", "unknown") == ""
+
+    # Scopes no client declared are compared as strings, never registered
+    assert registry.is_subset("admin", "admin read")
+    assert not registry.is_subset("admin root", "admin read")
+    assert registry.intersection("admin read", "read admin x") == "admin read"
+    assert len(registry) == 2
+
+
+def test_client_check_scope():
+    scopes = [f"scope:{index}" for index in range(300)]
+    client = Client(client_id="client", client_secret="secret", scope=" ".join(scopes))
+
+    assert client.check_scope("scope:0 scope:299")
+    assert client.check_scope("")
+    assert client.check_scope(None)
+    assert not client.check_scope("scope:0 scope:300")
+    assert bin(client.scope_mask).count("1") == 300
+
+
+def test_compiled_client():
+    client = Client(
+        client_id="client",
+        client_secret="secret",
+        grant_types=[GrantType.TYPE_AUTHORIZATION_CODE],
+        response_types=[ResponseType.TYPE_CODE],
+        redirect_uris=[f"https://example.com/{index}" for index in range(500)],
+        scope="read write",
+    )
+    compiled = client.compile()
+
+    assert isinstance(compiled, CompiledClient)
+    assert compiled == client
+    assert compiled.compile() is compiled
+    assert compiled.check_redirect_uri("https://example.com/499")
+    assert not compiled.check_redirect_uri("https://example.com/500")
+    assert compiled.check_grant_type(GrantType.TYPE_AUTHORIZATION_CODE)
+    assert compiled.check_grant_type("authorization_code")  # type: ignore
+    assert not compiled.check_grant_type(GrantType.TYPE_PASSWORD)
+    assert compiled.check_response_type(ResponseType.TYPE_CODE)
+    assert not compiled.check_response_type(ResponseType.TYPE_TOKEN)
+    assert compiled.check_scope("write")
+    assert not compiled.check_scope("delete")
+
+    replaced = compiled._replace(scope="delete")
+    assert isinstance(replaced, CompiledClient)
+    assert replaced.check_scope("delete")
@@ -0,0 +1,180 @@
+import time
+from http import HTTPStatus
+from typing import Type
+
+import pytest
+from aioauth.base.database import BaseDB
+from aioauth.config import Settings
+from aioauth.requests import Post, Request
+from aioauth.server import AuthorizationServer
+from aioauth.signing import TokenSigner, is_signed_token
+from aioauth.types import GrantType, RequestMethod
+from aioauth.utils import encode_auth_headers
+
+from .models import Defaults
+
+
+def test_sign_and_verify():
+    signer = TokenSigner("secret")
+    issued_at = int(time.time())
+    token = signer.sign("client", "read write", issued_at, 3600)
+
+    assert is_signed_token(token)
+    payload = signer.verify(token)
+    assert payload.client_id == "client"
+    assert payload.scope == "read write"
+    assert payload.issued_at == issued_at
+    assert payload.expires_in == 3600
+    assert not payload.is_expired()
+
+    assert signer.sign("client", "", issued_at, 3600) != signer.sign(
+        "client", "", issued_at, 3600
+    )
+
+
+def test_verify_rejects_tampered_tokens():
+    signer = TokenSigner("secret")
+    token = signer.sign("client", "read", int(time.time()), 3600)
+    header, payload, signature = token.split(".")
+
+    assert TokenSigner("other secret").verify(token) is None
+    assert TokenSigner("secret", algorithm="HS512").verify(token) is None
+    assert signer.verify(f"{header}.{payload}x.{signature}") is None
+    assert signer.verify(f"{header}.{payload}") is None
+    assert signer.verify("opaque") is None
+    assert signer.verify("ключ.ключ.ключ") is None
+
+
+def test_invalid_signer_arguments():
+    with pytest.raises(ValueError):
+        TokenSigner("")
+    with pytest.raises(ValueError):
+        TokenSigner("secret", algorithm="none")
+
+
+@pytest.mark.asyncio
+async def test_introspect_signed_token(
+    db_class: Type[BaseDB], defaults: Defaults, storage
+):
+    db = db_class()
+    server = AuthorizationServer(db=db, token_signer=TokenSigner("secret"))
+    headers = encode_auth_headers(defaults.client_id, defaults.client_secret)
+    post = Post(grant_type=GrantType.TYPE_CLIENT_CREDENTIALS, scope=defaults.scope,)
+    request = Request(
+        url="https://localhost", post=post, method=RequestMethod.POST, headers=headers
+    )
+    response = await server.create_token_response(request)
+    assert response.status_code == HTTPStatus.OK
+    access_token = response.content.access_token
+    assert is_signed_token(access_token)
+
+    # The signer stays with the server, the database is not changed
+    assert db.token_signer is None
+    response = await AuthorizationServer(db=db).create_token_response(request)
+    assert response.status_code == HTTPStatus.OK
+    assert not is_signed_token(response.content.access_token)
+
+    request = Request(
+        post=Post(token=access_token), method=RequestMethod.POST, headers=headers
+    )
+    response = await server.create_token_introspection_response(request)
+    assert response.content.active
+    assert response.content.scope == defaults.scope
+    assert response.content.client_id == defaults.client_id
+
+    # Signed tokens are bound to the client they were issued to
+    other_headers = encode_auth_headers("other", defaults.client_secret)
+    response = await server.create_token_introspection_response(
+        request._replace(headers=other_headers)
+    )
+    assert not response.content.active
+
+    # Revocation is still looked up in storage
+    storage["tokens"].clear()
+    response = await server.create_token_introspection_response(request)
+    assert not response.content.active
+
+
+@pytest.mark.asyncio
+async def test_introspect_expired_signed_token(
+    db_class: Type[BaseDB], defaults: Defaults
+):
+    settings = Settings()
+    signer = TokenSigner("secret")
+    server = AuthorizationServer(db=db_class(), token_signer=signer)
+    access_token = signer.sign(
+        defaults.client_id,
+        defaults.scope,
+        int(time.time()) - settings.TOKEN_EXPIRES_IN - 1,
+        settings.TOKEN_EXPIRES_IN,
+    )
+    request = Request(
+        post=Post(token=access_token),
+        method=RequestMethod.POST,
+        headers=encode_auth_headers(defaults.client_id, defaults.client_secret),
+    )
+    response = await server.create_token_introspection_response(request)
+    assert not response.content.active
+
+
+@pytest.mark.asyncio
+async def test_introspect_opaque_token_with_signer(
+    db_class: Type[BaseDB], defaults: Defaults
+):
+    server = AuthorizationServer(db=db_class(), token_signer=TokenSigner("secret"))
+    request = Request(
+        post=Post(token=defaults.access_token),
+        method=RequestMethod.POST,
+        headers=encode_auth_headers(defaults.client_id, defaults.client_secret),
+    )
+    response = await server.create_token_introspection_response(request)
+    assert response.content.active
+
+
+@pytest.mark.asyncio
+async def test_batch_introspect_signed_tokens(
+    db_class: Type[BaseDB], defaults: Defaults, storage
+):
+    signer = TokenSigner("secret")
+    db = db_class()
+    server = AuthorizationServer(db=db, token_signer=signer)
+    headers = encode_auth_headers(defaults.client_id, defaults.client_secret)
+    post = Post(grant_type=GrantType.TYPE_CLIENT_CREDENTIALS, scope=defaults.scope)
+    request = Request(
+        url="https://localhost", post=post, method=RequestMethod.POST, headers=headers
+    )
+    response = await server.create_token_response(request)
+    access_token = response.content.access_token
+    forged_token = TokenSigner("other").sign(
+        defaults.client_id, defaults.scope, int(time.time()), 3600
+    )
+
+    looked_up = []
+    get_tokens = db.get_tokens
+
+    async def recording_get_tokens(request, client_id, access_tokens):
+        looked_up.extend(access_tokens)
+        return await get_tokens(request, client_id, access_tokens)
+
+    db.get_tokens = recording_get_tokens  # type: ignore
+    request = Request(
+        post=Post(tokens=[access_token, forged_token, defaults.access_token]),
+        method=RequestMethod.POST,
+        headers=headers,
+    )
+    response = await server.create_token_batch_introspection_response(request)
+    assert [result.active for result in response.content.tokens] == [
+        True,
+        False,
+        True,
+    ]
+    # Like single introspection, signed tokens are only checked for revocation
+    assert looked_up == [defaults.access_token]
+
+    storage["tokens"].clear()
+    response = await server.create_token_batch_introspection_response(request)
+    assert [result.active for result in response.content.tokens] == [
+        False,
+        False,
+        False,
+    ]
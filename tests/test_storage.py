@@ -0,0 +1,334 @@
+import asyncio
+import sqlite3
+import time
+from http import HTTPStatus
+
+import pytest
+from aioauth.config import Settings
+from aioauth.grant_type import PasswordGrantType, RefreshTokenGrantType
+from aioauth.models import Client, CompiledClient
+from aioauth.requests import Post, Request
+from aioauth.server import AuthorizationServer
+from aioauth.storage.memory import InMemoryDB
+from aioauth.storage.sqlite import SQLiteDB
+from aioauth.types import (
+    CodeChallengeMethod,
+    EndpointType,
+    GrantType,
+    RequestMethod,
+    ResponseType,
+)
+
+from .utils import token_request
+
+client = Client(
+    client_id="client",
+    client_secret="secret",
+    grant_types=[GrantType.TYPE_PASSWORD, GrantType.TYPE_REFRESH_TOKEN],
+    response_types=[ResponseType.TYPE_CODE],
+    redirect_uris=["https://example.com/callback"],
+    scope="read write",
+)
+request = Request(method=RequestMethod.POST)
+
+
+async def create_code(db, settings: Settings = Settings()):
+    return await db.create_authorization_code(
+        request._replace(settings=settings),
+        client.client_id,
+        client.scope,
+        ResponseType.TYPE_CODE,
+        client.redirect_uris[0],
+        CodeChallengeMethod.PLAIN,
+        "",
+    )
+
+
+@pytest.mark.asyncio
+async def test_in_memory_db_tokens():
+    db = InMemoryDB(clients=[client])
+    token = await db.create_token(request, client.client_id, client.scope)
+
+    assert await db.get_token(request, "client", access_token=token.access_token)
+    assert await db.get_token(request, "client", refresh_token=token.refresh_token)
+    assert await db.get_token(request, "other", access_token=token.access_token) is None
+    assert await db.get_token(request, "client") is None
+    assert await db.get_tokens(request, "client", [token.access_token, "x"]) == [
+        token,
+        None,
+    ]
+    assert not await db.is_token_revoked(request, "client", token.access_token)
+
+    await db.revoke_token(request, token.refresh_token)
+    await db.revoke_token(request, "unknown")
+    revoked = await db.get_token(request, "client", refresh_token=token.refresh_token)
+    assert revoked.revoked
+    assert await db.is_token_revoked(request, "client", token.access_token)
+    assert await db.is_token_revoked(request, "client", "unknown")
+
+    token = await db.create_token(request, client.client_id, client.scope)
+    rotate = db.rotate_refresh_token
+    assert await rotate(request, "other", token.refresh_token) is None
+    new_token = await rotate(request, "client", token.refresh_token, "write admin")
+    assert new_token.scope == "write"
+    assert await db.get_token(request, "client", access_token=new_token.access_token)
+    assert await db.is_token_revoked(request, "client", token.access_token)
+    assert await rotate(request, "client", token.refresh_token) is None
+
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_in_memory_db_clients_and_codes():
+    db = InMemoryDB(clients=[client], users={"user": "password"})
+
+    assert isinstance(await db.get_client(request, "client"), CompiledClient)
+    assert await db.get_client(request, "client", "secret")
+    assert await db.get_client(request, "client", "wrong") is None
+    assert await db.get_client(request, "unknown") is None
+    db.remove_client("client")
+    assert await db.get_client(request, "client") is None
+
+    code = await create_code(db)
+    assert await db.get_authorization_code(request, "other", code.code) is None
+    await db.delete_authorization_code(request, "other", code.code)
+    assert await db.get_authorization_code(request, "client", code.code) == code
+    await db.delete_authorization_code(request, "client", code.code)
+    assert await db.get_authorization_code(request, "client", code.code) is None
+
+    code = await create_code(db)
+    assert await db.consume_authorization_code(request, "other", code.code) is None
+    assert await db.consume_authorization_code(request, "client", code.code) == code
+    assert await db.consume_authorization_code(request, "client", code.code) is None
+    assert len(db.expiry) == 0
+
+    def login(username, password):
+        return request._replace(post=Post(username=username, password=password))
+
+    assert await db.authenticate(login("user", "password"))
+    assert not await db.authenticate(login("user", "wrong"))
+    assert not await db.authenticate(login("unknown", "password"))
+    assert not await db.authenticate(request)
+
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_in_memory_db_expiry():
+    now = [time.time() - 10]
+    db = InMemoryDB(clients=[client], expiry_clock=lambda: now[0])
+    settings = Settings(TOKEN_EXPIRES_IN=10, AUTHORIZATION_CODE_EXPIRES_IN=0)
+
+    token = await db.create_token(
+        request._replace(settings=settings), client.client_id, client.scope
+    )
+    code = await create_code(db, settings)
+    long_lived = await db.create_token(request, client.client_id, client.scope)
+    assert await db.get_authorization_code(request, "client", code.code)
+
+    # Once the clock passes its deadline, the background task drops the code
+    now[0] = time.time() + 1
+    db.expiry._wakeup.set()  # type: ignore
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert await db.get_authorization_code(request, "client", code.code) is None
+    assert await db.get_token(request, "client", access_token=token.access_token)
+
+    # Refresh tokens live twice as long as access tokens
+    assert db.purge_expired(now=now[0] + 15) == 0
+    assert db.purge_expired(now=now[0] + 25) == 1
+    refresh_token = token.refresh_token
+    assert await db.get_token(request, "client", refresh_token=refresh_token) is None
+    assert await db.get_token(request, "client", access_token=long_lived.access_token)
+
+    await db.close()
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_in_memory_db_server_concurrency():
+    db = InMemoryDB(clients=[client], users={"user": "password"})
+    server = AuthorizationServer(db=db)
+    server.register(EndpointType.GRANT_TYPE, GrantType.TYPE_PASSWORD, PasswordGrantType)
+    server.register(
+        EndpointType.GRANT_TYPE, GrantType.TYPE_REFRESH_TOKEN, RefreshTokenGrantType
+    )
+
+    responses = await asyncio.gather(
+        *[
+            server.create_token_response(
+                token_request(
+                    "client",
+                    "secret",
+                    grant_type=GrantType.TYPE_PASSWORD,
+                    username="user",
+                    password="password",
+                    scope="read",
+                )
+            )
+            for _ in range(100)
+        ]
+    )
+    assert {response.status_code for response in responses} == {HTTPStatus.OK}
+    assert len(db.tokens) == len(db.refresh_tokens) == 100
+
+    # Only one of concurrent refreshes of the same refresh token succeeds
+    refresh_token = responses[0].content.refresh_token
+    responses = await asyncio.gather(
+        *[
+            server.create_token_response(
+                token_request(
+                    "client",
+                    "secret",
+                    grant_type=GrantType.TYPE_REFRESH_TOKEN,
+                    refresh_token=refresh_token,
+                )
+            )
+            for _ in range(10)
+        ]
+    )
+    statuses = [response.status_code for response in responses]
+    assert statuses.count(HTTPStatus.OK) == 1
+    old = await db.get_token(request, "client", refresh_token=refresh_token)
+    assert old.revoked
+
+    await db.close()
+
+
+async def create_sqlite_db(tmp_path) -> SQLiteDB:
+    db = SQLiteDB(str(tmp_path / "oauth.db"), pool_size=2)
+    await db.add_client(client)
+    await db.add_user("user", "password")
+    return db
+
+
+@pytest.mark.asyncio
+async def test_sqlite_db_tokens(tmp_path):
+    db = await create_sqlite_db(tmp_path)
+    writes = []
+    run = db._run
+
+    async def counting_run(func, write=False):
+        writes.append(write)
+        return await run(func, write)
+
+    db._run = counting_run  # type: ignore
+    tokens = await asyncio.gather(
+        *[db.create_token(request, client.client_id, client.scope) for _ in range(50)]
+    )
+    token = tokens[0]
+    # Concurrently created tokens are inserted in a single transaction
+    assert writes == [True]
+
+    assert await db.get_token(request, "client", access_token=token.access_token) == (
+        token
+    )
+    assert await db.get_token(request, "client", refresh_token=token.refresh_token)
+    assert await db.get_token(request, "other", access_token=token.access_token) is None
+    assert await db.get_token(request, "client") is None
+
+    access_tokens = [token.access_token for token in tokens] + ["unknown"]
+    assert await db.get_tokens(request, "client", access_tokens) == tokens + [None]
+    assert not await db.is_token_revoked(request, "client", token.access_token)
+
+    await db.revoke_token(request, token.refresh_token)
+    revoked = await db.get_token(request, "client", refresh_token=token.refresh_token)
+    assert revoked.revoked
+    assert await db.is_token_revoked(request, "client", token.access_token)
+    assert await db.is_token_revoked(request, "client", "unknown")
+
+    # Only one of concurrent rotations of the same refresh token succeeds
+    refresh_token = tokens[1].refresh_token
+    rotated = await asyncio.gather(
+        *[
+            db.rotate_refresh_token(request, "client", refresh_token, "read")
+            for _ in range(10)
+        ]
+    )
+    new_tokens = [token for token in rotated if token is not None]
+    assert len(new_tokens) == 1
+    assert new_tokens[0].scope == "read"
+    assert (
+        await db.get_token(request, "client", access_token=new_tokens[0].access_token)
+        == new_tokens[0]
+    )
+    assert await db.is_token_revoked(request, "client", tokens[1].access_token)
+    assert await db.rotate_refresh_token(request, "client", token.refresh_token) is None
+
+    # Refresh tokens live twice as long as access tokens
+    expires_in = Settings().TOKEN_EXPIRES_IN
+    assert await db.purge_expired(now=time.time() + expires_in) == 0
+    assert await db.purge_expired(now=time.time() + expires_in * 2 + 1) == 51
+
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_db_clients_codes_and_users(tmp_path):
+    db = await create_sqlite_db(tmp_path)
+
+    assert await db.get_client(request, "client") == client
+    assert await db.get_client(request, "client", "secret") == client
+    assert await db.get_client(request, "client", "wrong") is None
+    assert await db.get_client(request, "unknown") is None
+
+    code = await create_code(db)
+    assert await db.get_authorization_code(request, "client", code.code) == code
+    assert await db.get_authorization_code(request, "other", code.code) is None
+    await db.delete_authorization_code(request, "client", code.code)
+    assert await db.get_authorization_code(request, "client", code.code) is None
+
+    # Concurrent redemptions of the same code, only one of them gets it
+    code = await create_code(db)
+    consumed = await asyncio.gather(
+        *[
+            db.consume_authorization_code(request, "client", code.code)
+            for _ in range(10)
+        ]
+    )
+    assert consumed.count(code) == 1
+    assert consumed.count(None) == 9
+
+    await create_code(db, Settings(AUTHORIZATION_CODE_EXPIRES_IN=0))
+    assert await db.purge_expired(now=time.time() + 1) == 1
+
+    def login(username, password):
+        return request._replace(post=Post(username=username, password=password))
+
+    assert await db.authenticate(login("user", "password"))
+    assert not await db.authenticate(login("user", "wrong"))
+    assert not await db.authenticate(login("unknown", "password"))
+    assert not await db.authenticate(request)
+
+    # Records survive reopening the database
+    await db.close()
+    reopened = SQLiteDB(str(tmp_path / "oauth.db"), pool_size=1)
+    assert await reopened.get_client(request, "client") == client
+    await reopened.close()
+
+    with pytest.raises(ValueError):
+        SQLiteDB(str(tmp_path / "oauth.db"), pool_size=0)
+
+
+@pytest.mark.asyncio
+async def test_sqlite_db_failed_commit(tmp_path):
+    db = SQLiteDB(str(tmp_path / "oauth.db"), pool_size=1)
+    (connection,) = db._all_connections
+    connection.execute("PRAGMA foreign_keys = ON")
+
+    def violate_deferred_constraint(connection):
+        connection.execute("CREATE TABLE parent (id INTEGER PRIMARY KEY)")
+        connection.execute(
+            "CREATE TABLE child (parent_id INTEGER "
+            "REFERENCES parent (id) DEFERRABLE INITIALLY DEFERRED)"
+        )
+        connection.execute("INSERT INTO child VALUES (1)")
+
+    # The constraint is checked by COMMIT, the transaction is rolled back
+    with pytest.raises(sqlite3.IntegrityError):
+        await db._run(violate_deferred_constraint, write=True)
+    assert not connection.in_transaction
+
+    await db.add_client(client)
+    assert await db.get_client(request, "client") == client
+    await db.close()
@@ -0,0 +1,91 @@
+import pickle
+
+import pytest
+from aioauth.requests import Post, Request
+from aioauth.structures import CaseInsensitiveDict, RawHeaders
+from aioauth.types import RequestMethod
+from aioauth.utils import decode_auth_headers, encode_auth_headers
+
+
+def test_case_insensitive_dict():
+    headers = CaseInsensitiveDict({"Content-Type": "application/json"}, Pragma="no")
+
+    assert headers["content-type"] == "application/json"
+    assert headers.get("CONTENT-TYPE") == "application/json"
+    assert headers.get("missing", "default") == "default"
+    assert "Pragma" in headers
+    assert "pragma" in headers
+    assert 1 not in headers
+    assert list(headers) == ["content-type", "pragma"]
+
+    headers.update({"Location": "a"}, Allow="GET")
+    headers.update([("X-Header", "b")])
+    headers.update(CaseInsensitiveDict(Location="c"))
+    assert headers["LOCATION"] == "c"
+    assert headers["allow"] == "GET"
+    assert headers["x-header"] == "b"
+
+    assert headers.setdefault("Allow", "POST") == "GET"
+    assert headers.pop("X-HEADER") == "b"
+    assert headers.pop("X-HEADER", None) is None
+    with pytest.raises(KeyError):
+        headers.pop("X-HEADER")
+    del headers["ALLOW"]
+    assert "allow" not in headers
+
+    copy = headers.copy()
+    assert isinstance(copy, CaseInsensitiveDict)
+    assert copy == headers
+    assert CaseInsensitiveDict.fromkeys(["A", "B"], "") == {"a": "", "b": ""}
+    assert repr(CaseInsensitiveDict(A="b")) == "CaseInsensitiveDict({'a': 'b'})"
+
+
+def test_raw_headers():
+    headers = RawHeaders(
+        [
+            (b"content-type", b"application/json"),
+            (b"X-Header", b"first"),
+            (b"x-header", b"second"),
+        ]
+    )
+
+    assert headers["Content-Type"] == "application/json"
+    assert headers.get("x-header") == "first"
+    assert headers.get("missing") is None
+    assert "X-HEADER" in headers
+    assert "missing" not in headers
+    assert 1 not in headers
+    assert list(headers) == ["content-type", "x-header"]
+    assert len(headers) == 2
+    with pytest.raises(KeyError):
+        headers["missing"]
+
+    assert headers.to_dict() == CaseInsensitiveDict(
+        {"content-type": "application/json", "x-header": "first"}
+    )
+
+
+def test_decode_auth_headers_from_raw_headers():
+    authorization = encode_auth_headers("client", "secret")["authorization"]
+    request = Request(
+        method=RequestMethod.POST,
+        post=Post(),
+        headers=RawHeaders([(b"authorization", authorization.encode("latin-1"))]),
+    )
+    assert decode_auth_headers(request) == ("client", "secret")
+
+
+def test_case_insensitive_dict_raw():
+    headers = CaseInsensitiveDict({"Content-Type": "application/json"})
+    raw = headers.raw
+    assert raw == ((b"content-type", b"application/json"),)
+    assert headers.raw is raw
+
+    headers.update(Pragma="no-cache")
+    assert headers.raw == raw + ((b"pragma", b"no-cache"),)
+
+    headers.clear()
+    assert headers.raw == ()
+
+    restored = pickle.loads(pickle.dumps(CaseInsensitiveDict(A="b")))
+    assert restored.raw == ((b"a", b"b"),)
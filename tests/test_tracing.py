@@ -0,0 +1,92 @@
+from http import HTTPStatus
+
+import pytest
+from aioauth.requests import Request
+from aioauth.server import AuthorizationServer
+from aioauth.tracing import SlowestRequests, Tracer, TracingDB
+from aioauth.types import GrantType, RequestMethod
+
+from .models import Defaults
+from .utils import token_request
+
+
+class RecordingTracer(Tracer):
+    def __init__(self):
+        self.events = []
+
+    def on_span_start(self, trace, span):
+        self.events.append(("start", span.name, span.depth))
+
+    def on_span_end(self, trace, span):
+        self.events.append(("end", span.name, span.error is not None))
+
+    def on_trace_end(self, trace):
+        self.events.append(("trace", trace.name, trace.status_code))
+
+
+def client_request(defaults: Defaults, grant_type, **post) -> Request:
+    return token_request(
+        defaults.client_id, defaults.client_secret, grant_type=grant_type, **post
+    )
+
+
+@pytest.mark.asyncio
+async def test_tracer_hooks(server: AuthorizationServer, defaults: Defaults):
+    tracer = RecordingTracer()
+    server = AuthorizationServer(db=server.db, tracer=tracer)
+    assert isinstance(server.db, TracingDB)
+
+    response = await server.create_token_response(
+        client_request(defaults, GrantType.TYPE_CLIENT_CREDENTIALS, scope="read")
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert tracer.events == [
+        ("start", "ClientCredentialsGrantType.validate_request", 0),
+        ("start", "db.get_client", 1),
+        ("end", "db.get_client", False),
+        ("end", "ClientCredentialsGrantType.validate_request", False),
+        ("start", "db.create_token", 0),
+        ("end", "db.create_token", False),
+        ("trace", "create_token_response", 200),
+    ]
+
+    # Spans of failed phases carry the error
+    tracer.events.clear()
+    response = await server.create_token_response(
+        client_request(defaults, GrantType.TYPE_REFRESH_TOKEN, refresh_token="x")
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert ("end", "db.rotate_refresh_token", False) in tracer.events
+    assert tracer.events[-1] == ("trace", "create_token_response", 400)
+
+    # Requests of servers without a tracer are not traced
+    request = client_request(defaults, GrantType.TYPE_CLIENT_CREDENTIALS)
+    assert request.trace is None
+    assert await server.db.get_client(request, defaults.client_id)
+
+
+@pytest.mark.asyncio
+async def test_slowest_requests(server: AuthorizationServer, defaults: Defaults):
+    tracer = SlowestRequests(size=2)
+    server = AuthorizationServer(db=server.db, tracer=tracer)
+
+    await server.create_token_response(client_request(defaults, "unknown"))
+    lines = tracer.report().splitlines()
+    assert lines[0].startswith("create_token_response unknown 400 ")
+    assert lines[1].startswith("  GrantTypeBase.validate_request ")
+    assert lines[1].endswith("ms (UnsupportedGrantTypeError)")
+    assert lines[2].startswith("    db.get_client ")
+
+    # Only the slowest traces are kept
+    tracer.clear()
+    for duration in [1, 3, 2, 0]:
+        trace = tracer.start_trace("endpoint", Request(method=RequestMethod.POST))
+        trace.start, trace.end = 0, duration
+        tracer.on_trace_end(trace)
+    assert [trace.duration for trace in tracer.traces] == [3, 2]
+
+    tracer.clear()
+    assert tracer.report() == ""
+
+    with pytest.raises(ValueError):
+        SlowestRequests(size=0)
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
 
 import pytest
@@ -7,8 +8,11 @@ from aioauth.requests import Request
 from aioauth.structures import CaseInsensitiveDict
 from aioauth.types import RequestMethod
 from aioauth.utils import (
+    UNICODE_ASCII_CHARACTER_SET,
+    EntropyPool,
     build_uri,
     decode_auth_headers,
+    generate_token,
     get_authorization_scheme_param,
     is_secure_transport,
     list_to_scope,
@@ -75,8 +79,14 @@ def test_decode_auth_headers():
     request = Request(
         headers=CaseInsensitiveDict({"authorization": ""}), method=RequestMethod.POST
     )
-    with pytest.raises(InvalidClientError):
+    with pytest.raises(InvalidClientError) as exc_info:
+        decode_auth_headers(request=request)
+
+    # Every error gets its own headers, changing them affects no other response
+    exc_info.value.headers["www-authenticate"] = "Bearer"
+    with pytest.raises(InvalidClientError) as exc_info:
         decode_auth_headers(request=request)
+    assert exc_info.value.headers["www-authenticate"] == "Basic"
 
 
 def test_base_error_uri():
@@ -87,3 +97,48 @@ def test_base_error_uri():
         raise InvalidClientError(request=request)
     except InvalidClientError as exc:
         assert urljoin(ERROR_URI, exc.error) == exc.error_uri
+
+
+def test_generate_token():
+    token = generate_token(42)
+    assert len(token) == 42
+    assert set(token) <= set(UNICODE_ASCII_CHARACTER_SET)
+    assert generate_token(42) != token
+    assert generate_token(0) == ""
+
+    assert set(generate_token(256, chars="ab")) == {"a", "b"}
+    assert set(generate_token(64, chars="äö")) <= {"ä", "ö"}
+
+
+def test_generate_token_is_uniform():
+    token = generate_token(62 * 1000)
+    counts = [token.count(char) for char in UNICODE_ASCII_CHARACTER_SET]
+    # Modulo bias would favor the first 248 % 62 characters noticeably
+    assert min(counts) > 800
+    assert max(counts) < 1200
+
+
+def test_generate_token_entropy_pool():
+    pool = EntropyPool(size=64)
+    tokens = {generate_token(42, pool=pool) for _ in range(100)}
+    assert len(tokens) == 100
+    assert all(len(token) == 42 for token in tokens)
+    assert len(generate_token(200, pool=pool)) == 200
+    assert set(generate_token(100, chars="ab", pool=pool)) == {"a", "b"}
+
+
+def test_entropy_pool_threads():
+    pool = EntropyPool()
+
+    def generate(_):
+        return [generate_token(42, pool=pool) for _ in range(100)]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        batches = list(executor.map(generate, range(4)))
+
+    tokens = [token for batch in batches for token in batch]
+
+    assert len(set(tokens)) == len(tokens)
+
+    pool.clear()
+    assert len(generate_token(42, pool=pool)) == 42
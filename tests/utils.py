@@ -1,10 +1,11 @@
 from http import HTTPStatus
-from typing import Any, Callable, Dict, Union
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
 
 from aioauth.constances import default_headers
 from aioauth.requests import Post, Query, Request
 from aioauth.responses import ErrorResponse, Response
 from aioauth.types import ErrorType, RequestMethod
+from aioauth.utils import encode_auth_headers
 
 EMPTY_KEYS = {
     RequestMethod.GET: {
@@ -215,6 +216,26 @@ INVALID_KEYS = {
 }
 
 
+class Clock:
+    """Fake monotonic clock, tests move it by setting ``now``."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def token_request(client: str, secret: str, **post: Any) -> Request:
+    """Token endpoint request with ``client`` and ``secret`` in basic auth"""
+    return Request(
+        url="https://localhost/token",
+        method=RequestMethod.POST,
+        headers=encode_auth_headers(client, secret),
+        post=Post(**post),
+    )
+
+
 def get_keys(query: Union[Query, Post]) -> Dict[str, Any]:
     """Converts dataclass object to dict and returns dict without empty values"""
     return {key: value for key, value in query._asdict().items() if bool(value)}
@@ -226,12 +247,12 @@ def set_values(model, values):
 
 
 async def check_query_values(
-    request: Request, responses, query_dict: Dict, endpoint_func, value
+    request: Request, responses, query_dict: Dict, endpoint_func, value, prepare=None
 ):
     keys = set(query_dict.keys()) & set(responses.keys())
 
     for key in keys:
-        request_ = request
+        request_ = request if prepare is None else await prepare(request)
 
         if request_.method == RequestMethod.POST:
             post = set_values(request_.post, {key: value})
@@ -248,8 +269,13 @@ async def check_query_values(
 
 
 async def check_request_validators(
-    request: Request, endpoint_func: Callable,
+    request: Request,
+    endpoint_func: Callable,
+    prepare: Optional[Callable[[Request], Awaitable[Request]]] = None,
 ):
+    """``prepare`` is awaited before every check, it returns the request to
+    modify, e.g. one with a fresh single use authorization code.
+    """
     query_dict = {}
 
     if request.method == RequestMethod.POST:
@@ -259,7 +285,11 @@ async def check_request_validators(
         query_dict = get_keys(request.query)
 
     responses = EMPTY_KEYS[request.method]
-    await check_query_values(request, responses, query_dict, endpoint_func, None)
+    await check_query_values(
+        request, responses, query_dict, endpoint_func, None, prepare
+    )
 
     responses = INVALID_KEYS[request.method]
-    await check_query_values(request, responses, query_dict, endpoint_func, "invalid")
+    await check_query_values(
+        request, responses, query_dict, endpoint_func, "invalid", prepare
+    )